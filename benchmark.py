@@ -1,65 +1,448 @@
+import gc
+import heapq
+import sys
+import json
 import time
-from typing import List
-from pathfinder.grid import Grid
-from pathfinder.Astar import AStarPathfinder
+import asyncio
+import argparse
+import platform
+import random
+import statistics
+import tracemalloc
+from collections import deque
+from typing import List, Tuple, Optional, Callable, Dict, Any, Sequence
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.Astar import AStarPathfinder, DijkstraPathfinder
 from pathfinder.BFS import BFSPathfinder
 from pathfinder.DFS import DFSPathfinder
+from pathfinder.jps import JPSPathfinder
+from pathfinder.bidirectional import BidirectionalAStarPathfinder
+from pathfinder.service import PathService
+
+Pos = Tuple[int, int]
+
+# considerign size N = 10^3, 10^4, 10^5
+# grid dimensions approx can be : 32x32, 100x100, 316x316
+SIZES = (32, 100, 316)
+TERRAIN_COSTS = (1.0, 2.0, 4.0, 8.0, 10.0) # the costs of main.Terrain
+
+
+# every open cell reachable from start under the grid's connectivity, in BFS order
+def _reachable(grid: Grid, start: Pos) -> List[Pos]:
+    seen = {start}
+    order = [start]
+    queue = deque([start])
+    while queue:
+        pos = queue.popleft()
+        for neighbor in grid.get_neighbors(pos):
+            n_pos = neighbor.position
+            if n_pos not in seen:
+                seen.add(n_pos)
+                order.append(n_pos)
+                queue.append(n_pos)
+    return order
+
+
+# start in the top left corner, goal at the reachable cell farthest from it (manhattan),
+# keys spread over the rest of the reachable cells. Every generated map is solvable.
+def _place_endpoints(grid: Grid, keys: int, rng: random.Random) -> Grid:
+    start = (0, 0)
+    grid.remove_barrier(start)
+    reachable = _reachable(grid, start)
+    goal = max(reachable, key=lambda pos: (pos[0] + pos[1], pos))
+    grid.set_start(start)
+    grid.set_goal(goal)
+    others = [pos for pos in reachable if pos != start and pos != goal]
+    for pos in rng.sample(others, min(keys, len(others))):
+        grid.add_key(pos)
+    return grid
+
+
+def open_map(rows: int, cols: int, rng: random.Random, keys: int = 0, connectivity: Connectivity = Connectivity.FOUR) -> Grid:
+    return _place_endpoints(Grid(rows, cols, connectivity=connectivity), keys, rng)
+
+
+# barriers on a random `density` share of the cells
+def random_obstacles(rows: int, cols: int, rng: random.Random, density: float, keys: int = 0,
+                     connectivity: Connectivity = Connectivity.FOUR) -> Grid:
+    grid = Grid(rows, cols, connectivity=connectivity)
+    cells = [(r, c) for r in range(rows) for c in range(cols)]
+    for pos in rng.sample(cells, int(len(cells) * density)):
+        grid.add_barrier(pos)
+    return _place_endpoints(grid, keys, rng)
+
+
+# perfect maze (recursive backtracker): passages on even rows/columns, walls between them,
+# one corridor between any two cells so searches can't shortcut
+def maze(rows: int, cols: int, rng: random.Random, keys: int = 0, connectivity: Connectivity = Connectivity.FOUR) -> Grid:
+    grid = Grid(rows, cols, connectivity=connectivity)
+    for r in range(rows):
+        for c in range(cols):
+            grid.add_barrier((r, c))
+    grid.remove_barrier((0, 0))
+    stack = [(0, 0)]
+    while stack:
+        r, c = stack[-1]
+        options = [(r + dr, c + dc) for dr, dc in ((0, 2), (2, 0), (0, -2), (-2, 0))
+                   if 0 <= r + dr < rows and 0 <= c + dc < cols and grid.is_barrier((r + dr, c + dc))]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = rng.choice(options)
+        grid.remove_barrier(((r + nr) // 2, (c + nc) // 2))
+        grid.remove_barrier((nr, nc))
+        stack.append((nr, nc))
+    return _place_endpoints(grid, keys, rng)
+
+
+# patches of the main.Terrain costs over plain ground, plus 10% barriers
+def terrain_mix(rows: int, cols: int, rng: random.Random, keys: int = 0, connectivity: Connectivity = Connectivity.FOUR) -> Grid:
+    grid = Grid(rows, cols, connectivity=connectivity)
+    for _ in range(max(1, rows * cols // 40)):
+        cr, cc = rng.randrange(rows), rng.randrange(cols)
+        radius = rng.randint(1, 4)
+        cost = rng.choice(TERRAIN_COSTS[1:])
+        for r in range(max(0, cr - radius), min(rows, cr + radius + 1)):
+            for c in range(max(0, cc - radius), min(cols, cc + radius + 1)):
+                grid.set_cost((r, c), cost)
+    cells = [(r, c) for r in range(rows) for c in range(cols)]
+    for pos in rng.sample(cells, len(cells) // 10):
+        grid.add_barrier(pos)
+    return _place_endpoints(grid, keys, rng)
+
+
+# scenario name -> map builder(rows, cols, rng, connectivity)
+SCENARIOS: Dict[str, Callable[[int, int, random.Random, Connectivity], Grid]] = {
+    "open": lambda rows, cols, rng, conn: open_map(rows, cols, rng, connectivity=conn),
+    "random-10": lambda rows, cols, rng, conn: random_obstacles(rows, cols, rng, 0.10, connectivity=conn),
+    "random-25": lambda rows, cols, rng, conn: random_obstacles(rows, cols, rng, 0.25, connectivity=conn),
+    "random-35": lambda rows, cols, rng, conn: random_obstacles(rows, cols, rng, 0.35, connectivity=conn),
+    "maze": lambda rows, cols, rng, conn: maze(rows, cols, rng, connectivity=conn),
+    "terrain": lambda rows, cols, rng, conn: terrain_mix(rows, cols, rng, connectivity=conn),
+    "keys-2": lambda rows, cols, rng, conn: random_obstacles(rows, cols, rng, 0.10, keys=2, connectivity=conn),
+    "keys-5": lambda rows, cols, rng, conn: random_obstacles(rows, cols, rng, 0.10, keys=5, connectivity=conn),
+}
+
+# algorithm name -> pathfinder factory. BFS and DFS ignore terrain costs and keys
+ALGORITHMS: Dict[str, Callable[[Grid], Any]] = {
+    "astar": AStarPathfinder,
+    "dijkstra": DijkstraPathfinder,
+    "bidirectional": BidirectionalAStarPathfinder,
+    "jps": JPSPathfinder,
+    "bfs": BFSPathfinder,
+    "dfs": DFSPathfinder,
+}
+
+
+def build_map(scenario: str, rows: int, cols: int, seed: int = 0, connectivity: Connectivity = Connectivity.FOUR) -> Grid:
+    # seeded per scenario and size, so a map never depends on what ran before it
+    rng = random.Random(f"{seed}:{scenario}:{rows}x{cols}")
+    return SCENARIOS[scenario](rows, cols, rng, connectivity)
+
+
+def summarize(samples_ns: Sequence[int]) -> Dict[str, float]:
+    ms = sorted(s / 1e6 for s in samples_ns)
+    p95 = statistics.quantiles(ms, n=20, method="inclusive")[18] if len(ms) > 1 else ms[0]
+    return {
+        "runs": len(ms),
+        "min_ms": ms[0],
+        "median_ms": statistics.median(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p95_ms": p95,
+        "stdev_ms": statistics.stdev(ms) if len(ms) > 1 else 0.0,
+    }
+
+
+# time finder.find_path() on its own: the pathfinder is built before timing starts (searches
+# only log at debug level, nothing is printed), the collector is paused and the first
+# `warmup` runs are discarded.
+# Stops after `repeats` runs or once `max_seconds` of samples are in (at least 3 runs).
+# Peak memory comes from one extra run under tracemalloc, which would skew the timings.
+def measure(finder, warmup: int = 2, repeats: int = 10, max_seconds: float = 5.0) -> Dict[str, Any]:
+    samples: List[int] = []
+    path = None
+    for _ in range(warmup):
+        finder.find_path()
+    gc.collect()
+    gc.disable()
+    try:
+        budget = int(max_seconds * 1e9)
+        spent = 0
+        while len(samples) < repeats and (spent < budget or len(samples) < 3):
+            t0 = time.perf_counter_ns()
+            path = finder.find_path()
+            elapsed = time.perf_counter_ns() - t0
+            samples.append(elapsed)
+            spent += elapsed
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        finder.find_path()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = summarize(samples)
+    explored = finder.nodes_explored
+    result.update({
+        "found": path is not None,
+        "path_length": len(path) if path else 0,
+        "nodes_explored": explored,
+        "nodes_per_sec": explored / (result["median_ms"] / 1e3) if result["median_ms"] > 0 else 0.0,
+        "peak_kib": peak / 1024,
+    })
+    return result
+
+
+# fixed pure-Python workload shaped like a search loop (heap pushes and pops, dict lookups,
+# tuple keys). Its time is the unit results are normalized by, so a baseline recorded on
+# one machine can be compared with a run on another. Best of `rounds`, in nanoseconds.
+def calibrate(rounds: int = 5, size: int = 20000) -> int:
+    best = None
+    for _ in range(rounds):
+        t0 = time.perf_counter_ns()
+        heap: List[Tuple[int, int, Pos]] = []
+        best_g: Dict[Pos, int] = {}
+        for i in range(size):
+            pos = (i % 97, i % 89)
+            g = (i * 7919) % 1000
+            if g < best_g.get(pos, 1 << 30):
+                best_g[pos] = g
+                heapq.heappush(heap, (g, i, pos))
+        while heap:
+            heapq.heappop(heap)
+        elapsed = time.perf_counter_ns() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _case_key(row: Dict[str, Any]) -> Tuple[str, str, int, int]:
+    return row["scenario"], row["algorithm"], row["rows"], row["cols"]
+
+
+def _case_name(key: Tuple[str, str, int, int]) -> str:
+    scenario, algorithm, rows, cols = key
+    return f"{algorithm} on {scenario} {rows}x{cols}"
+
+
+# regressions of current against baseline, one readable line each. Times are compared in
+# calibration units (time / calibration time of the same run), a case regresses when both its
+# median and its fastest run got slower by more than time_threshold. Cases whose baseline
+# median is under time_floor_ms are too noisy for that and only have their node counts checked.
+# Node counts come from seeded maps, so any rise past nodes_threshold is a real change.
+def compare(
+        baseline: Dict[str, Any],
+        current: Dict[str, Any],
+        time_threshold: float = 0.25,
+        nodes_threshold: float = 0.0,
+        time_floor_ms: float = 0.1
+) -> List[str]:
+    base_unit = baseline["meta"].get("calibration_ns")
+    cur_unit = current["meta"].get("calibration_ns")
+    # without calibration on both sides, fall back to comparing raw times
+    scale = base_unit / cur_unit if base_unit and cur_unit else 1.0
+    now = {_case_key(row): row for row in current["results"]}
+    regressions = []
+    for old in baseline["results"]:
+        key = _case_key(old)
+        new = now.get(key)
+        if new is None:
+            regressions.append(f"{_case_name(key)}: missing from this run")
+            continue
+        if old["found"] and not new["found"]:
+            regressions.append(f"{_case_name(key)}: path no longer found")
+        if new["nodes_explored"] > old["nodes_explored"] * (1 + nodes_threshold):
+            change = (new["nodes_explored"] - old["nodes_explored"]) / max(1, old["nodes_explored"])
+            regressions.append(f"{_case_name(key)}: nodes explored {old['nodes_explored']} -> "
+                               f"{new['nodes_explored']} ({change:+.1%}, limit {nodes_threshold:+.0%})")
+        if old["median_ms"] >= time_floor_ms:
+            adjusted = new["median_ms"] * scale # current median in baseline machine ms
+            change = adjusted / old["median_ms"] - 1
+            # the fastest run has to be slower too, so one noisy stretch doesn't fail the gate
+            if change > time_threshold and new["min_ms"] * scale > old["min_ms"] * (1 + time_threshold):
+                regressions.append(f"{_case_name(key)}: median {old['median_ms']:.3f} -> {adjusted:.3f} ms "
+                                   f"normalized ({new['median_ms']:.3f} ms raw, {change:+.1%}, limit {time_threshold:+.0%})")
+    return regressions
+
 
 class BenchmarkRunner:
     @staticmethod
-    def run_benchmarks() -> None:
-        print("Running Benchmarks...")
-        
-        # considerign size N = 10^3, 10^4, 10^5
-        # grid dimensions approx can be : 32x32, 100x100, 316x316
-        configs = [
-            (32, 32, "10^3"),
-            (100, 100, "10^4"),
-            (316, 316, "10^5") 
-        ]
-
-        NUM_RUNS = 3
-
-        for rows, cols, label in configs:
-            print(f"\nSize: {label} nodes")
-            
-            # first making a setup for grid
-            grid = Grid(rows, cols)
-            grid.set_start((0, 0))
-            grid.set_goal((rows-1, cols-1))
-            
-            # 1. for A*
-            total_time = 0
-            for _ in range(NUM_RUNS):
-                start_t = time.time()
-                astar = AStarPathfinder(grid)
-                path = astar.find_path()
-                total_time += (time.time() - start_t) * 1000
-            avg_astar = total_time / NUM_RUNS
-            print(f"A*: {avg_astar:.2f} ms")
-
-            # 2. for BFS
-            total_time = 0
-            for _ in range(NUM_RUNS):
-                start_t = time.time()
-                bfs = BFSPathfinder(grid)
-                path = bfs.find_path()
-                total_time += (time.time() - start_t) * 1000
-            avg_bfs = total_time / NUM_RUNS
-            print(f"BFS: {avg_bfs:.2f} ms")
-
-            # 3.for DFS
-            # skipping DFS for largest set to avoid recursion depth issues or extreme slowness
-            if rows <= 100:
-                total_time = 0
-                for _ in range(NUM_RUNS):
-                    start_t = time.time()
-                    dfs = DFSPathfinder(grid)
-                    path = dfs.find_path()
-                    total_time += (time.time() - start_t) * 1000
-                avg_dfs = total_time / NUM_RUNS
-                print(f"DFS: {avg_dfs:.2f} ms")
-            else:
-                print("DFS: Skipped")
-            
-        print("\nBenchmarks Completed.")
\ No newline at end of file
+    def run_benchmarks(
+            connectivity: Connectivity = Connectivity.FOUR,
+            sizes: Sequence[int] = SIZES,
+            scenarios: Optional[Sequence[str]] = None,
+            algorithms: Optional[Sequence[str]] = None,
+            warmup: int = 2,
+            repeats: int = 10,
+            max_seconds: float = 5.0,
+            seed: int = 0,
+            json_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # connectivity: movement model of the benchmark grids, used by every pathfinder
+        # returns the report that json_path (if given) is written with
+        cases = [(scenario, size, size, name)
+                 for size in sizes
+                 for scenario in (scenarios or SCENARIOS)
+                 for name in (algorithms or ALGORITHMS)]
+        return BenchmarkRunner.run_cases(cases, connectivity, warmup, repeats, max_seconds, seed, json_path)
+
+    @staticmethod
+    def run_cases(
+            cases: Sequence[Tuple[str, int, int, str]],
+            connectivity: Connectivity = Connectivity.FOUR,
+            warmup: int = 2,
+            repeats: int = 10,
+            max_seconds: float = 5.0,
+            seed: int = 0,
+            json_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # cases: (scenario, rows, cols, algorithm), maps are built once for consecutive cases
+        print(f"Running Benchmarks ({connectivity.value}-connected, {warmup} warmup, up to {repeats} runs)...")
+        calibration_ns = calibrate()
+        print(f"Calibration: {calibration_ns / 1e6:.2f} ms")
+
+        results = []
+        grid, built = None, None
+        for scenario, rows, cols, name in cases:
+            if built != (scenario, rows, cols):
+                grid, built = build_map(scenario, rows, cols, seed, connectivity), (scenario, rows, cols)
+                print(f"\n{scenario}, {rows}x{cols} ({rows * cols} nodes, {len(grid.keys)} keys)")
+            finder = ALGORITHMS[name](grid)
+            row = {"scenario": scenario, "algorithm": name, "rows": rows, "cols": cols, "keys": len(grid.keys)}
+            row.update(measure(finder, warmup, repeats, max_seconds))
+            results.append(row)
+            print(f"{name:<14} median {row['median_ms']:9.3f} ms  p95 {row['p95_ms']:9.3f} ms  "
+                  f"sd {row['stdev_ms']:8.3f}  {row['nodes_per_sec']:>10,.0f} nodes/s  "
+                  f"peak {row['peak_kib']:8.1f} KiB")
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "connectivity": connectivity.value,
+                "warmup": warmup,
+                "repeats": repeats,
+                "max_seconds": max_seconds,
+                "seed": seed,
+                "calibration_ns": calibration_ns,
+            },
+            "results": results,
+        }
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nResults written to {json_path}")
+        print("\nBenchmarks Completed.")
+        return report
+
+    @staticmethod
+    def check_baseline(
+            baseline_path: str,
+            time_threshold: float = 0.25,
+            nodes_threshold: float = 0.0,
+            time_floor_ms: float = 0.1,
+            json_path: Optional[str] = None
+    ) -> bool:
+        # rerun exactly the cases of a stored report with its seed and settings, print the
+        # regressions and return whether there were none
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        meta = baseline["meta"]
+        cases = [(row["scenario"], row["rows"], row["cols"], row["algorithm"]) for row in baseline["results"]]
+        current = BenchmarkRunner.run_cases(
+            cases, Connectivity(meta.get("connectivity", Connectivity.FOUR.value)), meta.get("warmup", 2),
+            meta.get("repeats", 10), meta.get("max_seconds", 5.0), meta.get("seed", 0), json_path
+        )
+        regressions = compare(baseline, current, time_threshold, nodes_threshold, time_floor_ms)
+        if regressions:
+            print(f"\nPerformance regressions against {baseline_path}:")
+            for line in regressions:
+                print(f"  {line}")
+            return False
+        print(f"\nNo regressions against {baseline_path} ({len(cases)} cases).")
+        return True
+
+    @staticmethod
+    def run_service_benchmark(requests: int = 400, concurrency: int = 32, distinct: int = 40, size: int = 100) -> None:
+        # load generator for PathService: `concurrency` clients keep sending queries drawn from
+        # a pool of `distinct` ones, so identical in-flight queries get coalesced
+        print(f"\nService load: {requests} requests, {concurrency} clients, {distinct} distinct queries, {size}x{size} grid")
+        grid = Grid(size, size)
+        rng = random.Random(7)
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        for pos in rng.sample(cells, len(cells) // 5):
+            grid.add_barrier(pos)
+        open_cells = [pos for pos in cells if grid.is_valid(pos)]
+        pool = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(distinct)]
+        latencies: List[float] = []
+
+        # each client draws from its own seeded generator, so the query mix doesn't depend
+        # on how the event loop interleaves them
+        async def client(service: PathService, count: int, client_rng: random.Random) -> None:
+            for _ in range(count):
+                start, goal = client_rng.choice(pool)
+                t0 = time.perf_counter_ns()
+                await service.find_path(start, goal)
+                latencies.append((time.perf_counter_ns() - t0) / 1e6)
+
+        async def drive() -> Tuple[float, int, int]:
+            service = PathService(grid, AStarPathfinder)
+            t0 = time.perf_counter_ns()
+            # the first requests % concurrency clients send one extra request
+            per_client, extra = divmod(requests, concurrency)
+            await asyncio.gather(*[client(service, per_client + (i < extra), random.Random(f"7:{i}"))
+                                   for i in range(concurrency)])
+            elapsed = (time.perf_counter_ns() - t0) / 1e9
+            await service.close()
+            return elapsed, service.computed, service.coalesced
+
+        elapsed, computed, coalesced = asyncio.run(drive())
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"p50: {cuts[49]:.2f} ms, p99: {cuts[98]:.2f} ms, max: {max(latencies):.2f} ms")
+        print(f"Throughput: {len(latencies) / elapsed:.0f} req/s, computed: {computed}, coalesced: {coalesced}")
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pathfinder benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="grid side lengths")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), help="maps to run, all by default")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS), help="pathfinders to run, all by default")
+    parser.add_argument("--connectivity", choices=[c.value for c in Connectivity], default=Connectivity.FOUR.value)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs before measuring")
+    parser.add_argument("--repeats", type=int, default=10, help="timed runs per case")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="time cap per case (at least 3 runs)")
+    parser.add_argument("--seed", type=int, default=0, help="map generator seed")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    parser.add_argument("--service", action="store_true", help="also run the PathService load test")
+    # regression gate: rerun the cases of a stored --json report and compare
+    parser.add_argument("--baseline", help="compare against this report, exit 1 on regressions")
+    parser.add_argument("--time-threshold", type=float, default=0.25,
+                        help="allowed rise of the normalized median time (0.25 = 25%%)")
+    parser.add_argument("--nodes-threshold", type=float, default=0.0, help="allowed rise of nodes explored")
+    parser.add_argument("--time-floor", type=float, default=0.1,
+                        help="medians under this many ms in the baseline are not time-checked")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.baseline:
+        passed = BenchmarkRunner.check_baseline(
+            args.baseline, args.time_threshold, args.nodes_threshold, args.time_floor, args.json_path
+        )
+        return 0 if passed else 1
+    BenchmarkRunner.run_benchmarks(
+        Connectivity(args.connectivity), args.sizes, args.scenarios, args.algorithms,
+        args.warmup, args.repeats, args.max_seconds, args.seed, args.json_path
+    )
+    if args.service:
+        BenchmarkRunner.run_service_benchmark()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from typing import List, TypeVar, Generic
+
+T = TypeVar('T')
+
+# monotone bucket queue (Dial's algorithm) for small integer priorities. Same interface
+# as MinHeap: items are tuples whose first element is the priority, e.g.
+# (f, h, counter, position). push and pop are O(1) amortized instead of O(log n).
+# Buckets live in a circular array indexed by priority & mask. It only has to cover the
+# spread between the smallest and largest queued priority, which for A* is bounded by the
+# largest edge cost plus the heuristic change per step. The array doubles when a push
+# lands outside that window, up to max_span buckets.
+# push raises ValueError for priorities the queue cannot hold: ones that are not integers,
+# that are lower than the last popped priority (not monotone), or that would stretch the
+# window past max_span. The queue is left as it was, so callers can catch this and move
+# everything to a comparison heap.
+class BucketQueue(Generic[T]):
+    def __init__(self, span: int = 16, max_span: int = 1 << 16):
+        size = 1
+        while size < span:
+            size <<= 1
+        self.buckets: List[List[T]] = [[] for _ in range(size)]
+        self.mask = size - 1
+        self.max_span = max_span
+        self.cursor = 0 # lowest priority that may still hold items
+        self.top = 0 # highest priority pushed since the queue was last empty
+        self.floor = float("-inf") # last popped priority, nothing below it may be pushed
+        self._size = 0
+
+    def push(self, item: T):
+        priority = item[0]
+        bucket = int(priority)
+        if bucket != priority:
+            raise ValueError(f"BucketQueue needs integer priorities, got {priority}")
+        if bucket < self.floor:
+            raise ValueError(f"BucketQueue priorities must be monotone, got {bucket} < {self.floor}")
+        if self._size == 0:
+            # empty queue: restart the window at this priority
+            cursor = top = bucket
+        else:
+            cursor = min(self.cursor, bucket)
+            top = max(self.top, bucket)
+        # grow (which may raise) before anything is changed
+        if top - cursor > self.mask:
+            self._grow(top - cursor + 1)
+        self.cursor = cursor
+        self.top = top
+        self.buckets[bucket & self.mask].append(item)
+        self._size += 1
+
+    def pop(self) -> T:
+        if self._size == 0:
+            raise IndexError("pop from empty queue")
+        buckets = self.buckets
+        mask = self.mask
+        cursor = self.cursor
+        # skip empty buckets, at most one full turn of the window
+        while not buckets[cursor & mask]:
+            cursor += 1
+        self.cursor = self.floor = cursor
+        self._size -= 1
+        # LIFO inside a bucket: the newest entry is usually the deepest one
+        return buckets[cursor & mask].pop()
+
+    def peek(self) -> T:
+        # the item pop would return, without removing it
+        if self._size == 0:
+            raise IndexError("peek from empty queue")
+        buckets = self.buckets
+        mask = self.mask
+        cursor = self.cursor
+        while not buckets[cursor & mask]:
+            cursor += 1
+        self.cursor = cursor # nothing below it is queued, the next pop starts here
+        return buckets[cursor & mask][-1]
+
+    def is_empty(self) -> bool:
+        return self._size == 0
+
+    def drain(self) -> List[T]:
+        # remove and return every queued item (in no particular order)
+        items = [item for bucket in self.buckets for item in bucket]
+        for bucket in self.buckets:
+            bucket.clear()
+        self._size = 0
+        return items
+
+    def _grow(self, needed: int):
+        if needed > self.max_span:
+            raise ValueError(f"BucketQueue priority spread {needed} exceeds max_span {self.max_span}")
+        size = len(self.buckets)
+        while size < needed:
+            size <<= 1
+        old = self.buckets
+        self.buckets = [[] for _ in range(size)]
+        self.mask = size - 1
+        # re-bucket everything, keeping the order inside each bucket
+        for bucket in old:
+            for item in bucket:
+                self.buckets[int(item[0]) & self.mask].append(item)
+
+    def __len__(self):
+        return self._size
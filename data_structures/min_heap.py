@@ -1,4 +1,6 @@
-from typing import List, TypeVar, Generic
+import heapq
+from data_structures.bucket_queue import BucketQueue
+from typing import List, TypeVar, Generic, Dict, Any
 
 T = TypeVar('T')
 
@@ -30,6 +32,12 @@ class MinHeap(Generic[T]):
     def is_empty(self) -> bool:
         return len(self.heap) == 0
 
+    def peek(self) -> T:
+        # smallest item without removing it
+        if not self.heap:
+            raise IndexError("peek from empty heap")
+        return self.heap[0]
+
     def _sift_up(self, idx: int):
         parent = (idx - 1) // 2
         if idx > 0 and self.heap[idx] < self.heap[parent]:
@@ -56,3 +64,154 @@ class MinHeap(Generic[T]):
 
     def __len__(self):
         return len(self.heap)
+
+
+# iterative binary heap: same interface as MinHeap, but sifting moves a "hole" down/up
+# the tree in a loop instead of recursing and swapping. Meant for plain tuples such as
+# (f, h, counter, position)
+class BinaryHeap(MinHeap[T]):
+    def _sift_up(self, idx: int):
+        heap = self.heap
+        item = heap[idx]
+        while idx > 0:
+            parent = (idx - 1) >> 1
+            if item < heap[parent]:
+                heap[idx] = heap[parent]
+                idx = parent
+            else:
+                break
+        heap[idx] = item
+
+    def _sift_down(self, idx: int):
+        heap = self.heap
+        size = len(heap)
+        item = heap[idx]
+        child = 2 * idx + 1
+        while child < size:
+            # pick the smaller child
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            if heap[child] < item:
+                heap[idx] = heap[child]
+                idx = child
+                child = 2 * idx + 1
+            else:
+                break
+        heap[idx] = item
+
+    def pop(self) -> T:
+        if not self.heap:
+            raise IndexError("pop from empty heap")
+        last = self.heap.pop()
+        if not self.heap:
+            return last
+        # move the last item to the root and sift it down
+        item = self.heap[0]
+        self.heap[0] = last
+        self._sift_down(0)
+        return item
+
+
+# MinHeap interface on top of the C-implemented heapq module
+class HeapqHeap(MinHeap[T]):
+    def push(self, item: T):
+        heapq.heappush(self.heap, item)
+
+    def pop(self) -> T:
+        if not self.heap:
+            raise IndexError("pop from empty heap")
+        return heapq.heappop(self.heap)
+
+
+# binary heap with a position index, so an item can be found, moved and removed by key.
+# Items are tuples whose last element is the key (e.g. (f, h, counter, position)). Pushing
+# a key that is already queued is a decrease-key: the entry is replaced if the new item is
+# smaller and ignored otherwise, so the heap never holds stale duplicates.
+class IndexedMinHeap(BinaryHeap[T]):
+    def __init__(self):
+        super().__init__()
+        self.index: Dict[Any, int] = {} # key -> slot in self.heap
+
+    def push(self, item: T):
+        key = item[-1]
+        idx = self.index.get(key)
+        if idx is None:
+            self.heap.append(item)
+            self._sift_up(len(self.heap) - 1)
+        elif item < self.heap[idx]:
+            self.heap[idx] = item
+            self._sift_up(idx)
+
+    def pop(self) -> T:
+        item = super().pop()
+        del self.index[item[-1]]
+        return item
+
+    def remove(self, key: Any) -> bool:
+        idx = self.index.pop(key, None)
+        if idx is None:
+            return False
+        last = self.heap.pop()
+        if idx < len(self.heap):
+            # fill the gap with the last item, it may need to go either way
+            self.heap[idx] = last
+            self.index[last[-1]] = idx
+            self._sift_up(idx)
+            self._sift_down(self.index[last[-1]])
+        return True
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.index
+
+    def _sift_up(self, idx: int):
+        heap = self.heap
+        index = self.index
+        item = heap[idx]
+        while idx > 0:
+            parent = (idx - 1) >> 1
+            if item < heap[parent]:
+                heap[idx] = heap[parent]
+                index[heap[idx][-1]] = idx
+                idx = parent
+            else:
+                break
+        heap[idx] = item
+        index[item[-1]] = idx
+
+    def _sift_down(self, idx: int):
+        heap = self.heap
+        index = self.index
+        size = len(heap)
+        item = heap[idx]
+        child = 2 * idx + 1
+        while child < size:
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            if heap[child] < item:
+                heap[idx] = heap[child]
+                index[heap[idx][-1]] = idx
+                idx = child
+                child = 2 * idx + 1
+            else:
+                break
+        heap[idx] = item
+        index[item[-1]] = idx
+
+
+# available open-set backends, selectable by name (e.g. AStarPathfinder(grid, heap="indexed"))
+# "bucket" only accepts monotone integer priorities, see BucketQueue
+HEAP_BACKENDS: Dict[str, type] = {
+    "recursive": MinHeap,
+    "binary": BinaryHeap,
+    "heapq": HeapqHeap,
+    "indexed": IndexedMinHeap,
+    "bucket": BucketQueue,
+}
+
+
+def make_heap(name: str):
+    if name not in HEAP_BACKENDS:
+        raise ValueError(f"Unknown heap backend '{name}', expected one of {sorted(HEAP_BACKENDS)}")
+    return HEAP_BACKENDS[name]()
@@ -3,12 +3,13 @@ import sys
 import math
 import time
 import os
-from typing import Tuple, Optional, List, Dict
+from typing import Tuple, Optional, List, Dict, Set
 from pathfinder.grid import Grid
 from pathfinder.node import Node
 from pathfinder.Astar import AStarPathfinder
 from pathfinder.BFS import BFSPathfinder
 from pathfinder.DFS import DFSPathfinder
+from pathfinder.dstar_lite import DStarLitePathfinder
 from tests import TestRunner
 from benchmark import BenchmarkRunner
 from enum import Enum
@@ -22,8 +23,6 @@ class Terrain(Enum):
     MUD = 10.0
 
 
-
-
 # screen and grid dimensions
 SCREEN_WIDTH = 1150
 SCREEN_HEIGHT = 700
@@ -132,6 +131,10 @@ class VisualizerApp:
         self.selected_terrain = None
 
         self.path: List[Tuple[int, int]] = []
+        self.explored: Set[Tuple[int, int]] = set() # cells the last search visited, for the overlay
+
+        # D* Lite keeps its search tree between runs and repairs it after map edits
+        self.dstar: Optional[DStarLitePathfinder] = None
 
         # animation state
         self.tile_anims: Dict[Tuple[int, int], float] = {}  # (r,c) -> scale (0.0 to 1.0)
@@ -183,7 +186,7 @@ class VisualizerApp:
         y += 10
         # algorithm Buttons
         algos = [("Run A*", "ASTAR", (255, 200, 100)), ("Run BFS", "BFS", (200, 200, 255)),
-                 ("Run DFS", "DFS", (255, 200, 200))]
+                 ("Run DFS", "DFS", (255, 200, 200)), ("Run D* Lite (replan)", "DSTAR", (255, 225, 150))]
         for label, key, col in algos:
             self.buttons.append(Button(x_start, y, w * 2 + gap, h, label, lambda k=key: self.run_algorithm(k), col))
             y += h + gap
@@ -204,7 +207,10 @@ class VisualizerApp:
         TestRunner.run_all_tests()
 
     def run_benchmark(self):
-        BenchmarkRunner.run_benchmarks()
+        # a quick sweep (well under a second) so the window doesn't freeze, the full
+        # sweep over every size and scenario is `python benchmark.py`
+        BenchmarkRunner.run_benchmarks(sizes=(32,), scenarios=("open", "random-25", "maze", "terrain"),
+                                       warmup=1, repeats=3, max_seconds=0.5)
 
     def run_algorithm(self, algo_type):
         if not self.grid.start or not self.grid.goal:
@@ -217,47 +223,49 @@ class VisualizerApp:
         start_time = time.time()
 
         if algo_type == "ASTAR":
-            def terrain_cost(n1, n2):
-                return n2.data.value if isinstance(n2.data, Terrain) else 1.0
-
-            finder = AStarPathfinder(self.grid, cost_function=terrain_cost)
+            finder = AStarPathfinder(self.grid, collect_stats=True)
             print(f"Algorithm: A* (A-Star)")
         elif algo_type == "BFS":
-            finder = BFSPathfinder(self.grid)
+            finder = BFSPathfinder(self.grid, collect_stats=True)
             print(f"Algorithm: Breadth-First Search")
         elif algo_type == "DFS":
-            finder = DFSPathfinder(self.grid)
+            finder = DFSPathfinder(self.grid, collect_stats=True)
             print(f"Algorithm: Depth-First Search")
+        elif algo_type == "DSTAR":
+            if self.dstar is None:
+                self.dstar = DStarLitePathfinder(self.grid, collect_stats=True)
+            finder = self.dstar
+            print(f"Algorithm: D* Lite (incremental)")
 
         if finder:
-            self.path = finder.find_path() or []
+            result = finder.search()
+            self.path = result.path or []
+            self.explored = finder.visited
             end_time = time.time()
             duration_ms = (end_time - start_time) * 1000
 
+            stats = result.stats
             if self.path:
-                exp = sum(1 for n in self.grid.nodes.values() if n.visited)
                 print(f"Time: {duration_ms:.2f} ms")
                 print(f"Path Length: {len(self.path)}")
-                print(f"Nodes Explored: {exp}")
+                print(f"Nodes Explored: {stats.expansions}")
+                print(f"Open Set: {stats.pushes} pushes, {stats.pops} pops ({stats.stale_pops} stale), "
+                      f"peak {stats.max_open_size} entries (~{stats.peak_frontier_bytes / 1024:.1f} KiB)")
+                print(f"Neighbor Calls: {stats.neighbor_calls}, Search Time: {stats.total_ns / 1e6:.2f} ms")
 
-                if algo_type == "ASTAR":
-                    total_cost = 0
-                    for i in range(len(self.path) - 1):
-                        n2 = self.grid.get_node(self.path[i + 1])
-                        cost = n2.data.value if isinstance(n2.data, Terrain) else 1.0
-                        total_cost += cost
-                    print(f"Total Path Cost: {total_cost}")
+                # BFS and DFS ignore terrain, their paths are priced on the same cost layer
+                print(f"Total Path Cost: {result.cost}")
 
                 self.path_draw_progress = 0.0  # Reset animation
             else:
-                print("Result: No Path Found")
+                print(f"Result: No Path Found ({result.failure_reason})")
                 print(f"Time: {duration_ms:.2f} ms")
 
 
     def clear_path(self):
         self.path = []
         self.path_draw_progress = 0.0
-        self.grid.reset_search()
+        self.explored = set()
         print("Path cleared.")
 
 
@@ -288,12 +296,9 @@ class VisualizerApp:
                     if self.grid.start == grid_pos: self.grid.start = None
                     if self.grid.goal == grid_pos: self.grid.goal = None
             elif self.current_tool in ["START", "GOAL", "KEY"]:
+                # no terrain write: a cell without terrain already costs and draws like PLAIN,
+                # writing it would count as a map edit and drop cached searches
                 self.grid.remove_barrier(grid_pos)
-                # Ensure underlying node data exists
-                if self.grid.get_node(grid_pos).data is None:
-                    # Default to PLAIN
-                    default = Terrain.PLAIN
-                    self.grid.get_node(grid_pos).data = default
 
                 if self.current_tool == "START":
                     self.grid.set_start(grid_pos)
@@ -305,7 +310,7 @@ class VisualizerApp:
             elif self.current_tool == "TERRAIN":
                 self.grid.remove_barrier(grid_pos)
                 if not self.grid.has_node(grid_pos): self.grid.add_node(grid_pos)
-                self.grid.get_node(grid_pos).data = self.selected_terrain
+                self.grid.set_terrain(grid_pos, self.selected_terrain, self.selected_terrain.value)
                 changed = True
 
         elif mouse_btns[2]:  # Erase / Right Click
@@ -313,7 +318,7 @@ class VisualizerApp:
             self.grid.remove_key(grid_pos)
             if self.grid.has_node(grid_pos):
                 default = Terrain.PLAIN
-                self.grid.get_node(grid_pos).data = default
+                self.grid.set_terrain(grid_pos, default, default.value)
                 changed = True
 
         # Trigger Pop Animation if changed
@@ -339,8 +344,9 @@ class VisualizerApp:
                 if self.grid.is_barrier(pos):
                     image = self.images.get("BARRIER")
                     color = COLORS["BARRIER"]
-                elif node and isinstance(node.data, Terrain):
-                    key = node.data.name
+                elif node:
+                    # cells opened by placing start, goal or a key have no terrain yet
+                    key = node.data.name if isinstance(node.data, Terrain) else "PLAIN"
                     image = self.images.get(key)
                     # Fallback colors if image fails
                     if key == "PLAIN":
@@ -380,7 +386,7 @@ class VisualizerApp:
                     pygame.draw.rect(self.screen, color, draw_rect, border_radius=4)
 
                 # 3. Explored Overlay (Subtle)
-                if node and node.visited and pos not in self.path:
+                if pos in self.explored and pos not in self.path:
                     # Small circle instead of full rect for cuteness
                     pygame.draw.circle(self.screen, COLORS["EXPLORED"], rect.center, 4)
 
@@ -1,126 +1,347 @@
-from typing import Optional, List, Tuple, Callable
-from pathfinder.grid import Grid
+import logging
+from itertools import islice
+from time import perf_counter, perf_counter_ns
+from typing import Optional, List, Tuple, Callable, Set, Union
+from pathfinder.grid import Grid, Connectivity, SQRT2, step_length
 from pathfinder.node import Node
-from data_structures.min_heap import MinHeap
+from pathfinder.search_state import SearchState
+from pathfinder.stats import SearchStats, CountingFrontier, counting_neighbors
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH, BUDGET_EXHAUSTED
+from pathfinder.path import CompactPath
+from pathfinder.heuristics import make_heuristic
+from data_structures.min_heap import BinaryHeap, make_heap
+from data_structures.bucket_queue import BucketQueue
+
+INF = float("inf")
+logger = logging.getLogger(__name__)
+
+
 class AStarPathfinder:
 
     def __init__(
             self,
             grid: Grid,
             # the cost function simply returns a float value that determines cost of going from one node to another
-            cost_function: Optional[Callable[[Node, Node], float]] = None
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            # open-set backend: "binary", "heapq", "indexed" (decrease-key), "recursive", "bucket"
+            # or "auto" (bucket queue while every f is a small integer, binary heap otherwise)
+            heap: str = "auto",
+            # weighted A*: f = g + weight * h, paths cost at most weight times the optimum
+            weight: float = 1.0,
+            # hard limits for one find_path call, seconds and node expansions
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None,
+            # estimate of the remaining cost: a name from heuristics.HEURISTICS, "scaled_<name>"
+            # (times the cheapest step cost), "alt" (landmarks) or a callable(pos, goal)
+            # octile for diagonal movement, manhattan otherwise
+            heuristic: Union[str, Callable[[Tuple[int, int], Tuple[int, int]], float], None] = None,
+            # movement model, the grid's own by default. Diagonal steps cost sqrt(2) times
+            # the cost of entering the cell
+            connectivity: Optional[Connectivity] = None,
+            # fill self.stats with counters and timings on every find_path call
+            collect_stats: bool = False,
+            # return paths as a CompactPath (flat array of cell indices) instead of a list of tuples
+            compact_path: bool = False
     ):
-        self.grid = grid # the grid to search on
-        self.open_set = MinHeap[Node]() # priority queue for open set
-        self.closed_set: set[Tuple[int, int]] = set() # set of visited positions
+        if weight < 1.0:
+            raise ValueError("weight must be at least 1")
+        self.grid = grid # the grid to search on, never written to by a search
+        self.heap = heap
+        self.weight = weight
+        self.deadline = deadline
+        self.max_expansions = max_expansions
+        self.connectivity = connectivity or grid.connectivity
+        self._diagonal = self.connectivity is not Connectivity.FOUR
+        # cleared once auto mode sees a non-integer or non-monotone f, diagonal steps never are
+        self._integer_costs = weight == 1.0 and not self._diagonal
+        # results of the last finished find_path call, search state itself is per call
+        self.nodes_explored = 0
+        self.visited: Set[Tuple[int, int]] = set()
+        self.suboptimality_bound = INF # path cost <= bound * optimal cost, inf without a path
+        self.budget_exhausted = False
+        self.collect_stats = collect_stats
+        self.stats: Optional[SearchStats] = None # None unless collect_stats
+        if compact_path and grid.cols is None:
+            raise ValueError("compact paths need a grid with a known number of columns")
+        self.compact_path = compact_path
 
-        # default cost function: constant 1.0
+        # without a cost function, costs come from the grid's cost layer (1.0 on grids that
+        # have none) and the search loop reads the layer directly instead of making a call
+        # per edge; a callable is the fallback for costs the layer can't express
+        self._uses_layer = cost_function is None
         if cost_function is None:
-            self.cost_function = lambda n1, n2: 1.0
-        else:
-            self.cost_function = cost_function
+            cost_function = self._layer_cost
+        if self._diagonal:
+            cost_function = self._diagonal_cost(cost_function)
+        self.cost_function = cost_function
+
+        if heuristic is None:
+            heuristic = "octile" if self._diagonal else "manhattan"
+        self.heuristic_function = make_heuristic(heuristic, grid, self.cost_function, self.connectivity,
+                                                 layer_costs=self._uses_layer)
+
+    # cost of entering n2, for code that still goes through cost_function
+    def _layer_cost(self, n1: Node, n2: Node) -> float:
+        return self.grid.get_cost(n2.position)
 
-        # default heuristic: Manhattan distance
-        self.heuristic_function = self._manhattan_distance
+    # cost functions price entering a cell, a diagonal step covers sqrt(2) of that
+    @staticmethod
+    def _diagonal_cost(cost_function: Callable[[Node, Node], float]) -> Callable[[Node, Node], float]:
+        def cost(n1: Node, n2: Node) -> float:
+            return cost_function(n1, n2) * step_length(n1.position, n2.position)
+        return cost
 
-    def _manhattan_distance(self, pos: Tuple[int, int], goal: Tuple[int, int]) -> float:
-        return abs(pos[0] - goal[0]) + abs(pos[1] - goal[1])
+    def _new_open_set(self):
+        if self.heap == "auto":
+            integral = self._integer_costs
+            if integral and self._uses_layer:
+                # the grid knows whether all its costs are integers, no failed push needed
+                integral = self.grid.integral_costs
+            return BucketQueue() if integral else BinaryHeap()
+        return make_heap(self.heap)
 
-    def find_path(self) -> Optional[List[Tuple[int, int]]]:
-        if self.grid.start is None or self.grid.goal is None:
-            print("Error: Start or goal not set!")
-            return None
+    # the open set as the search loop sees it, counted while collecting stats
+    def _instrument(self, open_set, state: SearchState):
+        return open_set if state.stats is None else CountingFrontier(open_set, state.stats)
+
+    def _neighbor_source(self, state: SearchState) -> Callable:
+        get_neighbors = self.grid.get_neighbors
+        return get_neighbors if state.stats is None else counting_neighbors(get_neighbors, state.stats)
+
+    def _fall_back_to_heap(self, open_set, entry: tuple) -> BinaryHeap:
+        # the bucket queue rejected entry (non-integer or non-monotone f): move everything
+        # queued so far into a comparison heap and stay on heaps for the rest of this pathfinder
+        self._integer_costs = False
+        heap = BinaryHeap()
+        for item in open_set.drain():
+            heap.push(item)
+        heap.push(entry)
+        return heap
+
+    # start, goal and keys default to the grid's, passing them lets several
+    # queries share one grid without touching its fields
+    def find_path(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> Optional[List[Tuple[int, int]]]:
+        return self.search(start, goal, keys).path
 
-        full_path = []
+    # find_path with the whole outcome: cost, counters and why it failed. Nothing is written
+    # to stdout, progress goes to this module's logger at debug level.
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        start = self.grid.start if start is None else start
+        goal = self.grid.goal if goal is None else goal
+        keys = self.grid.keys if keys is None else keys
+        if start is None or goal is None:
+            logger.debug("A*: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
+
+        # compact paths are written segment by segment straight from the parent chains
+        full_path = CompactPath(self.grid.cols) if self.compact_path else []
+        total_cost = 0.0
         nodes_explored_total = 0
-        
+        reset_start = perf_counter_ns() if self.collect_stats else 0
+        state = self._new_state()
+        if self.compact_path:
+            state.path = full_path
+        stats = state.stats
+        if stats is not None:
+            stats.reset_ns = perf_counter_ns() - reset_start
+        self.suboptimality_bound = INF
+
         # define waypoints: start, keys, goal
-        waypoints = [self.grid.start] + self.grid.keys + [self.grid.goal]
-        
+        waypoints = [start] + list(keys) + [goal]
+
         for i in range(len(waypoints) - 1):
-            start = waypoints[i]
-            end = waypoints[i+1]
-            
-            segment, explored = self._find_segment(start, end)
+            seg_start = waypoints[i]
+            seg_end = waypoints[i+1]
+
+            if stats is not None:
+                t0 = perf_counter_ns()
+            state.new_segment()
+            state.segments_left = len(waypoints) - 1 - i
+            if stats is not None:
+                t1 = perf_counter_ns()
+                stats.reset_ns += t1 - t0
+            segment, explored = self._find_segment(seg_start, seg_end, state)
+            if stats is not None:
+                stats.segment_ns.append(perf_counter_ns() - t1)
             nodes_explored_total += explored
-            
+
             if segment is None:
-                print(f"A*: No path found between {start} and {end}")
-                return None
-                
-            # if this is not the first segment, remove the first node (duplicate of previous segment's last node)
-            if i > 0:
-                segment = segment[1:]
-                
-            full_path.extend(segment)
-            
-        print(f"A* Path found. Total Length: {len(full_path)}, Total Nodes Explored: {nodes_explored_total}")
-        return full_path
-
-    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int]) -> Tuple[Optional[List[Tuple[int, int]]], int]:
-        # reset grid for fresh search
-        self.grid.reset_search()
-        self.open_set = MinHeap[Node]()
-        self.closed_set = set()
+                self._publish(state, nodes_explored_total)
+                if state.out_of_budget:
+                    logger.debug("A*: search budget used up between %s and %s", seg_start, seg_end)
+                    reason = BUDGET_EXHAUSTED
+                else:
+                    logger.debug("A*: no path found between %s and %s", seg_start, seg_end)
+                    reason = NO_PATH
+                return PathResult(None, INF, nodes_explored_total, reason, state.stats,
+                                  budget_exhausted=state.out_of_budget)
+            total_cost += self._segment_cost(segment, state)
+
+            if segment is full_path:
+                continue # _segment_path already appended it
+            if self.compact_path:
+                full_path.extend_positions(segment)
+            else:
+                # if this is not the first segment, skip the first node (duplicate of previous segment's last node)
+                full_path.extend(islice(segment, 1 if i > 0 else 0, None))
+
+        self._publish(state, nodes_explored_total)
+        self.suboptimality_bound = state.bound
+        logger.debug("A*: path found, length %d, nodes explored %d", len(full_path), nodes_explored_total)
+        return PathResult(full_path, total_cost, nodes_explored_total, None, state.stats, state.bound,
+                          state.out_of_budget)
+
+    def _new_state(self) -> SearchState:
+        deadline = None if self.deadline is None else perf_counter() + self.deadline
+        return SearchState(deadline, self.max_expansions, SearchStats() if self.collect_stats else None)
+
+    # cost of a segment just found: g at its goal where the search keeps one in state.g,
+    # otherwise summed step by step with the cost function
+    def _segment_cost(self, segment: List[Tuple[int, int]], state: SearchState) -> float:
+        cost = state.g.get(segment[-1])
+        if cost is not None:
+            return cost
+        get_node = self.grid.get_node
+        cost_function = self.cost_function
+        return sum(cost_function(get_node(a), get_node(b)) for a, b in zip(segment, segment[1:]))
+
+    # the path of a segment that just reached pos. With compact paths the parent chain is
+    # appended to the call's CompactPath, which is returned, no list of the segment is built
+    def _segment_path(self, state: SearchState, pos: Tuple[int, int]):
+        if state.path is None:
+            return state.reconstruct_path(pos)
+        state.path.extend_chain(state.parent, pos)
+        return state.path
+
+    # results of a finished call onto the pathfinder
+    def _publish(self, state: SearchState, nodes_explored: int) -> None:
+        self.nodes_explored = nodes_explored
+        self.visited = state.visited
+        self.budget_exhausted = state.out_of_budget
+        if state.stats is not None:
+            state.stats.finish(nodes_explored)
+        self.stats = state.stats
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        # all bookkeeping goes into state, the open set is local to this call
+        open_set = self._instrument(self._new_open_set(), state)
+        get_neighbors = self._neighbor_source(state)
+        g = state.g
+        closed = state.closed
+        heuristic = self.heuristic_function
+        weight = self.weight
+        state.bound = max(state.bound, weight)
+        costs = self.grid.costs if self._uses_layer else None
+        get_cost = self.grid.get_cost
+        rows, cols = self.grid.rows, self.grid.cols
+        connectivity = self.connectivity
+        diagonal = self._diagonal
 
         # initialize start node
-        start_node = self.grid.get_node(start_pos)
-        start_node.g = 0
-        start_node.h = self.heuristic_function(start_pos, goal_pos)
-        start_node._recalc_f()
+        g[start_pos] = 0.0
+        state.parent[start_pos] = None
+        h = heuristic(start_pos, goal_pos)
 
-        # add start to open set
-        self.open_set.push(start_node)
+        # entries are plain tuples so the heap compares floats, not Node objects
+        # ties on f go to the lower h (closer to the goal), then to the older entry
+        counter = 0
+        entry = (weight * h, h, counter, start_pos)
+        try:
+            open_set.push(entry)
+        except ValueError:
+            if self.heap != "auto":
+                raise
+            open_set = self._instrument(self._fall_back_to_heap(open_set, entry), state)
 
         nodes_explored = 0
 
         # main A* loop
-        while not self.open_set.is_empty():
-            current = self.open_set.pop()
-            nodes_explored += 1
+        while not open_set.is_empty():
+            position = open_set.pop()[3]
 
-            # skip if already visited
-            if current.position in self.closed_set:
+            # skip stale duplicates of already visited positions
+            if position in closed:
                 continue
 
+            if not state.spend():
+                return None, nodes_explored
+
+            nodes_explored += 1
+
             # mark as visited
-            self.closed_set.add(current.position)
-            current.visited = True
+            closed.add(position)
+            state.visited.add(position)
 
             # check if we reached the goal
-            if current.position == goal_pos:
-                path = current.reconstruct_path()
-                return path, nodes_explored
+            if position == goal_pos:
+                return self._segment_path(state, position), nodes_explored
 
             # explore neighbors
-            neighbors = self.grid.get_neighbors(current.position)
+            neighbors = get_neighbors(position, connectivity)
+            current_g = g[position]
+            current = self.grid.get_node(position) if costs is None else None
 
             for neighbor in neighbors:
+                n_pos = neighbor.position
                 # skip if already visited
-                if neighbor.position in self.closed_set:
+                if n_pos in closed:
                     continue
 
                 # calculate cost to move from current to neighbor
-                move_cost = self.cost_function(current, neighbor)
+                if costs is not None:
+                    if 0 <= n_pos[0] < rows and 0 <= n_pos[1] < cols:
+                        move_cost = costs[n_pos[0] * cols + n_pos[1]]
+                    else:
+                        move_cost = get_cost(n_pos) # a node added outside the layer
+                    if diagonal and n_pos[0] != position[0] and n_pos[1] != position[1]:
+                        move_cost *= SQRT2
+                else:
+                    move_cost = self.cost_function(current, neighbor)
 
                 # calculate tentative g cost
-                tentative_g = current.g + move_cost
+                tentative_g = current_g + move_cost
 
                 # if this path to neighbor is better than any previous one
-                if tentative_g < neighbor.g or neighbor.g == 0:
+                if tentative_g < g.get(n_pos, INF):
                     # update neighbor
-                    neighbor.parent = current
-                    neighbor.g = tentative_g
-                    neighbor.h = self.heuristic_function(neighbor.position, goal_pos)
-                    neighbor.depth = current.depth + 1
-                    neighbor._recalc_f()
+                    state.parent[n_pos] = position
+                    g[n_pos] = tentative_g
+                    h = heuristic(n_pos, goal_pos)
 
-                    # add to open set
-                    self.open_set.push(neighbor)
+                    # add to open set (the indexed heap turns this into a decrease-key)
+                    counter += 1
+                    entry = (tentative_g + weight * h, h, counter, n_pos)
+                    try:
+                        open_set.push(entry)
+                    except ValueError:
+                        if self.heap != "auto":
+                            raise
+                        open_set = self._instrument(self._fall_back_to_heap(open_set, entry), state)
 
         return None, nodes_explored
 
 
-
-
-
+# A* with a zero heuristic, i.e. Dijkstra's algorithm. With integer terrain costs
+# the "auto" open set runs it as Dial's algorithm on a bucket queue.
+class DijkstraPathfinder(AStarPathfinder):
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            heap: str = "auto",
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False,
+            compact_path: bool = False
+    ):
+        super().__init__(grid, cost_function, heap, heuristic="zero", connectivity=connectivity,
+                         collect_stats=collect_stats, compact_path=compact_path)
@@ -1,52 +1,96 @@
+import logging
+from time import perf_counter_ns
 from typing import Optional, List, Tuple, Set
-from pathfinder.grid import Grid
-from pathfinder.node import Node
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.search_state import SearchState
+from pathfinder.stats import SearchStats, CountingFrontier, counting_neighbors
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH, path_cost
 from data_structures.queue import Queue
 
+logger = logging.getLogger(__name__)
+
 class BFSPathfinder:
-    def __init__(self, grid: Grid):
+    # connectivity: movement model for this pathfinder, the grid's own by default
+    # collect_stats: fill self.stats with counters and timings on every find_path call
+    def __init__(self, grid: Grid, connectivity: Optional[Connectivity] = None, collect_stats: bool = False):
         self.grid = grid
-        self.queue = Queue[Node]()
+        self.connectivity = connectivity or grid.connectivity
+        self.collect_stats = collect_stats
+        # results of the last finished find_path call, search state itself is per call
         self.visited: Set[Tuple[int, int]] = set()
+        self.nodes_explored = 0
+        self.stats: Optional[SearchStats] = None
+
+    def find_path(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None # BFS ignores keys, kept for a uniform signature
+    ) -> Optional[List[Tuple[int, int]]]:
+        return self.search(start, goal, keys).path
 
-    def find_path(self) -> Optional[List[Tuple[int, int]]]:
+    # find_path with the whole outcome, cost is the path's cost on the grid's cost layer
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        start = self.grid.start if start is None else start
+        goal = self.grid.goal if goal is None else goal
         # check if start and goal are set
-        if self.grid.start is None or self.grid.goal is None:
-            print("Error: Start or goal not set!")
-            return None
+        if start is None or goal is None:
+            logger.debug("BFS: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
 
-        # clear everything for a fresh search
-        self.grid.reset_search()
-        self.queue.clear()
-        self.visited.clear()
+        # fresh state for this call only, the grid is never written to
+        reset_start = perf_counter_ns() if self.collect_stats else 0
+        state = SearchState(stats=SearchStats() if self.collect_stats else None)
+        queue = Queue[Tuple[int, int]]()
+        get_neighbors = self.grid.get_neighbors
+        stats = state.stats
+        if stats is not None:
+            queue = CountingFrontier(queue, stats)
+            get_neighbors = counting_neighbors(get_neighbors, stats)
+            stats.reset_ns = perf_counter_ns() - reset_start
+        search_start = perf_counter_ns() if stats is not None else 0
 
-        # add the start node to queue and mark as visited
-        start_node = self.grid.get_node(self.grid.start)
-        start_node.visited = True
-        self.visited.add(start_node.position)
-        self.queue.enqueue(start_node)
+        # add the start to queue and mark as visited
+        state.parent[start] = None
+        state.visited.add(start)
+        queue.enqueue(start)
 
         nodes_explored = 0
 
         # keep exploring until queue is empty
-        while not self.queue.is_empty():
-            current = self.queue.dequeue()
+        while not queue.is_empty():
+            current = queue.dequeue()
             nodes_explored += 1
 
             # check if we reached the goal
-            if current.position == self.grid.goal:
-                path = current.reconstruct_path()
-                print(f"BFS Path found. Length: {len(path)}, Nodes explored: {nodes_explored}")
-                return path
+            if current == goal:
+                path = state.reconstruct_path(current)
+                self._publish(state, nodes_explored, search_start)
+                logger.debug("BFS: path found, length %d, nodes explored %d", len(path), nodes_explored)
+                return PathResult(path, path_cost(self.grid, path), nodes_explored, None, state.stats)
 
             # add all unvisited neighbors to queue
-            for neighbor in self.grid.get_neighbors(current.position):
-                if neighbor.position not in self.visited:
-                    self.visited.add(neighbor.position)
-                    neighbor.parent = current
-                    neighbor.visited = True
-                    neighbor.depth = current.depth + 1
-                    self.queue.enqueue(neighbor)
-
-        print(f"BFS: No path found. Nodes explored: {nodes_explored}")
-        return None
\ No newline at end of file
+            for neighbor in get_neighbors(current, self.connectivity):
+                n_pos = neighbor.position
+                if n_pos not in state.visited:
+                    state.visited.add(n_pos)
+                    state.parent[n_pos] = current
+                    queue.enqueue(n_pos)
+
+        self._publish(state, nodes_explored, search_start)
+        logger.debug("BFS: no path found, nodes explored %d", nodes_explored)
+        return PathResult(None, nodes_explored=nodes_explored, failure_reason=NO_PATH, stats=state.stats)
+
+    # results of a finished call onto the pathfinder
+    def _publish(self, state: SearchState, nodes_explored: int, search_start: int) -> None:
+        self.nodes_explored = nodes_explored
+        self.visited = state.visited
+        if state.stats is not None:
+            state.stats.segment_ns.append(perf_counter_ns() - search_start)
+            state.stats.finish(nodes_explored)
+        self.stats = state.stats
@@ -1,54 +1,99 @@
+import logging
+from time import perf_counter_ns
 from typing import Optional, List, Tuple, Set
-from pathfinder.grid import Grid
-from pathfinder.node import Node
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.search_state import SearchState
+from pathfinder.stats import SearchStats, CountingFrontier, counting_neighbors
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH, path_cost
 from data_structures.stack import Stack
 
+logger = logging.getLogger(__name__)
+
 
 class DFSPathfinder:
-    def __init__(self, grid: Grid):
+    # connectivity: movement model for this pathfinder, the grid's own by default
+    # collect_stats: fill self.stats with counters and timings on every find_path call
+    def __init__(self, grid: Grid, connectivity: Optional[Connectivity] = None, collect_stats: bool = False):
         self.grid = grid
-        self.stack = Stack[Node]()
+        self.connectivity = connectivity or grid.connectivity
+        self.collect_stats = collect_stats
+        # results of the last finished find_path call, search state itself is per call
         self.visited: Set[Tuple[int, int]] = set()
+        self.nodes_explored = 0
+        self.stats: Optional[SearchStats] = None
 
-    def find_path(self) -> Optional[List[Tuple[int, int]]]:
-        if self.grid.start is None or self.grid.goal is None:
-            print("Error: Start or goal not set!")
-            return None
+    def find_path(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None # DFS ignores keys, kept for a uniform signature
+    ) -> Optional[List[Tuple[int, int]]]:
+        return self.search(start, goal, keys).path
 
-        # Reset grid state
-        self.grid.reset_search()
-        self.stack.clear()
-        self.visited.clear()
+    # find_path with the whole outcome, cost is the path's cost on the grid's cost layer
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        start = self.grid.start if start is None else start
+        goal = self.grid.goal if goal is None else goal
+        if start is None or goal is None:
+            logger.debug("DFS: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
 
-        start_node = self.grid.get_node(self.grid.start)
-        self.stack.push(start_node)
+        # fresh state for this call only, the grid is never written to
+        reset_start = perf_counter_ns() if self.collect_stats else 0
+        state = SearchState(stats=SearchStats() if self.collect_stats else None)
+        # stack entries are (position, the position it was pushed from)
+        stack = Stack[Tuple[Tuple[int, int], Optional[Tuple[int, int]]]]()
+        get_neighbors = self.grid.get_neighbors
+        stats = state.stats
+        if stats is not None:
+            stack = CountingFrontier(stack, stats)
+            get_neighbors = counting_neighbors(get_neighbors, stats)
+            stats.reset_ns = perf_counter_ns() - reset_start
+        search_start = perf_counter_ns() if stats is not None else 0
+        stack.push((start, None))
 
         nodes_explored = 0
 
-        while not self.stack.is_empty():
-            current = self.stack.pop()
+        while not stack.is_empty():
+            current, parent = stack.pop()
 
-            if current.position in self.visited:
+            if current in state.visited:
                 continue
 
-            self.visited.add(current.position)
-            current.visited = True
+            state.visited.add(current)
+            # the parent is fixed when a cell is expanded, later pushes must not rewire it
+            state.parent[current] = parent
             nodes_explored += 1
 
-            if current.position == self.grid.goal:
-                path = current.reconstruct_path()
-                print(f"DFS Path found. Length: {len(path)}, Nodes explored: {nodes_explored}")
-                return path
+            if current == goal:
+                path = state.reconstruct_path(current)
+                self._publish(state, nodes_explored, search_start)
+                logger.debug("DFS: path found, length %d, nodes explored %d", len(path), nodes_explored)
+                return PathResult(path, path_cost(self.grid, path), nodes_explored, None, state.stats)
 
             # Get neighbors
-            neighbors = self.grid.get_neighbors(current.position)
+            neighbors = get_neighbors(current, self.connectivity)
 
             # Note: Iterating in reverse order ensures the first neighbor 
             # is popped first from the stack (optional optimization for visuals)
             for neighbor in neighbors:
-                if neighbor.position not in self.visited:
-                    neighbor.parent = current
-                    self.stack.push(neighbor)
+                if neighbor.position not in state.visited:
+                    stack.push((neighbor.position, current))
+
+        self._publish(state, nodes_explored, search_start)
+        logger.debug("DFS: no path found, nodes explored %d", nodes_explored)
+        return PathResult(None, nodes_explored=nodes_explored, failure_reason=NO_PATH, stats=state.stats)
 
-        print(f"DFS: No path found. Nodes explored: {nodes_explored}")
-        return None
\ No newline at end of file
+    # results of a finished call onto the pathfinder
+    def _publish(self, state: SearchState, nodes_explored: int, search_start: int) -> None:
+        self.nodes_explored = nodes_explored
+        self.visited = state.visited
+        if state.stats is not None:
+            state.stats.segment_ns.append(perf_counter_ns() - search_start)
+            state.stats.finish(nodes_explored)
+        self.stats = state.stats
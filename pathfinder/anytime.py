@@ -0,0 +1,174 @@
+from time import perf_counter
+from typing import Optional, List, Tuple, Callable, Set
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.result import PathResult
+from data_structures.min_heap import BinaryHeap
+
+Pos = Tuple[int, int]
+INF = float("inf")
+
+
+# ARA* (anytime repairing A*): a weighted A* search with a large weight finds a first path
+# quickly, then the weight is lowered step by step and each new search reuses the g values
+# of the previous one, only re-expanding cells whose cost improved (the INCONS set).
+# It stops at weight 1 (optimal) or when the deadline / expansion budget runs out, and
+# returns the best path so far. suboptimality_bound reports the factor that path is proven
+# to be within, from min(weight, cost / lowest f still queued).
+class AnytimeAStarPathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            initial_weight: float = 3.0,
+            weight_step: float = 0.5,
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None,
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False
+    ):
+        super().__init__(grid, cost_function, "binary", initial_weight, deadline, max_expansions,
+                         connectivity=connectivity, collect_stats=collect_stats)
+        self.weight_step = weight_step
+        self.improvements = 0 # solutions published in the last search call
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        self.improvements = 0
+        return super().search(start, goal, keys)
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        g = state.g
+        g[start_pos] = 0.0
+        state.parent[start_pos] = None
+        queued: Set[Pos] = {start_pos} # cells on the open list, heap entries for anything else are stale
+        incons: Set[Pos] = set() # improved after being expanded in this round
+        weight = self.weight
+
+        open_set = self._queue(queued, goal_pos, weight, state)
+        explored, done = self._improve_path(goal_pos, weight, open_set, queued, incons, state, None, None)
+        if g.get(goal_pos, INF) == INF:
+            return None, explored
+
+        best_path = state.reconstruct_path(goal_pos)
+        best_cost = g[goal_pos]
+        self.improvements += 1
+        bound = self._bound(goal_pos, weight, queued | incons, g) if done else INF
+
+        # the first path is in: improvement rounds share what is left of the budget with
+        # the segments still to come, so one segment can't starve the rest
+        soft_deadline = None
+        if state.deadline is not None:
+            now = perf_counter()
+            soft_deadline = now + max(0.0, state.deadline - now) / state.segments_left
+        soft_expansions = None
+        if state.expansions_left is not None:
+            soft_expansions = state.expansions_left // state.segments_left
+        first_explored = explored
+
+        while done and bound > 1.0 and weight > 1.0:
+            weight = max(1.0, weight - self.weight_step)
+            # INCONS cells go back on the open list, every key is recomputed with the new weight
+            queued |= incons
+            incons = set()
+            state.closed = set()
+            open_set = self._queue(queued, goal_pos, weight, state)
+            budget = None if soft_expansions is None else soft_expansions - (explored - first_explored)
+            more, done = self._improve_path(goal_pos, weight, open_set, queued, incons, state, soft_deadline, budget)
+            explored += more
+            if g[goal_pos] < best_cost:
+                # the parent chain always holds a real path of cost <= g, even mid-round
+                best_path = state.reconstruct_path(goal_pos)
+                best_cost = g[goal_pos]
+                self.improvements += 1
+            if done:
+                bound = self._bound(goal_pos, weight, queued | incons, g)
+
+        state.bound = max(state.bound, bound)
+        return best_path, explored
+
+    def _queue(self, cells: Set[Pos], goal_pos: Pos, weight: float, state: SearchState) -> BinaryHeap:
+        heuristic = self.heuristic_function
+        g = state.g
+        open_set = self._instrument(BinaryHeap(), state)
+        for counter, pos in enumerate(cells):
+            h = heuristic(pos, goal_pos)
+            open_set.push((g[pos] + weight * h, h, counter, pos))
+        return open_set
+
+    # lowest possible cost of a better path is min(g + h) over the cells still to expand
+    def _bound(self, goal_pos: Pos, weight: float, frontier: Set[Pos], g) -> float:
+        cost = g[goal_pos]
+        heuristic = self.heuristic_function
+        lower = min((g[pos] + heuristic(pos, goal_pos) for pos in frontier), default=INF)
+        if cost <= lower:
+            return 1.0
+        return min(weight, cost / lower) if lower > 0 else weight
+
+    # one weighted A* round, returns (expansions, finished). It finishes once nothing queued
+    # can lead to a cheaper goal under the current weight, and stops early on the call's
+    # hard budget (state.spend) or on this round's soft deadline / expansion share.
+    def _improve_path(
+            self,
+            goal_pos: Pos,
+            weight: float,
+            open_set: BinaryHeap,
+            queued: Set[Pos],
+            incons: Set[Pos],
+            state: SearchState,
+            soft_deadline: Optional[float],
+            soft_expansions: Optional[int]
+    ) -> Tuple[int, bool]:
+        grid = self.grid
+        g = state.g
+        parent = state.parent
+        closed = state.closed
+        heuristic = self.heuristic_function
+        get_neighbors = self._neighbor_source(state)
+        counter = len(open_set)
+        explored = 0
+
+        while not open_set.is_empty():
+            f, _, _, position = open_set.peek()
+            if position not in queued:
+                open_set.pop() # stale duplicate
+                continue
+            if g.get(goal_pos, INF) <= f:
+                return explored, True
+            if soft_expansions is not None and explored >= soft_expansions:
+                return explored, False
+            if soft_deadline is not None and perf_counter() > soft_deadline:
+                return explored, False
+            if not state.spend():
+                return explored, False
+
+            open_set.pop()
+            queued.discard(position)
+            closed.add(position)
+            state.visited.add(position)
+            explored += 1
+
+            current = grid.get_node(position)
+            current_g = g[position]
+            for neighbor in get_neighbors(position, self.connectivity):
+                n_pos = neighbor.position
+                tentative_g = current_g + self.cost_function(current, neighbor)
+                if tentative_g < g.get(n_pos, INF):
+                    g[n_pos] = tentative_g
+                    parent[n_pos] = position
+                    if n_pos in closed:
+                        incons.add(n_pos) # revisited in the next round, not this one
+                    else:
+                        queued.add(n_pos)
+                        h = heuristic(n_pos, goal_pos)
+                        counter += 1
+                        open_set.push((tentative_g + weight * h, h, counter, n_pos))
+
+        return explored, True
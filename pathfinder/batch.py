@@ -0,0 +1,178 @@
+import os
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, List, Tuple, Callable, Union, Sequence, Dict, Any
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.compact_grid import CompactGrid
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.path import CompactPath
+
+Pos = Tuple[int, int]
+# (start, goal) or (start, goal, keys)
+Query = Union[Tuple[Pos, Pos], Tuple[Pos, Pos, Sequence[Pos]]]
+# what a worker needs to find the shared map: (segment name, rows, cols)
+MapHandle = Tuple[str, int, int]
+
+
+# ---- worker side ----
+
+# the one shared map segment this process is attached to: (name, shm, pathfinder over it)
+_attached: Optional[Tuple[str, shared_memory.SharedMemory, AStarPathfinder]] = None
+
+
+# the A* every batch query runs, in a worker or in this process. The heuristic is manhattan
+# scaled by the cheapest cell, so maps where nothing costs less than 1 still get guidance.
+# Paths come back as CompactPaths, which pickle as one flat array.
+def _make_finder(grid: CompactGrid) -> AStarPathfinder:
+    return AStarPathfinder(grid, heuristic="scaled_manhattan", compact_path=True)
+
+
+def _attach(name: str, rows: int, cols: int) -> AStarPathfinder:
+    global _attached
+    if _attached is None or _attached[0] != name:
+        if _attached is not None:
+            grid = _attached[2].grid
+            grid.costs.release()
+            grid.walkable.release()
+            _attached[1].close()
+        shm = shared_memory.SharedMemory(name=name)
+        size = rows * cols
+        # costs first so the float view starts on an aligned offset
+        costs = shm.buf[:8 * size].cast("d")
+        walkable = shm.buf[8 * size:9 * size]
+        _attached = (name, shm, _make_finder(CompactGrid.from_buffers(rows, cols, costs, walkable)))
+    return _attached[2]
+
+
+def _solve(finder: AStarPathfinder, query: Query) -> Optional[CompactPath]:
+    start, goal = query[0], query[1]
+    keys = list(query[2]) if len(query) > 2 else []
+    in_bounds = finder.grid.in_bounds
+    if not all(in_bounds(pos) for pos in [start, goal] + keys):
+        return None
+    return finder.find_path(start, goal, keys)
+
+
+def _run_chunk(handle: MapHandle, queries: List[Query]) -> List[Optional[CompactPath]]:
+    name, rows, cols = handle
+    finder = _attach(name, rows, cols)
+    return [_solve(finder, query) for query in queries]
+
+
+# ---- parent side ----
+
+def _positions(path: Optional[CompactPath]) -> Optional[List[Pos]]:
+    return None if path is None else path.positions()
+
+
+# what a BatchPathfinder holds outside its own memory: "shm" (the shared map) and "pool".
+# Kept apart from the instance so its finalizer can free them without keeping it alive.
+def _free_segment(resources: Dict[str, Any]) -> None:
+    shm = resources.pop("shm", None)
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+
+
+def _free_all(resources: Dict[str, Any]) -> None:
+    pool = resources.pop("pool", None)
+    if pool is not None:
+        pool.shutdown()
+    _free_segment(resources)
+
+
+# runs many (start, goal[, keys]) queries against one map. The map is copied once per grid
+# version into a shared memory segment (terrain costs as doubles, then one walkable byte
+# per cell) that the pool workers attach to read-only, so only the queries and the paths
+# travel between processes. Each query keeps its search state to itself, the grid's
+# start/goal/keys and node state are never touched.
+# Use it as a context manager or call close(); one that is just dropped still frees its
+# segment when it is collected or at interpreter exit, through a finalizer.
+# cost_function(n1, n2) is the cost of stepping from n1 into n2 like everywhere else, but
+# the shared map keeps one cost per cell, so only the entered cell may matter: each cell is
+# priced once as cost_function(node, node). Without one the grid's cost layer is used.
+class BatchPathfinder:
+
+    def __init__(
+            self,
+            grid: Union[Grid, CompactGrid],
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            workers: Optional[int] = None
+    ):
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("batch queries need a grid with known dimensions")
+        if grid.connectivity is not Connectivity.FOUR:
+            raise ValueError("batch queries only support 4-connected movement")
+        self.grid = grid
+        self.cost_function = cost_function
+        self.workers = workers or os.cpu_count() or 1
+        self._compact: Optional[CompactGrid] = None
+        self._finder: Optional[AStarPathfinder] = None # searches the snapshot in this process
+        self._version = -1
+        self._handle: Optional[MapHandle] = None
+        self._resources: Dict[str, Any] = {}
+        # the finalizer stays armed after close(), a later find_paths may allocate again
+        weakref.finalize(self, _free_all, self._resources)
+
+    # shut the pool down and free the shared map
+    def close(self) -> None:
+        _free_all(self._resources)
+
+    def __enter__(self) -> "BatchPathfinder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # flat copy of the current map, rebuilt when the grid changed
+    def _snapshot(self) -> CompactGrid:
+        if self._compact is None or self._version != self.grid.version:
+            grid = self.grid
+            if isinstance(grid, CompactGrid) and self.cost_function is None:
+                # copy the layers, the live grid may be edited while a batch runs on it
+                self._compact = CompactGrid.from_buffers(grid.rows, grid.cols, array("d", grid.costs),
+                                                         bytearray(grid.walkable))
+            else:
+                cost_function = self.cost_function
+                entry_cost = None if cost_function is None else lambda node: cost_function(node, node)
+                self._compact = CompactGrid.from_grid(grid, entry_cost)
+            self._finder = _make_finder(self._compact)
+            self._version = grid.version
+            _free_segment(self._resources)
+            self._handle = None
+        return self._compact
+
+    # put the snapshot into a shared segment for the pool workers
+    def _publish(self) -> MapHandle:
+        compact = self._snapshot()
+        if self._handle is None:
+            size = compact.size
+            # workers still on an old segment keep their mapping until they attach the new one
+            shm = shared_memory.SharedMemory(create=True, size=max(1, 9 * size))
+            shm.buf[:8 * size] = compact.costs.tobytes()
+            shm.buf[8 * size:9 * size] = bytes(compact.walkable)
+            self._resources["shm"] = shm
+            self._handle = (shm.name, compact.rows, compact.cols)
+        return self._handle
+
+    def find_paths(self, queries: Sequence[Query]) -> List[Optional[List[Pos]]]:
+        queries = list(queries)
+        if self.workers <= 1 or len(queries) < 2:
+            # not worth a pool, search the snapshot in this process
+            self._snapshot()
+            return [_positions(_solve(self._finder, query)) for query in queries]
+
+        handle = self._publish()
+        pool = self._resources.get("pool")
+        if pool is None:
+            pool = self._resources["pool"] = ProcessPoolExecutor(max_workers=self.workers)
+        # a few chunks per worker keeps them busy when query costs differ a lot
+        chunk = max(1, -(-len(queries) // (self.workers * 4)))
+        chunks = [queries[i:i + chunk] for i in range(0, len(queries), chunk)]
+        results: List[Optional[List[Pos]]] = []
+        for part in pool.map(_run_chunk, [handle] * len(chunks), chunks):
+            results.extend(_positions(path) for path in part)
+        return results
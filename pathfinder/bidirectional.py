@@ -0,0 +1,223 @@
+import logging
+from time import perf_counter_ns
+from typing import Optional, List, Tuple, Dict, Callable, Union
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.BFS import BFSPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.stats import SearchStats, counting_neighbors
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH, path_cost
+
+logger = logging.getLogger(__name__)
+
+
+# walk a parent dict from pos back to the root of that search
+def _walk_parents(parents: Dict[Tuple[int, int], Optional[Tuple[int, int]]], pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+    path = []
+    while pos is not None:
+        path.append(pos)
+        pos = parents[pos]
+    return path
+
+
+# join the two half paths at the meeting cell: start .. meet .. goal
+def _join(forward_parents, backward_parents, meet: Tuple[int, int]) -> List[Tuple[int, int]]:
+    path = _walk_parents(forward_parents, meet)
+    path.reverse()
+    path.extend(_walk_parents(backward_parents, meet)[1:])
+    return path
+
+
+# bidirectional A*: one frontier grows from the segment start, one from the segment goal,
+# waypoints, cost function and heuristic are the ones from AStarPathfinder. The deadline
+# and expansion budget cover the expansions of both frontiers, both open sets use the heap
+# backend. Weighted search isn't supported, the stopping rule needs f to be a lower bound
+# on both sides.
+class BidirectionalAStarPathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            heap: str = "auto",
+            weight: float = 1.0,
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None,
+            heuristic: Union[str, Callable[[Tuple[int, int], Tuple[int, int]], float], None] = None,
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False,
+            compact_path: bool = False
+    ):
+        if weight != 1.0:
+            raise ValueError("bidirectional A* does not support weighted search")
+        super().__init__(grid, cost_function, heap, weight, deadline, max_expansions, heuristic, connectivity,
+                         collect_stats, compact_path)
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        grid = self.grid
+        heuristic = self.heuristic_function
+        cost = self.cost_function
+        get_neighbors = self._neighbor_source(state)
+
+        if start_pos == goal_pos:
+            state.visited.add(start_pos)
+            return [start_pos], 1
+
+        # per direction: g costs, parents, closed set and open heap of (f, h, counter, position)
+        # the backward search walks edges in reverse, so it pays cost(neighbor, current)
+        g = ({start_pos: 0.0}, {goal_pos: 0.0})
+        parents = ({start_pos: None}, {goal_pos: None})
+        closed = (set(), set())
+        targets = (goal_pos, start_pos)
+        heaps = [self._instrument(self._new_open_set(), state), self._instrument(self._new_open_set(), state)]
+
+        def push(side: int, entry: tuple) -> None:
+            try:
+                heaps[side].push(entry)
+            except ValueError:
+                if self.heap != "auto":
+                    raise
+                heaps[side] = self._instrument(self._fall_back_to_heap(heaps[side], entry), state)
+
+        h0 = heuristic(start_pos, goal_pos)
+        push(0, (h0, h0, 0, start_pos))
+        push(1, (h0, h0, 0, goal_pos))
+
+        best = float("inf") # cost of the best start-goal connection seen so far
+        meet: Optional[Tuple[int, int]] = None
+        counter = 0
+        nodes_explored = 0
+
+        while not heaps[0].is_empty() and not heaps[1].is_empty():
+            # a cheaper path would need f <= its cost on both frontiers, so once either
+            # frontier's smallest f reaches the best connection nothing can beat it
+            if max(heaps[0].peek()[0], heaps[1].peek()[0]) >= best:
+                break
+
+            # expand the smaller frontier to keep the two searches balanced
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            other = 1 - side
+            position = heaps[side].pop()[3]
+            if position in closed[side]:
+                continue # stale duplicate
+            if not state.spend():
+                return None, nodes_explored
+            closed[side].add(position)
+            nodes_explored += 1
+            current = grid.get_node(position)
+            state.visited.add(position) # both directions share one set, it is only for display
+
+            g_side = g[side]
+            g_other = g[other]
+            target = targets[side]
+            current_g = g_side[position]
+
+            for neighbor in get_neighbors(position, self.connectivity):
+                n_pos = neighbor.position
+                if n_pos in closed[side]:
+                    continue
+                if side == 0:
+                    tentative_g = current_g + cost(current, neighbor)
+                else:
+                    tentative_g = current_g + cost(neighbor, current)
+
+                if tentative_g < g_side.get(n_pos, float("inf")):
+                    g_side[n_pos] = tentative_g
+                    parents[side][n_pos] = position
+                    # estimates run along the walking direction, which matters for ALT
+                    h = heuristic(n_pos, target) if side == 0 else heuristic(target, n_pos)
+                    counter += 1
+                    push(side, (tentative_g + h, h, counter, n_pos))
+
+                    # the other search already reached this cell: candidate connection
+                    if n_pos in g_other and tentative_g + g_other[n_pos] < best:
+                        best = tentative_g + g_other[n_pos]
+                        meet = n_pos
+
+        if meet is None:
+            return None, nodes_explored
+        return _join(parents[0], parents[1], meet), nodes_explored
+
+
+# bidirectional BFS: expands whole layers, always from the smaller frontier
+class BidirectionalBFSPathfinder(BFSPathfinder):
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        grid = self.grid
+        start = grid.start if start is None else start
+        goal = grid.goal if goal is None else goal
+        if start is None or goal is None:
+            logger.debug("Bidirectional BFS: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
+
+        nodes_explored = 0
+        visited = {start, goal}
+        stats = SearchStats() if self.collect_stats else None
+        get_neighbors = grid.get_neighbors if stats is None else counting_neighbors(grid.get_neighbors, stats)
+        search_start = perf_counter_ns() if stats is not None else 0
+
+        # per direction: depth of every discovered cell, parents and the current layer
+        depth = ({start: 0}, {goal: 0})
+        parents = ({start: None}, {goal: None})
+        frontier = ([start], [goal])
+
+        meet: Optional[Tuple[int, int]] = start if start == goal else None
+
+        while meet is None and frontier[0] and frontier[1]:
+            side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+            other = 1 - side
+            depth_side = depth[side]
+            depth_other = depth[other]
+            parents_side = parents[side]
+            best = float("inf")
+            next_layer = []
+
+            # finish the whole layer before deciding, a later cell may meet the other
+            # search at a shallower depth
+            for position in frontier[side]:
+                nodes_explored += 1
+                layer_depth = depth_side[position] + 1
+                for neighbor in get_neighbors(position, self.connectivity):
+                    n_pos = neighbor.position
+                    if n_pos in depth_side:
+                        continue
+                    depth_side[n_pos] = layer_depth
+                    parents_side[n_pos] = position
+                    visited.add(n_pos)
+                    next_layer.append(n_pos)
+                    if n_pos in depth_other and layer_depth + depth_other[n_pos] < best:
+                        best = layer_depth + depth_other[n_pos]
+                        meet = n_pos
+
+            if stats is not None:
+                # a layer is pushed and popped as a whole, the frontier is both layers
+                stats.pushes += len(next_layer)
+                stats.pops += len(frontier[side])
+                size = len(next_layer) + len(frontier[other])
+                if size > stats.max_open_size:
+                    stats.max_open_size = size
+                    stats.peak_frontier_bytes = size * 8 # list slots, the cells are in the depth dicts
+            if side == 0:
+                frontier = (next_layer, frontier[1])
+            else:
+                frontier = (frontier[0], next_layer)
+
+        self.nodes_explored = nodes_explored
+        self.visited = visited
+        if stats is not None:
+            stats.segment_ns.append(perf_counter_ns() - search_start)
+            stats.finish(nodes_explored)
+        self.stats = stats
+        if meet is None:
+            logger.debug("Bidirectional BFS: no path found, nodes explored %d", nodes_explored)
+            return PathResult(None, nodes_explored=nodes_explored, failure_reason=NO_PATH, stats=stats)
+
+        path = _join(parents[0], parents[1], meet)
+        logger.debug("Bidirectional BFS: path found, length %d, nodes explored %d", len(path), nodes_explored)
+        return PathResult(path, path_cost(grid, path), nodes_explored, None, stats)
@@ -0,0 +1,220 @@
+import logging
+from array import array
+from itertools import compress
+from time import perf_counter_ns
+from typing import Optional, List, Tuple, Set, Union
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.compact_grid import CompactGrid
+from pathfinder.BFS import BFSPathfinder
+from pathfinder.stats import SearchStats
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH, path_cost
+
+Pos = Tuple[int, int]
+logger = logging.getLogger(__name__)
+
+# translation tables between one byte per cell (0/1) and the "0"/"1" digits of a bitboard
+_CELLS_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_DIGITS_TO_CELLS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+# bitboards: a whole grid layer packed into one Python int, bit r * cols + c is cell (r, c).
+# shifts and ands on these run in C over 30 bits per digit, so one frontier step costs a
+# handful of big-int operations instead of a Python loop over every cell of the frontier.
+def cells_to_board(cells: bytes) -> int:
+    if not cells:
+        return 0
+    return int(cells[::-1].translate(_CELLS_TO_DIGITS), 2)
+
+
+def board_to_cells(board: int, size: int) -> bytes:
+    return format(board, "b").zfill(size)[::-1].encode("ascii").translate(_DIGITS_TO_CELLS)
+
+
+def walkable_board(grid: Union[Grid, CompactGrid]) -> int:
+    if isinstance(grid, CompactGrid):
+        return cells_to_board(bytes(grid.walkable))
+    valid = grid.is_valid
+    cols = grid.cols
+    return cells_to_board(bytes(valid(divmod(i, cols)) for i in range(grid.rows * cols)))
+
+
+# result of one flood fill: BFS distance of every cell from the source.
+# distances are kept as bit planes (plane k holds bit k of each distance), so the field
+# costs a few bitboards no matter how many layers the fill had. The per-cell array is
+# only decoded when someone asks for distances, paths are walked on the planes directly.
+class DistanceField:
+
+    def __init__(self, rows: int, cols: int, source: Pos, reached: int, planes: List[int], layers: int):
+        self.rows = rows
+        self.cols = cols
+        self.source = source
+        self.reached = reached # bitboard of every cell the fill got to
+        self.planes = planes
+        self.layers = layers # number of frontier steps, the largest distance + 1
+        self._distances: Optional[array] = None
+
+    @property
+    def reached_count(self) -> int:
+        return self.reached.bit_count()
+
+    # row-major array('i') of distances, -1 for cells the fill never reached
+    @property
+    def distances(self) -> array:
+        if self._distances is None:
+            self._distances = self._decode()
+        return self._distances
+
+    def _decode(self) -> array:
+        # spread every plane to one 32 bit lane per cell and add the planes up as one big int,
+        # lanes never carry into each other since no distance comes near 2 ** 31
+        size = self.rows * self.cols
+        lanes = bytearray(4 * size)
+        total = 0
+        for k, plane in enumerate(self.planes):
+            lanes[0::4] = board_to_cells(plane, size)
+            total += int.from_bytes(lanes, "little") << k
+        # unreached cells are still 0, add 0xFFFFFFFF to turn them into -1
+        lanes[0::4] = board_to_cells(~self.reached & ((1 << size) - 1), size)
+        total += int.from_bytes(lanes, "little") * 0xFFFFFFFF
+
+        distances = array("i")
+        distances.frombytes(total.to_bytes(4 * size, "little"))
+        return distances
+
+    def distance(self, pos: Pos) -> Optional[int]:
+        if not (0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols):
+            return None
+        d = self.distances[pos[0] * self.cols + pos[1]]
+        return None if d < 0 else d
+
+    # cells the fill got to, as positions
+    def reached_cells(self) -> Set[Pos]:
+        cols = self.cols
+        cells = board_to_cells(self.reached, self.rows * cols)
+        return {divmod(i, cols) for i in compress(range(len(cells)), cells)}
+
+    # gradient descent: from pos keep stepping to a neighbor one layer closer to the source.
+    # On a 4-connected grid the neighbors of a cell at distance d are all at d - 1 or d + 1,
+    # so the two lowest bit planes tell the previous layer apart and the walk reads only
+    # those and the reached board, a few bits per step, without decoding the whole field
+    def path_to(self, pos: Pos) -> Optional[List[Pos]]:
+        rows, cols = self.rows, self.cols
+        if not (0 <= pos[0] < rows and 0 <= pos[1] < cols):
+            return None
+        idx = pos[0] * cols + pos[1]
+        if not (self.reached >> idx) & 1:
+            return None
+        d = sum(((plane >> idx) & 1) << k for k, plane in enumerate(self.planes))
+
+        size = (rows * cols + 7) // 8
+        reached = self.reached.to_bytes(size, "little")
+        low = [plane.to_bytes(size, "little") for plane in self.planes[:2]]
+        low += [bytes(size)] * (2 - len(low))
+        plane0, plane1 = low
+        path = [pos]
+        r, c = pos
+        while d > 0:
+            d -= 1
+            layer = d & 3
+            # same neighbor order as Grid.get_neighbors: up, down, left, right
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols:
+                    i = nr * cols + nc
+                    byte, bit = i >> 3, i & 7
+                    if (reached[byte] >> bit) & 1 and ((plane0[byte] >> bit) & 1 | ((plane1[byte] >> bit) & 1) << 1) == layer:
+                        r, c = nr, nc
+                        break
+            path.append((r, c))
+        path.reverse()
+        return path
+
+
+# flood fill from source one whole frontier at a time on a walkability bitboard
+def flood_fill(walkable: int, rows: int, cols: int, source: Pos, target: Optional[Pos] = None) -> DistanceField:
+    size = rows * cols
+    # a cell shifted right by one lands on the next row's first column (and the other way
+    # round for left), so those moves are masked with the columns they may not arrive in
+    first_col = int(("0" * (cols - 1) + "1") * rows, 2)
+    last_col = first_col << (cols - 1)
+    into_east = walkable & ~first_col
+    into_west = walkable & ~last_col
+
+    planes: List[int] = []
+    reached = 0
+    layers = 0
+    if 0 <= source[0] < rows and 0 <= source[1] < cols:
+        frontier = 1 << (source[0] * cols + source[1]) # like BFSPathfinder, the source itself is never checked
+        target_bit = 0 if target is None else 1 << (target[0] * cols + target[1])
+        while frontier:
+            reached |= frontier
+            # record this layer's distance in the bit planes
+            k = 0
+            depth = layers
+            while depth:
+                if depth & 1:
+                    while len(planes) <= k:
+                        planes.append(0)
+                    planes[k] |= frontier
+                depth >>= 1
+                k += 1
+            layers += 1
+            if frontier & target_bit:
+                break
+            frontier = (
+                ((frontier << 1) & into_east)
+                | ((frontier >> 1) & into_west)
+                | ((frontier << cols) | (frontier >> cols)) & walkable
+            ) & ~reached
+    return DistanceField(rows, cols, source, reached, planes, layers)
+
+
+# BFS that expands whole frontiers with bitboard shifts and masks. Gives the same path
+# lengths as BFSPathfinder but no per-node state, so it is meant for large maps and for
+# callers that want the full distance field (distance_field()) rather than one path.
+class BitsetBFSPathfinder(BFSPathfinder):
+
+    def __init__(self, grid: Union[Grid, CompactGrid], collect_stats: bool = False):
+        super().__init__(grid, collect_stats=collect_stats)
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("bitset BFS needs a grid with known dimensions")
+        if self.connectivity is not Connectivity.FOUR:
+            raise ValueError("bitset BFS only supports 4-connected movement")
+        self._walkable = 0
+        self._walkable_version = -1
+
+    # walkability bitboard, rebuilt only after the map changed
+    def _board(self) -> int:
+        if self._walkable_version != self.grid.version:
+            self._walkable = walkable_board(self.grid)
+            self._walkable_version = self.grid.version
+        return self._walkable
+
+    def distance_field(self, source: Pos, target: Optional[Pos] = None) -> DistanceField:
+        # with a target the fill stops at the target's layer instead of covering the map
+        return flood_fill(self._board(), self.grid.rows, self.grid.cols, source, target)
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        start = self.grid.start if start is None else start
+        goal = self.grid.goal if goal is None else goal
+        if start is None or goal is None:
+            logger.debug("Bitset BFS: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
+
+        search_start = perf_counter_ns() if self.collect_stats else 0
+        field = self.distance_field(start, goal)
+        self.nodes_explored = field.reached_count
+        self.visited = field.reached_cells()
+        path = field.path_to(goal)
+        if self.collect_stats:
+            # whole layers are shifted at once, there is no queue or neighbor lookup to count
+            self.stats = SearchStats(expansions=field.reached_count, segment_ns=[perf_counter_ns() - search_start])
+        if path is None:
+            logger.debug("Bitset BFS: no path found, nodes explored %d", self.nodes_explored)
+            return PathResult(None, nodes_explored=self.nodes_explored, failure_reason=NO_PATH, stats=self.stats)
+        logger.debug("Bitset BFS: path found, length %d, nodes explored %d", len(path), self.nodes_explored)
+        return PathResult(path, path_cost(self.grid, path), self.nodes_explored, None, self.stats)
@@ -0,0 +1,336 @@
+from array import array
+from typing import Tuple, Dict, List, Optional, Any, Callable
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+
+
+UNKNOWN_MASK = 0xFF # neighbor mask not computed yet
+
+
+# lightweight stand-in for Node so the existing pathfinders can run on a CompactGrid
+# it holds no state of its own, position and data are read from the grid
+class CellView:
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid: "CompactGrid", index: int):
+        self.grid = grid
+        self.index = index
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        return divmod(self.index, self.grid.cols)
+
+    @property
+    def data(self) -> Any:
+        return self.grid.data.get(self.index)
+
+    @data.setter
+    def data(self, value: Any):
+        if value is None:
+            self.grid.data.pop(self.index, None)
+        else:
+            self.grid.data[self.index] = value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CellView) and other.grid is self.grid and other.index == self.index
+
+    def __hash__(self) -> int:
+        return self.index
+
+    def __repr__(self) -> str:
+        return f"CellView(position={self.position})"
+
+
+# compact grid: walkability and terrain cost are kept in flat typed arrays indexed by r * cols + c
+# instead of one Node dataclass (plus a tuple key) per cell, so big maps are cheap to build and hold in memory
+class CompactGrid:
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+
+        # track start, goal and keys the same way Grid does
+        self.start: Optional[Tuple[int, int]] = None
+        self.goal: Optional[Tuple[int, int]] = None
+        self.keys: List[Tuple[int, int]] = []
+
+        # static map layers
+        self.walkable = bytearray(b"\x01") * self.size # 1 = open, 0 = barrier
+        self.costs = array("d", [1.0]) * self.size # terrain cost of entering a cell
+        self.data: Dict[int, Any] = {} # sparse per-cell payload (terrain objects etc.)
+        # cells per cost value and fractional-cost cells, same bookkeeping as Grid
+        self._cost_counts: Dict[float, int] = {1.0: self.size}
+        self._fractional_cells = 0
+
+        # per-cell neighbor bitmask (bit 0 up, 1 down, 2 left, 3 right), filled in on first lookup
+        # UNKNOWN_MASK marks cells that still need computing or were invalidated by a barrier edit
+        self.neighbor_mask = bytearray(b"\xff") * self.size
+        # offsets to add to a cell index for each of the 16 masks
+        steps = (-cols, cols, -1, 1)
+        self._mask_offsets = tuple(
+            tuple(steps[bit] for bit in range(4) if mask & (1 << bit)) for mask in range(16)
+        )
+
+        # views handed out so far (index -> CellView) and per-cell neighbor tuples built from
+        # them, so get_neighbors allocates nothing once a cell has been looked at. Tuples are
+        # dropped together with the masks they came from.
+        self._views: Dict[int, CellView] = {}
+        self._neighbor_views: Dict[int, Tuple[CellView, ...]] = {}
+
+        # neighbor masks only cover straight moves
+        self.connectivity = Connectivity.FOUR
+
+        # edit tracking, same contract as Grid
+        self.version = 0
+        self._listeners: List[Callable[[Tuple[int, int]], None]] = []
+
+    @classmethod
+    def from_grid(cls, grid: Grid, cost_function: Optional[Callable[[Node], float]] = None) -> "CompactGrid":
+        # copy a dict-based Grid, cost_function maps a node to the cost of entering it,
+        # without one the grid's own cost layer is copied
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("CompactGrid needs a grid with known dimensions")
+        if grid.connectivity is not Connectivity.FOUR:
+            raise ValueError("CompactGrid only supports 4-connected movement")
+        compact = cls(grid.rows, grid.cols)
+        compact.start = grid.start
+        compact.goal = grid.goal
+        compact.keys = list(grid.keys)
+        for pos, node in grid.nodes.items():
+            if not compact.in_bounds(pos):
+                continue
+            idx = compact.index(pos)
+            if node.data is not None:
+                compact.data[idx] = node.data
+            if cost_function is not None:
+                compact._write_cost(idx, cost_function(node))
+            else:
+                compact._write_cost(idx, grid.get_cost(pos))
+        for pos in grid.barriers:
+            compact.add_barrier(pos)
+        return compact
+
+    @classmethod
+    def from_buffers(cls, rows: int, cols: int, costs, walkable) -> "CompactGrid":
+        # a grid over existing layers, e.g. views of a shared memory segment: costs holds
+        # rows * cols doubles and walkable one byte per cell, neither is copied. Edits write
+        # through to the buffers, so grids over shared memory should only be read.
+        compact = cls(rows, cols)
+        compact.costs = costs
+        compact.walkable = walkable
+        counts: Dict[float, int] = {}
+        for cost in costs:
+            counts[cost] = counts.get(cost, 0) + 1
+        compact._cost_counts = counts
+        compact._fractional_cells = sum(n for cost, n in counts.items() if not cost.is_integer())
+        return compact
+
+    # index helpers
+    def index(self, pos: Tuple[int, int]) -> int:
+        return pos[0] * self.cols + pos[1]
+
+    def position(self, idx: int) -> Tuple[int, int]:
+        return divmod(idx, self.cols)
+
+    def in_bounds(self, pos: Tuple[int, int]) -> bool:
+        return 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+
+    # every in-bounds cell exists, barriers are just non-walkable cells
+    def has_node(self, pos: Tuple[int, int]):
+        return self.in_bounds(pos)
+
+    def get_node(self, pos: Tuple[int, int]) -> Optional[CellView]:
+        if not self.in_bounds(pos):
+            return None
+        return self._view(self.index(pos))
+
+    # views hold no state, so one per cell is shared by every caller
+    def _view(self, idx: int) -> CellView:
+        view = self._views.get(idx)
+        if view is None:
+            view = self._views[idx] = CellView(self, idx)
+        return view
+
+    def set_start(self, pos: Tuple[int, int]):
+        if not self.in_bounds(pos):
+            return False
+        self.start = pos
+        return True
+
+    def set_goal(self, pos: Tuple[int, int]):
+        if not self.in_bounds(pos):
+            return False
+        self.goal = pos
+        return True
+
+    def add_key(self, pos: Tuple[int, int]) -> bool:
+        if not self.in_bounds(pos):
+            return False
+        if pos not in self.keys:
+            self.keys.append(pos)
+        return True
+
+    def remove_key(self, pos: Tuple[int, int]) -> bool:
+        if pos in self.keys:
+            self.keys.remove(pos)
+            return True
+        return False
+
+    def is_key(self, pos: Tuple[int, int]) -> bool:
+        return pos in self.keys
+
+    def add_barrier(self, pos: Tuple[int, int]):
+        if not self.in_bounds(pos):
+            return False
+        idx = self.index(pos)
+        if self.walkable[idx]:
+            self.walkable[idx] = 0
+            self._invalidate_masks(idx)
+            self._map_changed(pos)
+        return True
+
+    def remove_barrier(self, pos: Tuple[int, int]):
+        if not self.in_bounds(pos):
+            return False
+        idx = self.index(pos)
+        if self.walkable[idx]:
+            return False
+        self.walkable[idx] = 1
+        self._invalidate_masks(idx)
+        self._map_changed(pos)
+        return True
+
+    def is_barrier(self, pos: Tuple[int, int]):
+        return self.in_bounds(pos) and not self.walkable[self.index(pos)]
+
+    def is_valid(self, pos: Tuple[int, int]):
+        return self.in_bounds(pos) and self.walkable[self.index(pos)] == 1
+
+    @property
+    def barriers(self) -> set[Tuple[int, int]]: # built on demand, not stored
+        cols = self.cols
+        return {divmod(i, cols) for i, w in enumerate(self.walkable) if not w}
+
+    def set_cost(self, pos: Tuple[int, int], cost: float) -> bool:
+        if not self.in_bounds(pos):
+            return False
+        if self._write_cost(self.index(pos), cost):
+            self._map_changed(pos)
+        return True
+
+    # returns True if the stored cost changed
+    def _write_cost(self, idx: int, cost: float) -> bool:
+        old = self.costs[idx]
+        cost = float(cost)
+        if old == cost:
+            return False
+        self.costs[idx] = cost
+        self._count_cost(old, -1)
+        self._count_cost(cost, 1)
+        return True
+
+    def _count_cost(self, cost: float, delta: int) -> None:
+        left = self._cost_counts.get(cost, 0) + delta
+        if left:
+            self._cost_counts[cost] = left
+        else:
+            del self._cost_counts[cost]
+        if not cost.is_integer():
+            self._fractional_cells += delta
+
+    @property
+    def uniform_costs(self) -> bool:
+        return len(self._cost_counts) <= 1
+
+    # the cheapest cell to enter, 1.0 when no cost was ever set
+    @property
+    def min_cost(self) -> float:
+        return min(self._cost_counts, default=1.0)
+
+    @property
+    def integral_costs(self) -> bool:
+        return self._fractional_cells == 0
+
+    def set_terrain(self, pos: Tuple[int, int], data: Any, cost: Optional[float] = None) -> bool:
+        if not self.in_bounds(pos):
+            return False
+        idx = self.index(pos)
+        changed = self.data.get(idx) != data
+        if data is None:
+            self.data.pop(idx, None)
+        else:
+            self.data[idx] = data
+        if cost is not None and self._write_cost(idx, cost):
+            changed = True
+        if changed:
+            self._map_changed(pos)
+        return True
+
+    def add_listener(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _map_changed(self, pos: Tuple[int, int]) -> None:
+        self.version += 1
+        for callback in self._listeners:
+            callback(pos)
+
+    def get_cost(self, pos: Tuple[int, int]) -> float:
+        # checked like is_valid, an out of range column would read the next row's cell
+        if not self.in_bounds(pos):
+            raise IndexError(f"{pos} is outside the {self.rows}x{self.cols} grid")
+        return self.costs[pos[0] * self.cols + pos[1]]
+
+    # index based neighbor lookup used by array-aware code, no views are created
+    def neighbor_indices(self, idx: int) -> List[int]:
+        return [idx + off for off in self.neighbor_offsets(idx)]
+
+    # shared tuple of index offsets to the walkable neighbors of idx, hot loops can
+    # iterate it directly without allocating anything
+    def neighbor_offsets(self, idx: int) -> Tuple[int, ...]:
+        mask = self.neighbor_mask[idx]
+        if mask == UNKNOWN_MASK:
+            mask = self._compute_mask(idx)
+            self.neighbor_mask[idx] = mask
+        return self._mask_offsets[mask]
+
+    def _compute_mask(self, idx: int) -> int:
+        cols = self.cols
+        walkable = self.walkable
+        r, c = divmod(idx, cols)
+        mask = 0
+        if r > 0 and walkable[idx - cols]:
+            mask |= 1 # up
+        if r < self.rows - 1 and walkable[idx + cols]:
+            mask |= 2 # down
+        if c > 0 and walkable[idx - 1]:
+            mask |= 4 # left
+        if c < cols - 1 and walkable[idx + 1]:
+            mask |= 8 # right
+        return mask
+
+    # a cell's walkability changed, so it and its 4 neighbors need their masks recomputed
+    def _invalidate_masks(self, idx: int) -> None:
+        cols = self.cols
+        r, c = divmod(idx, cols)
+        mask = self.neighbor_mask
+        views = self._neighbor_views
+        for i, inside in ((idx, True), (idx - cols, r > 0), (idx + cols, r < self.rows - 1),
+                          (idx - 1, c > 0), (idx + 1, c < cols - 1)):
+            if inside:
+                mask[i] = UNKNOWN_MASK
+                views.pop(i, None)
+
+    # same contract as Grid.get_neighbors: 4-directional, barriers skipped, a shared tuple
+    def get_neighbors(self, pos: Tuple[int, int], connectivity: Optional[Connectivity] = None) -> Tuple[CellView, ...]:
+        if connectivity is not None and connectivity is not Connectivity.FOUR:
+            raise ValueError("CompactGrid only supports 4-connected movement")
+        idx = pos[0] * self.cols + pos[1]
+        neighbors = self._neighbor_views.get(idx)
+        if neighbors is None:
+            view = self._view
+            neighbors = self._neighbor_views[idx] = tuple(view(i) for i in self.neighbor_indices(idx))
+        return neighbors
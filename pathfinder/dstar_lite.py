@@ -0,0 +1,180 @@
+from typing import Optional, List, Tuple, Callable, Dict, Set
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.result import PathResult
+from data_structures.min_heap import IndexedMinHeap
+
+Pos = Tuple[int, int]
+INF = float("inf")
+
+
+# one D* Lite search tree rooted at a fixed target. It keeps g/rhs between plans, so after
+# a map edit only the vertices whose cost-to-target actually changed are processed again,
+# and the start may move freely between plans (the km offset keeps queued keys valid).
+class _DStarLitePlanner:
+
+    def __init__(self, pathfinder: "DStarLitePathfinder", target: Pos):
+        self.grid = pathfinder.grid
+        self.cost = pathfinder.cost_function
+        self.heuristic = pathfinder.heuristic_function
+        self.connectivity = pathfinder.connectivity
+        self.target = target
+        self.g: Dict[Pos, float] = {}
+        self.rhs: Dict[Pos, float] = {target: 0.0}
+        self.queue = IndexedMinHeap() # entries are (k1, k2, position)
+        self.km = 0.0
+        self.last_start: Optional[Pos] = None
+        self.start: Optional[Pos] = None
+        self.pending: Set[Pos] = set() # cells edited since the last plan
+
+    def _key(self, pos: Pos) -> Tuple[float, float]:
+        best = min(self.g.get(pos, INF), self.rhs.get(pos, INF))
+        return best + self.heuristic(self.start, pos) + self.km, best
+
+    def update_vertex(self, pos: Pos) -> None:
+        if pos != self.target:
+            # rhs = one-step lookahead over successors: cheapest c(pos, s) + g(s)
+            best = INF
+            if self.grid.is_valid(pos):
+                node = self.grid.get_node(pos)
+                g = self.g
+                for succ in self.grid.get_neighbors(pos, self.connectivity):
+                    g_succ = g.get(succ.position, INF)
+                    if g_succ < INF:
+                        candidate = self.cost(node, succ) + g_succ
+                        if candidate < best:
+                            best = candidate
+            self.rhs[pos] = best
+        self.queue.remove(pos)
+        if self.g.get(pos, INF) != self.rhs.get(pos, INF):
+            self.queue.push(self._key(pos) + (pos,))
+
+    # a cell's walkability or terrain changed: every edge touching it may differ
+    def cell_changed(self, pos: Pos) -> None:
+        self.update_vertex(pos)
+        for neighbor in self.grid.get_neighbors(pos, self.connectivity):
+            self.update_vertex(neighbor.position)
+
+    def move_start(self, start: Pos) -> None:
+        self.start = start
+        if self.last_start is None:
+            self.queue.push(self._key(self.target) + (self.target,)) # first plan
+        else:
+            self.km += self.heuristic(self.last_start, start)
+        self.last_start = start
+
+    def apply_edits(self) -> None:
+        for pos in self.pending:
+            self.cell_changed(pos)
+        self.pending.clear()
+
+    # expanded cells are added to visited (display only)
+    def compute_shortest_path(self, visited: Set[Pos]) -> int:
+        start = self.start
+        queue = self.queue
+        g = self.g
+        rhs = self.rhs
+        grid = self.grid
+        expanded = 0
+        while not queue.is_empty():
+            top = queue.peek()
+            start_key = self._key(start)
+            if top[:2] >= start_key and rhs.get(start, INF) == g.get(start, INF):
+                break
+            pos = top[2]
+            new_key = self._key(pos)
+            if top[:2] < new_key:
+                # key is outdated (km grew), requeue with the fresh key
+                queue.remove(pos)
+                queue.push(new_key + (pos,))
+                continue
+            queue.pop()
+            expanded += 1
+            visited.add(pos)
+            if g.get(pos, INF) > rhs.get(pos, INF):
+                g[pos] = rhs[pos] # overconsistent: settle it
+                for pred in grid.get_neighbors(pos, self.connectivity):
+                    self.update_vertex(pred.position)
+            else:
+                g[pos] = INF # underconsistent: invalidate and let it be rebuilt
+                self.update_vertex(pos)
+                for pred in grid.get_neighbors(pos, self.connectivity):
+                    self.update_vertex(pred.position)
+        return expanded
+
+    # follow the cheapest successor from start to target
+    def extract_path(self) -> Optional[List[Pos]]:
+        if self.g.get(self.start, INF) == INF:
+            return None
+        grid = self.grid
+        path = [self.start]
+        pos = self.start
+        limit = len(self.g) + 1
+        while pos != self.target:
+            node = grid.get_node(pos)
+            best, best_pos = INF, None
+            for succ in grid.get_neighbors(pos, self.connectivity):
+                candidate = self.cost(node, succ) + self.g.get(succ.position, INF)
+                if candidate < best:
+                    best, best_pos = candidate, succ.position
+            if best_pos is None or len(path) > limit:
+                return None
+            path.append(best_pos)
+            pos = best_pos
+        return path
+
+
+# D* Lite / Lifelong Planning A*: keeps one search tree per target (the keys and the goal)
+# alive between find_path calls. Grid edits are queued through a grid listener and on the
+# next call only the part of each tree affected by them is repaired, which makes replans
+# after small local edits much cheaper than starting from scratch.
+class DStarLitePathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            connectivity: Optional[Connectivity] = None,
+            # the planners' queues live across calls, stats count expansions and timings only
+            collect_stats: bool = False
+    ):
+        super().__init__(grid, cost_function, connectivity=connectivity, collect_stats=collect_stats)
+        self._planners: Dict[Pos, _DStarLitePlanner] = {}
+        grid.add_listener(self._on_map_edit)
+
+    # stop listening to the grid (call when the pathfinder is thrown away)
+    def close(self) -> None:
+        self.grid.remove_listener(self._on_map_edit)
+
+    def _on_map_edit(self, pos: Pos) -> None:
+        for planner in self._planners.values():
+            planner.pending.add(pos)
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        goal = self.grid.goal if goal is None else goal
+        keys = self.grid.keys if keys is None else keys
+        if goal is not None:
+            # drop trees for targets that are no longer part of the route
+            targets = set(keys) | {goal}
+            for target in list(self._planners):
+                if target not in targets:
+                    del self._planners[target]
+        return super().search(start, goal, keys)
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        planner = self._planners.get(goal_pos)
+        if planner is None:
+            planner = self._planners[goal_pos] = _DStarLitePlanner(self, goal_pos)
+
+        # km must account for the start move before edited vertices are requeued
+        planner.move_start(start_pos)
+        planner.apply_edits()
+        nodes_explored = planner.compute_shortest_path(state.visited)
+        return planner.extract_path(), nodes_explored
@@ -0,0 +1,173 @@
+from array import array
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Callable, Union
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.compact_grid import CompactGrid
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.bitset_bfs import flood_fill, walkable_board
+from data_structures.min_heap import HeapqHeap
+
+Pos = Tuple[int, int]
+INF = float("inf")
+
+
+# LRU cache of cost-to-goal fields. A field holds, for every cell, the cheapest cost of
+# getting from that cell to its goal (-1.0 where the goal is unreachable), computed once
+# by a reverse Dijkstra rooted at the goal. Any number of starts can then walk down the
+# field to the goal in O(path length). Entries are keyed by (goal, grid.version) and the
+# whole cache is dropped on a map edit, since any barrier or terrain change can alter it.
+class GoalFieldCache:
+
+    def __init__(
+            self,
+            grid: Union[Grid, CompactGrid],
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            memory_budget: int = 64 * 1024 * 1024 # bytes of field arrays kept alive
+    ):
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("distance fields need a grid with known dimensions")
+        if grid.connectivity is not Connectivity.FOUR:
+            raise ValueError("distance fields only support 4-connected movement")
+        self.grid = grid
+        self.cost_function = cost_function
+        self.memory_budget = memory_budget
+        self._fields: "OrderedDict[Tuple[Pos, int], array]" = OrderedDict()
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_explored = 0 # cells settled by the last field build
+        grid.add_listener(self._on_map_edit)
+
+    # stop listening to the grid (call when the cache is thrown away)
+    def close(self) -> None:
+        self.grid.remove_listener(self._on_map_edit)
+
+    def _on_map_edit(self, pos: Pos) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._fields.clear()
+        self.memory_used = 0
+
+    # without a cost function, costs come from the grid's cost layer
+    def _layer_cost(self, n1: Node, n2: Node) -> float:
+        return self.grid.get_cost(n2.position)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def field(self, goal: Pos) -> array:
+        key = (goal, self.grid.version)
+        found = self._fields.get(key)
+        if found is not None:
+            self._fields.move_to_end(key)
+            self.hits += 1
+            self.last_explored = 0
+            return found
+
+        self.misses += 1
+        field = self._build(goal)
+        size = field.itemsize * len(field)
+        if size <= self.memory_budget:
+            # evict least recently used fields until the new one fits
+            while self._fields and self.memory_used + size > self.memory_budget:
+                _, evicted = self._fields.popitem(last=False)
+                self.memory_used -= evicted.itemsize * len(evicted)
+            self._fields[key] = field
+            self.memory_used += size
+        return field
+
+    def _build(self, goal: Pos) -> array:
+        grid = self.grid
+        if self.cost_function is None and grid.uniform_costs and grid.get_cost(goal) == 1.0:
+            # unit costs: a bitboard BFS gives the same field much faster
+            filled = flood_fill(walkable_board(grid), grid.rows, grid.cols, goal)
+            self.last_explored = filled.reached_count
+            return array("d", filled.distances)
+
+        cols = grid.cols
+        cost = self.cost_function or self._layer_cost
+        field = array("d", [-1.0]) * (grid.rows * cols)
+        dist = {goal: 0.0}
+        heap = HeapqHeap()
+        heap.push((0.0, 0, goal))
+        counter = 0
+        explored = 0
+        while not heap.is_empty():
+            d, _, pos = heap.pop()
+            idx = pos[0] * cols + pos[1]
+            if field[idx] >= 0:
+                continue # stale duplicate
+            field[idx] = d
+            explored += 1
+            current = grid.get_node(pos)
+            for neighbor in grid.get_neighbors(pos):
+                n_pos = neighbor.position
+                if field[n_pos[0] * cols + n_pos[1]] >= 0:
+                    continue
+                # reverse search: the edge walked is neighbor -> current
+                nd = d + cost(neighbor, current)
+                if nd < dist.get(n_pos, INF):
+                    dist[n_pos] = nd
+                    counter += 1
+                    heap.push((nd, counter, n_pos))
+        self.last_explored = explored
+        return field
+
+    # walk down the field: always step to the neighbor with the lowest cost-to-goal through it
+    def path(self, start: Pos, goal: Pos) -> Optional[List[Pos]]:
+        grid = self.grid
+        if start == goal:
+            self.last_explored = 0
+            return [start]
+        if not grid.is_valid(goal):
+            self.last_explored = 0
+            return None # a search could never step onto it either
+        field = self.field(goal)
+        cols = grid.cols
+        cost = self.cost_function or self._layer_cost
+        path = [start]
+        pos = start
+        for _ in range(len(field)):
+            node = grid.get_node(pos)
+            if node is None:
+                return None
+            best, best_pos = INF, None
+            for neighbor in grid.get_neighbors(pos):
+                n_pos = neighbor.position
+                d = field[n_pos[0] * cols + n_pos[1]]
+                if d < 0:
+                    continue
+                through = d + cost(node, neighbor)
+                if through < best:
+                    best, best_pos = through, n_pos
+            if best_pos is None:
+                return None
+            path.append(best_pos)
+            pos = best_pos
+            if pos == goal:
+                return path
+        return None
+
+
+# A* front end that answers every segment from the goal-rooted field cache, so many
+# queries to the same goal (or keys) only pay for one reverse search per target
+class FieldCachePathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Union[Grid, CompactGrid],
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            memory_budget: int = 64 * 1024 * 1024
+    ):
+        super().__init__(grid, cost_function)
+        self.cache = GoalFieldCache(grid, cost_function, memory_budget)
+
+    def close(self) -> None:
+        self.cache.close()
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        path = self.cache.path(start_pos, goal_pos)
+        return path, self.cache.last_explored
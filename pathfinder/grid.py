@@ -1,10 +1,40 @@
-from typing import Tuple, Dict, List, Optional, Any
+import math
+from array import array
+from enum import Enum
+from typing import Tuple, Dict, List, Optional, Any, Sequence, Callable
 from pathfinder.node import Node
 
+SQRT2 = math.sqrt(2)
+
+
+# movement model: which neighboring cells one step can reach
+class Connectivity(Enum):
+    FOUR = "4" # up, down, left, right
+    EIGHT = "8" # plus diagonals, which may slip between two blocked orthogonal cells
+    EIGHT_NO_CORNER_CUTTING = "8-strict" # a diagonal step needs both orthogonal cells open
+
+
+# (dr, dc) steps, straight ones first
+STRAIGHT_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_STEPS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+# distance covered by one step between neighboring cells: 1 straight, sqrt(2) diagonally
+def step_length(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+    return SQRT2 if a[0] != b[0] and a[1] != b[1] else 1.0
+
+
 # grid class to manage the entire grid/graph of nodes
 class Grid:
     # initialize grid with set number of rows and columns
-    def __init__(self, rows: Optional[int] = None, cols: Optional[int] = None):
+    def __init__(
+            self,
+            rows: Optional[int] = None,
+            cols: Optional[int] = None,
+            precompute_neighbors: bool = True,
+            # default movement model, pathfinders can ask for another one per search
+            connectivity: Connectivity = Connectivity.FOUR
+    ):
         # dict to store all nodes in the grid by position
         self.nodes: Dict[Tuple[int, int], Node] = {}
 
@@ -18,24 +48,51 @@ class Grid:
         # store barriers separately for quick lookup
         self.barriers: set[Tuple[int, int]] = set()
 
+        # neighbor tuples per position, one table per movement model, each built on
+        # first use and patched on barrier edits
+        self.precompute_neighbors = precompute_neighbors
+        self.connectivity = connectivity
+        self._adjacency: Dict[Connectivity, Dict[Tuple[int, int], Tuple[Node, ...]]] = {}
+
+        # bumped on every map edit (barriers, terrain), so caches can tell they are stale
+        self.version = 0
+        # callbacks told about each edited position, used by precomputed search structures
+        self._listeners: List[Callable[[Tuple[int, int]], None]] = []
+
         # store grid dimensions if provided
         self.rows = rows
         self.cols = cols
 
+        # dense cost layer: cost of entering each cell, indexed by r * cols + c like
+        # CompactGrid.costs. Only exists with known dimensions, cells outside it cost 1.0.
+        # Searches read it directly instead of calling a cost function per edge.
+        self.costs: Optional[array] = None
+        # how many cells have each cost, and how many of those costs are fractional, so
+        # "is every step the same" (JPS) and "are all costs integers" (bucket queue) are O(1)
+        self._cost_counts: Dict[float, int] = {}
+        self._fractional_cells = 0
+
         # auto-generate grid if dimensions provided
         if rows is not None and cols is not None:
+            self.costs = array("d", [1.0]) * (rows * cols)
+            self._cost_counts[1.0] = rows * cols
             self._generate_grid(rows, cols)
 
 
     def add_node(self, pos: Tuple[int, int]) -> Node:
         node = Node(position=pos)
         self.nodes[pos] = node
+        self._patch_adjacency(pos)
+        self._map_changed(pos)
         return node
     
-    def _generate_grid(self, rows: int, cols: int): # regenerate grid
+    # fill in the nodes of a new grid. Nobody can have subscribed or cached anything yet,
+    # so this is not an edit: version stays 0 and no listener runs
+    def _generate_grid(self, rows: int, cols: int):
+        nodes = self.nodes
         for r in range(rows):
             for c in range(cols):
-                self.add_node((r, c))
+                nodes[(r, c)] = Node(position=(r, c))
 
 
     # helper function to check if a node is available at a position
@@ -80,16 +137,103 @@ class Grid:
     def add_barrier(self, pos: Tuple[int, int]):
         if pos not in self.nodes:
             return False
-        self.barriers.add(pos)
+        if pos not in self.barriers:
+            self.barriers.add(pos)
+            self._patch_adjacency(pos)
+            self._map_changed(pos)
         return True
 
     # remove barrier at said position
     def remove_barrier(self, pos: Tuple[int, int]):
         if pos in self.barriers:
             self.barriers.discard(pos)
+            self._patch_adjacency(pos)
+            self._map_changed(pos)
             return True
         return False
 
+    # set the terrain payload of a node, and optionally its cost in the cost layer
+    # always go through here rather than writing node.data, so listeners hear about it
+    def set_terrain(self, pos: Tuple[int, int], data: Any, cost: Optional[float] = None) -> bool:
+        node = self.nodes.get(pos)
+        if node is None:
+            return False
+        changed = node.data != data
+        node.data = data
+        if cost is not None and self._write_cost(pos, cost):
+            changed = True
+        if changed:
+            self._map_changed(pos)
+        return True
+
+    # set the cost of entering pos, False when pos is outside the cost layer
+    def set_cost(self, pos: Tuple[int, int], cost: float) -> bool:
+        if pos not in self.nodes or not self._in_layer(pos):
+            return False
+        if self._write_cost(pos, cost):
+            self._map_changed(pos)
+        return True
+
+    def get_cost(self, pos: Tuple[int, int]) -> float:
+        if not self._in_layer(pos):
+            return 1.0
+        return self.costs[pos[0] * self.cols + pos[1]]
+
+    def _in_layer(self, pos: Tuple[int, int]) -> bool:
+        return self.costs is not None and 0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols
+
+    # returns True if the stored cost changed
+    def _write_cost(self, pos: Tuple[int, int], cost: float) -> bool:
+        if not self._in_layer(pos):
+            return False
+        idx = pos[0] * self.cols + pos[1]
+        old = self.costs[idx]
+        cost = float(cost)
+        if old == cost:
+            return False
+        self.costs[idx] = cost
+        self._count_cost(old, -1)
+        self._count_cost(cost, 1)
+        return True
+
+    def _count_cost(self, cost: float, delta: int) -> None:
+        left = self._cost_counts.get(cost, 0) + delta
+        if left:
+            self._cost_counts[cost] = left
+        else:
+            del self._cost_counts[cost]
+        if not cost.is_integer():
+            self._fractional_cells += delta
+
+    # every cell costs the same to enter (barrier cells count too, so this can be
+    # False when only a barrier differs, but never True when costs differ)
+    @property
+    def uniform_costs(self) -> bool:
+        return len(self._cost_counts) <= 1
+
+    # the cheapest cell to enter (barriers count too, so it is a lower bound), 1.0 when no cost was ever set
+    @property
+    def min_cost(self) -> float:
+        return min(self._cost_counts, default=1.0)
+
+    # every cost is a whole number, so every g and f of a unit-step search is too
+    @property
+    def integral_costs(self) -> bool:
+        return self._fractional_cells == 0
+
+    # register a callback(pos) that runs after every map edit
+    def add_listener(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _map_changed(self, pos: Tuple[int, int]) -> None:
+        self.version += 1
+        for callback in self._listeners:
+            callback(pos)
+
     # check if position is a barrier
     def is_barrier(self, pos: Tuple[int, int]):
         return pos in self.barriers
@@ -98,26 +242,55 @@ class Grid:
     def is_valid(self, pos: Tuple[int, int]):
         return pos in self.nodes and pos not in self.barriers
 
-    # get all neighbors in graph
+    # get all neighbors in graph, under the grid's movement model unless told otherwise
     def get_neighbors(
             self,
             pos: Tuple[int, int],
-    ) -> List[Node]:
+            connectivity: Optional[Connectivity] = None
+    ) -> Sequence[Node]:
+        connectivity = connectivity or self.connectivity
+        if self.precompute_neighbors:
+            table = self._adjacency.get(connectivity)
+            if table is None:
+                table = self._build_adjacency(connectivity)
+            # shared tuple from the index, nothing is allocated per expansion
+            neighbors = table.get(pos)
+            if neighbors is not None:
+                return neighbors
+            # not a node of the grid, answer like a grid without the index would
+        return self._compute_neighbors(pos, connectivity)
+
+    def _compute_neighbors(self, pos: Tuple[int, int], connectivity: Connectivity) -> List[Node]:
         # extract row and column
         r, c = pos
 
-        # 4-directional movement
-        candidates = [
-            (r - 1, c),  # up
-            (r + 1, c),  # down
-            (r, c - 1),  # left
-            (r, c + 1),  # right
-        ]
+        # straight moves: up, down, left, right, barriers skipped
+        valid = [self.nodes[(r + dr, c + dc)] for dr, dc in STRAIGHT_STEPS if self.is_valid((r + dr, c + dc))]
+        if connectivity is Connectivity.FOUR:
+            return valid
 
-        # make sure returned nodes aren't barriers
-        valid = [self.nodes[p] for p in candidates if self.is_valid(p)]
+        strict = connectivity is Connectivity.EIGHT_NO_CORNER_CUTTING
+        for dr, dc in DIAGONAL_STEPS:
+            p = (r + dr, c + dc)
+            if not self.is_valid(p):
+                continue
+            if strict and not (self.is_valid((r + dr, c)) and self.is_valid((r, c + dc))):
+                continue
+            valid.append(self.nodes[p])
         return valid
 
-    def reset_search(self): # reset all nodes for a fresh algorithm run
-        for node in self.nodes.values():
-            node.reset_search_state()
\ No newline at end of file
+    # build the neighbor index for every node in one pass
+    def _build_adjacency(self, connectivity: Connectivity) -> Dict[Tuple[int, int], Tuple[Node, ...]]:
+        table = {pos: tuple(self._compute_neighbors(pos, connectivity)) for pos in self.nodes}
+        self._adjacency[connectivity] = table
+        return table
+
+    # walkability of pos changed: pos and its 4 neighbors need new entries, with diagonal
+    # moves the whole 3x3 block (a corner can open or close a diagonal step past it)
+    def _patch_adjacency(self, pos: Tuple[int, int]) -> None:
+        r, c = pos
+        for connectivity, table in self._adjacency.items():
+            steps = STRAIGHT_STEPS if connectivity is Connectivity.FOUR else STRAIGHT_STEPS + DIAGONAL_STEPS
+            for p in (pos,) + tuple((r + dr, c + dc) for dr, dc in steps):
+                if p in self.nodes:
+                    table[p] = tuple(self._compute_neighbors(p, connectivity))
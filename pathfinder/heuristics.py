@@ -0,0 +1,272 @@
+import math
+import threading
+from array import array
+from typing import Optional, List, Tuple, Callable, Dict, Union
+from pathfinder.node import Node
+from pathfinder.grid import Connectivity, step_length
+from data_structures.min_heap import HeapqHeap
+
+Pos = Tuple[int, int]
+Heuristic = Callable[[Pos, Pos], float]
+INF = float("inf")
+SQRT2 = math.sqrt(2)
+
+
+# plain distance estimates, all assume moving one cell costs at least 1. Manhattan only
+# holds for 4-connected moves, octile and euclidean stay admissible with diagonal moves.
+def manhattan(pos: Pos, goal: Pos) -> float:
+    return abs(pos[0] - goal[0]) + abs(pos[1] - goal[1])
+
+
+def octile(pos: Pos, goal: Pos) -> float:
+    dr = abs(pos[0] - goal[0])
+    dc = abs(pos[1] - goal[1])
+    return max(dr, dc) + (SQRT2 - 1) * min(dr, dc)
+
+
+def euclidean(pos: Pos, goal: Pos) -> float:
+    return math.hypot(pos[0] - goal[0], pos[1] - goal[1])
+
+
+def zero(pos: Pos, goal: Pos) -> float:
+    return 0 # turns A* into Dijkstra
+
+
+HEURISTICS: Dict[str, Heuristic] = {
+    "manhattan": manhattan,
+    "octile": octile,
+    "euclidean": euclidean,
+    "zero": zero,
+}
+
+
+# every cell with a known position, for grids that don't keep a nodes dict (CompactGrid)
+def _cells(grid):
+    if hasattr(grid, "nodes"):
+        return grid.nodes.values()
+    return (grid.get_node((r, c)) for r in range(grid.rows) for c in range(grid.cols))
+
+
+# cheapest cost per unit of distance moved on the map (a diagonal step covers sqrt(2)),
+# and whether every step costs the same both ways
+def step_cost_summary(
+        grid,
+        cost_function: Callable[[Node, Node], float],
+        connectivity: Optional[Connectivity] = None
+) -> Tuple[float, bool]:
+    lowest = INF
+    symmetric = True
+    for node in _cells(grid):
+        if grid.is_barrier(node.position):
+            continue
+        for neighbor in grid.get_neighbors(node.position, connectivity):
+            step = cost_function(node, neighbor)
+            per_unit = step / step_length(node.position, neighbor.position)
+            if per_unit < lowest:
+                lowest = per_unit
+            if symmetric and step != cost_function(neighbor, node):
+                symmetric = False
+    return (lowest if lowest < INF else 1.0), symmetric
+
+
+# a base heuristic times the cheapest step cost on the map. Terrain maps where nothing
+# costs less than 2 get twice the guidance, and maps with steps cheaper than 1 stay
+# admissible. With layer_costs (steps priced from the grid's cost layer) the factor is the
+# grid's cheapest cell, which it keeps count of. A custom cost function needs a scan of
+# every edge instead, redone on the first query after a map edit (tracked through grid.version).
+class MinCostHeuristic:
+
+    def __init__(
+            self,
+            grid,
+            cost_function: Callable[[Node, Node], float],
+            base: Heuristic = manhattan,
+            connectivity: Optional[Connectivity] = None,
+            layer_costs: bool = False
+    ):
+        self.grid = grid
+        self.cost_function = cost_function
+        self.base = base
+        self.connectivity = connectivity
+        self.layer_costs = layer_costs
+        self._scale: Tuple[int, float] = (-1, 1.0) # (grid version, factor)
+
+    @property
+    def scale(self) -> float:
+        if self.layer_costs:
+            # barrier cells are counted too, that only ever lowers the factor
+            return self.grid.min_cost
+        version, factor = self._scale
+        if version != self.grid.version:
+            factor = step_cost_summary(self.grid, self.cost_function, self.connectivity)[0]
+            self._scale = (self.grid.version, factor)
+        return factor
+
+    def __call__(self, pos: Pos, goal: Pos) -> float:
+        return self.scale * self.base(pos, goal)
+
+
+# ALT heuristic (A*, Landmarks, Triangle inequality). For a few landmark cells L the exact
+# costs d(L, v) and d(v, L) to every cell are precomputed; for any pair the triangle
+# inequality then gives d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L).
+# The estimate is the largest of these bounds and the min-cost scaled base heuristic, so it
+# is admissible and consistent and never weaker than the base.
+# Landmarks are picked farthest-first (each one as far as possible from those already
+# chosen), which tends to put them at the map's edges behind the cells they guide towards.
+# Tables are one flat array per direction with the landmarks of a cell stored next to each
+# other, int32 when every step cost is integral and doubles otherwise, -1 for unreachable.
+# With symmetric step costs both directions share one table. They are rebuilt lazily on
+# the first query after a map edit, and one instance can be shared by several pathfinders.
+class LandmarkHeuristic:
+
+    def __init__(
+            self,
+            grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            landmarks: int = 8,
+            base: Heuristic = manhattan,
+            # must match the searches using it, landmark distances depend on the moves allowed
+            connectivity: Optional[Connectivity] = None
+    ):
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("landmark tables need a grid with known dimensions")
+        if landmarks < 1:
+            raise ValueError("need at least one landmark")
+        self.grid = grid
+        # without a cost function, costs come from the grid's cost layer
+        self.cost_function = cost_function or (lambda n1, n2: grid.get_cost(n2.position))
+        self.count = landmarks
+        self.base = base
+        self.connectivity = connectivity
+        self.landmarks: List[Pos] = []
+        self.memory_used = 0 # bytes held by the distance tables
+        self._lock = threading.Lock()
+        self._version = -1
+        # (from table, to table, landmarks per cell, step cost scale, goal rows), swapped in
+        # as one tuple so concurrent searches never see half a rebuild
+        self._tables: tuple = (array("i"), array("i"), 0, 1.0, {})
+
+    def _dijkstra(self, source: Pos, reverse: bool) -> array:
+        grid = self.grid
+        cols = grid.cols
+        cost = self.cost_function
+        table = array("d", [-1.0]) * (grid.rows * cols)
+        best = {source: 0.0}
+        heap = HeapqHeap()
+        heap.push((0.0, 0, source))
+        counter = 0
+        while not heap.is_empty():
+            d, _, pos = heap.pop()
+            idx = pos[0] * cols + pos[1]
+            if table[idx] >= 0:
+                continue # stale duplicate
+            table[idx] = d
+            current = grid.get_node(pos)
+            for neighbor in grid.get_neighbors(pos, self.connectivity):
+                n_pos = neighbor.position
+                if table[n_pos[0] * cols + n_pos[1]] >= 0:
+                    continue
+                nd = d + (cost(neighbor, current) if reverse else cost(current, neighbor))
+                if nd < best.get(n_pos, INF):
+                    best[n_pos] = nd
+                    counter += 1
+                    heap.push((nd, counter, n_pos))
+        return table
+
+    def _pick_landmarks(self) -> Tuple[List[Pos], List[array]]:
+        grid = self.grid
+        seed = next((node.position for node in _cells(grid) if not grid.is_barrier(node.position)), None)
+        if seed is None:
+            return [], []
+        # the first landmark is the cell farthest from an arbitrary open cell, after that
+        # spread holds each cell's distance to the nearest landmark chosen so far
+        spread = self._dijkstra(seed, False)
+        landmarks, tables = [], []
+        while len(landmarks) < self.count:
+            far = max(range(len(spread)), key=spread.__getitem__)
+            if spread[far] <= 0:
+                break # every reachable cell is a landmark already
+            landmark = divmod(far, grid.cols)
+            table = self._dijkstra(landmark, False)
+            if landmarks:
+                spread = array("d", (min(a, b) for a, b in zip(spread, table)))
+            else:
+                spread = table
+            landmarks.append(landmark)
+            tables.append(table)
+        return landmarks, tables
+
+    # lay the per-landmark tables out cell by cell: packed[cell * k + landmark]
+    def _pack(self, tables: List[array], integral: bool) -> array:
+        k = len(tables)
+        packed = array("i" if integral else "d", [0]) * (len(tables[0]) * k if tables else 0)
+        for l, table in enumerate(tables):
+            packed[l::k] = array("i", map(int, table)) if integral else table
+        return packed
+
+    def _build(self) -> None:
+        grid = self.grid
+        scale, symmetric = step_cost_summary(grid, self.cost_function, self.connectivity)
+        landmarks, forward = self._pick_landmarks()
+        backward = forward if symmetric else [self._dijkstra(l, True) for l in landmarks]
+        integral = all(d == int(d) for table in forward + backward for d in table)
+        packed_from = self._pack(forward, integral)
+        packed_to = packed_from if symmetric else self._pack(backward, integral)
+        self.landmarks = landmarks
+        self.memory_used = packed_from.itemsize * len(packed_from) * (1 if symmetric else 2)
+        self._tables = (packed_from, packed_to, len(landmarks), scale, {})
+        self._version = grid.version
+
+    def prepare(self) -> None:
+        # build the tables now instead of on the first query
+        if self._version != self.grid.version:
+            with self._lock:
+                if self._version != self.grid.version:
+                    self._build()
+
+    def __call__(self, pos: Pos, goal: Pos) -> float:
+        self.prepare()
+        from_l, to_l, k, scale, goal_rows = self._tables
+        cols = self.grid.cols
+        estimate = scale * self.base(pos, goal)
+        rows = goal_rows.get(goal)
+        if rows is None:
+            g = (goal[0] * cols + goal[1]) * k
+            rows = goal_rows[goal] = (from_l[g:g + k], to_l[g:g + k])
+        from_goal, to_goal = rows
+        i = (pos[0] * cols + pos[1]) * k
+        for l in range(k):
+            # d(v, t) >= d(L, t) - d(L, v)
+            a = from_l[i + l]
+            b = from_goal[l]
+            if a >= 0 and b - a > estimate:
+                estimate = b - a
+            # d(v, t) >= d(v, L) - d(t, L)
+            a = to_l[i + l]
+            b = to_goal[l]
+            if b >= 0 and a - b > estimate:
+                estimate = a - b
+        return estimate
+
+
+# resolve a heuristic spec: a callable is used as is, a registry name gives the plain
+# distance, "scaled_<name>" scales it by the cheapest step cost and "alt" builds landmarks
+def make_heuristic(
+        spec: Union[str, Heuristic],
+        grid,
+        cost_function: Callable[[Node, Node], float],
+        connectivity: Optional[Connectivity] = None,
+        # cost_function reads the grid's cost layer (times sqrt(2) for diagonal steps)
+        layer_costs: bool = False
+) -> Heuristic:
+    if callable(spec):
+        return spec
+    diagonal = (connectivity or grid.connectivity) is not Connectivity.FOUR
+    if spec == "alt":
+        return LandmarkHeuristic(grid, cost_function, base=octile if diagonal else manhattan, connectivity=connectivity)
+    if spec.startswith("scaled_") and spec[len("scaled_"):] in HEURISTICS:
+        return MinCostHeuristic(grid, cost_function, HEURISTICS[spec[len("scaled_"):]], connectivity, layer_costs)
+    if spec not in HEURISTICS:
+        names = sorted(HEURISTICS) + [f"scaled_{name}" for name in sorted(HEURISTICS)] + ["alt"]
+        raise ValueError(f"Unknown heuristic '{spec}', expected one of {names}")
+    return HEURISTICS[spec]
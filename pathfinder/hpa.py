@@ -0,0 +1,315 @@
+import weakref
+from typing import Optional, List, Tuple, Callable, Dict, Set
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from data_structures.min_heap import HeapqHeap
+
+Pos = Tuple[int, int]
+Cluster = Tuple[int, int] # (cluster row, cluster col)
+Edge = Tuple[Pos, float, List[Pos]] # (target, cost, cell path from source to target)
+
+# an open stretch of border at least this long gets two entrances (one at each end)
+LONG_ENTRANCE = 6
+
+
+# walk a parent dict from pos back to the root of the search: [pos, ..., root]
+def _trace(parents: Dict[Pos, Optional[Pos]], pos: Pos) -> List[Pos]:
+    path = []
+    while pos is not None:
+        path.append(pos)
+        pos = parents[pos]
+    return path
+
+
+# HPA* (hierarchical pathfinding A*): the grid is cut into square clusters, cells where
+# two clusters touch become entrances, and the cheapest paths between entrances of the
+# same cluster are precomputed. A query connects start/goal to the entrances of their
+# clusters, searches that small abstract graph and then stitches the cached cell paths
+# together. Paths are near-optimal, not guaranteed optimal.
+# The pathfinder listens to grid edits and only rebuilds the clusters an edit touched.
+# Entrances are only made across straight cluster borders, so grids have to move in four
+# directions: a diagonal step through a cluster corner would never be found.
+class HPAStarPathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            cluster_size: int = 10,
+            # hard limits for one find_path call, spent on the cells and entrances a query expands
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None,
+            collect_stats: bool = False
+    ):
+        super().__init__(grid, cost_function, deadline=deadline, max_expansions=max_expansions,
+                         collect_stats=collect_stats)
+        if grid.rows is None or grid.cols is None:
+            raise ValueError("HPA* needs a grid with known dimensions")
+        if self.connectivity is not Connectivity.FOUR:
+            raise ValueError("HPA* only supports four-connected grids")
+        self.cluster_size = cluster_size
+        self.cluster_rows = -(-grid.rows // cluster_size)
+        self.cluster_cols = -(-grid.cols // cluster_size)
+
+        # abstraction layers, built on the first query
+        self._transitions: Dict[Tuple[Cluster, Cluster], List[Tuple[Pos, Pos]]] = {} # border -> entrance pairs
+        self._entrances: Dict[Cluster, Set[Pos]] = {}
+        self._intra: Dict[Cluster, Dict[Pos, List[Edge]]] = {} # cached paths between entrances of a cluster
+        self._graph: Optional[Dict[Pos, List[Edge]]] = None # abstract graph assembled from the layers above
+        self._built = False
+        self._dirty: Set[Cluster] = set()
+
+        # the grid only holds a weak reference, a pathfinder that is dropped without
+        # close() stops listening once it is collected
+        ref = weakref.ref(self)
+
+        def listener(pos: Pos) -> None:
+            hpa = ref()
+            if hpa is not None:
+                hpa._on_map_edit(pos)
+
+        grid.add_listener(listener)
+        self._stop_listening = weakref.finalize(self, grid.remove_listener, listener)
+
+    # stop listening to the grid right away instead of when the pathfinder is collected
+    def close(self) -> None:
+        self._stop_listening()
+
+    def _on_map_edit(self, pos: Pos) -> None:
+        if self._built:
+            self._dirty.add(self._cluster_of(pos))
+
+    def _cluster_of(self, pos: Pos) -> Cluster:
+        return pos[0] // self.cluster_size, pos[1] // self.cluster_size
+
+    def _bounds(self, cluster: Cluster) -> Tuple[int, int, int, int]:
+        size = self.cluster_size
+        r0, c0 = cluster[0] * size, cluster[1] * size
+        return r0, min(r0 + size, self.grid.rows), c0, min(c0 + size, self.grid.cols)
+
+    def _borders_of(self, cluster: Cluster) -> List[Tuple[Cluster, Cluster]]:
+        cr, cc = cluster
+        borders = []
+        if cr > 0:
+            borders.append(((cr - 1, cc), cluster))
+        if cr < self.cluster_rows - 1:
+            borders.append((cluster, (cr + 1, cc)))
+        if cc > 0:
+            borders.append(((cr, cc - 1), cluster))
+        if cc < self.cluster_cols - 1:
+            borders.append((cluster, (cr, cc + 1)))
+        return borders
+
+    # ---- building the abstraction ----
+
+    def _refresh(self) -> None:
+        if not self._built:
+            for cr in range(self.cluster_rows):
+                for cc in range(self.cluster_cols):
+                    for border in self._borders_of((cr, cc)):
+                        if border not in self._transitions:
+                            self._transitions[border] = self._find_transitions(*border)
+            for cr in range(self.cluster_rows):
+                for cc in range(self.cluster_cols):
+                    self._rebuild_cluster((cr, cc))
+            self._built = True
+            self._graph = None
+        elif self._dirty:
+            affected = set(self._dirty)
+            for border in {b for cluster in self._dirty for b in self._borders_of(cluster)}:
+                transitions = self._find_transitions(*border)
+                if transitions != self._transitions[border]:
+                    # the entrances moved, so the cluster across this border changes too
+                    self._transitions[border] = transitions
+                    affected.update(border)
+            for cluster in affected:
+                self._rebuild_cluster(cluster)
+            self._dirty.clear()
+            self._graph = None
+
+        if self._graph is None:
+            self._graph = self._assemble_graph()
+
+    # scan the cell pairs along a border, every open stretch becomes one or two entrances
+    def _find_transitions(self, a: Cluster, b: Cluster) -> List[Tuple[Pos, Pos]]:
+        r0, r1, c0, c1 = self._bounds(a)
+        if a[0] == b[0]:
+            pairs = [((r, c1 - 1), (r, c1)) for r in range(r0, r1)] # b is to the right
+        else:
+            pairs = [((r1 - 1, c), (r1, c)) for c in range(c0, c1)] # b is below
+
+        valid = self.grid.is_valid
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and valid(pair[0]) and valid(pair[1]):
+                run.append(pair)
+                continue
+            if len(run) >= LONG_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        return transitions
+
+    def _rebuild_cluster(self, cluster: Cluster) -> None:
+        entrances = set()
+        for border in self._borders_of(cluster):
+            side = 0 if border[0] == cluster else 1
+            entrances.update(pair[side] for pair in self._transitions[border])
+        self._entrances[cluster] = entrances
+
+        # one bounded Dijkstra per entrance gives its paths to all the others
+        edges: Dict[Pos, List[Edge]] = {}
+        for source in entrances:
+            dist, parents, _ = self._cluster_search(cluster, source, entrances)
+            found = []
+            for target in entrances:
+                if target != source and target in dist:
+                    path = _trace(parents, target)
+                    path.reverse()
+                    found.append((target, dist[target], path))
+            edges[source] = found
+        self._intra[cluster] = edges
+
+    def _assemble_graph(self) -> Dict[Pos, List[Edge]]:
+        graph: Dict[Pos, List[Edge]] = {}
+        for edges in self._intra.values():
+            for source, found in edges.items():
+                graph.setdefault(source, []).extend(found)
+        # single steps across cluster borders, costed in both directions
+        get_node = self.grid.get_node
+        for transitions in self._transitions.values():
+            for a, b in transitions:
+                node_a, node_b = get_node(a), get_node(b)
+                graph.setdefault(a, []).append((b, self.cost_function(node_a, node_b), [a, b]))
+                graph.setdefault(b, []).append((a, self.cost_function(node_b, node_a), [b, a]))
+        return graph
+
+    # Dijkstra that never leaves the cluster, stops once every target is settled
+    # with reverse=True edges are walked backwards (distances *to* source)
+    # a query passes its state so the expansions count against the call's budget
+    def _cluster_search(self, cluster: Cluster, source: Pos, targets: Set[Pos], reverse: bool = False,
+                        state: Optional[SearchState] = None):
+        r0, r1, c0, c1 = self._bounds(cluster)
+        grid = self.grid
+        cost = self.cost_function
+        dist = {source: 0.0}
+        parents: Dict[Pos, Optional[Pos]] = {source: None}
+        settled = set()
+        remaining = len(targets - {source})
+        heap = HeapqHeap()
+        heap.push((0.0, 0, source))
+        counter = 0
+        explored = 0
+
+        while not heap.is_empty() and remaining > 0:
+            d, _, pos = heap.pop()
+            if pos in settled:
+                continue
+            if state is not None and not state.spend():
+                break
+            settled.add(pos)
+            explored += 1
+            if pos in targets and pos != source:
+                remaining -= 1
+            current = grid.get_node(pos)
+            for neighbor in grid.get_neighbors(pos, self.connectivity):
+                n_pos = neighbor.position
+                if n_pos in settled or not (r0 <= n_pos[0] < r1 and c0 <= n_pos[1] < c1):
+                    continue
+                nd = d + (cost(neighbor, current) if reverse else cost(current, neighbor))
+                if nd < dist.get(n_pos, float("inf")):
+                    dist[n_pos] = nd
+                    parents[n_pos] = pos
+                    counter += 1
+                    heap.push((nd, counter, n_pos))
+
+        # only settled distances are final
+        return {p: dist[p] for p in settled}, parents, explored
+
+    # ---- queries ----
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        self._refresh()
+        state.bound = float("inf") # refined abstract paths are near-optimal, there is no proven factor
+        if start_pos == goal_pos:
+            return [start_pos], 1
+
+        # temporarily hook start and goal into the abstract graph
+        start_cluster = self._cluster_of(start_pos)
+        goal_cluster = self._cluster_of(goal_pos)
+        targets = set(self._entrances[start_cluster])
+        if start_cluster == goal_cluster:
+            targets.add(goal_pos) # a purely local path is a candidate too
+        dist, parents, nodes_explored = self._cluster_search(start_cluster, start_pos, targets, state=state)
+        start_edges = []
+        for target in targets:
+            if target != start_pos and target in dist:
+                path = _trace(parents, target)
+                path.reverse()
+                start_edges.append((target, dist[target], path))
+
+        dist, parents, explored = self._cluster_search(goal_cluster, goal_pos, self._entrances[goal_cluster],
+                                                       reverse=True, state=state)
+        nodes_explored += explored
+        if state.out_of_budget:
+            return None, nodes_explored
+        goal_edges = {e: (goal_pos, dist[e], _trace(parents, e)) for e in self._entrances[goal_cluster] if e != goal_pos and e in dist}
+
+        # A* over entrances, each abstract edge remembers the cell path it stands for
+        heuristic = self.heuristic_function
+        graph = self._graph
+        g = {start_pos: 0.0}
+        came_from: Dict[Pos, Tuple[Optional[Pos], List[Pos]]] = {start_pos: (None, [start_pos])}
+        closed = set()
+        heap = HeapqHeap()
+        h = heuristic(start_pos, goal_pos)
+        heap.push((h, h, 0, start_pos))
+        counter = 0
+
+        while not heap.is_empty():
+            pos = heap.pop()[3]
+            if pos in closed:
+                continue
+            if not state.spend():
+                return None, nodes_explored
+            closed.add(pos)
+            nodes_explored += 1
+            state.visited.add(pos)
+            if pos == goal_pos:
+                return self._refine(came_from, goal_pos), nodes_explored
+
+            edges = list(graph.get(pos, ()))
+            if pos == start_pos:
+                edges += start_edges
+            if pos in goal_edges:
+                edges.append(goal_edges[pos])
+            for target, cost, path in edges:
+                if target in closed:
+                    continue
+                tentative_g = g[pos] + cost
+                if tentative_g < g.get(target, float("inf")):
+                    g[target] = tentative_g
+                    came_from[target] = (pos, path)
+                    h = heuristic(target, goal_pos)
+                    counter += 1
+                    heap.push((tentative_g + h, h, counter, target))
+
+        return None, nodes_explored
+
+    # concatenate the cached cell paths of the abstract edges on the route
+    def _refine(self, came_from: Dict[Pos, Tuple[Optional[Pos], List[Pos]]], goal_pos: Pos) -> List[Pos]:
+        pieces = []
+        pos: Optional[Pos] = goal_pos
+        while pos is not None:
+            prev, path = came_from[pos]
+            pieces.append(path)
+            pos = prev
+        pieces.reverse()
+        full_path = list(pieces[0])
+        for path in pieces[1:]:
+            full_path.extend(path[1:]) # first cell repeats the end of the previous piece
+        return full_path
@@ -0,0 +1,227 @@
+from typing import Optional, List, Tuple, Callable, Dict
+from pathfinder.grid import Grid, Connectivity, SQRT2, STRAIGHT_STEPS as STRAIGHT, DIAGONAL_STEPS as DIAGONAL
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.result import PathResult
+from data_structures.min_heap import BinaryHeap
+
+
+# Jump Point Search: A* that only puts "jump points" on the open list. Straight runs
+# with nothing interesting on them are skipped in one go, so on open uniform-cost
+# maps the heap sees a handful of entries instead of every cell.
+# Follows the grid's connectivity unless given one, diagonal=True is short for
+# Connectivity.EIGHT_NO_CORNER_CUTTING (a diagonal step needs both orthogonal cells open).
+# JPS is only valid when every step costs the same, and the pruning rules here don't
+# cover corner cutting, so with non-uniform terrain costs, a cost function or
+# Connectivity.EIGHT the search falls back to plain A* under the same movement model.
+class JPSPathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            diagonal: bool = False,
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False,
+            compact_path: bool = False,
+            # hard limits for one find_path call, every expanded jump point counts once
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None
+    ):
+        if diagonal and connectivity is None:
+            connectivity = Connectivity.EIGHT_NO_CORNER_CUTTING
+        super().__init__(grid, cost_function, deadline=deadline, max_expansions=max_expansions,
+                         connectivity=connectivity, collect_stats=collect_stats, compact_path=compact_path)
+        self.diagonal = self._diagonal
+        self._use_jumps = True # decided per query in search
+        self._step_cost = 1.0 # cost of one straight step while jumping, also set per query
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        # check the costs once per query, not once per waypoint segment
+        step_cost = self._uniform_cost() if self.connectivity is not Connectivity.EIGHT else None
+        self._use_jumps = step_cost is not None
+        self._step_cost = 1.0 if step_cost is None else step_cost
+        return super().search(start, goal, keys)
+
+    # the one cost every open cell has, None when costs differ or can't be known: a cost
+    # function may price each step by both cells, so only the grid's layer is trusted
+    def _uniform_cost(self) -> Optional[float]:
+        if not self._uses_layer:
+            return None
+        grid = self.grid
+        # counted by the grid as costs are set, no scan
+        return grid.min_cost if grid.uniform_costs else None
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        if not self._use_jumps:
+            return super()._find_segment(start_pos, goal_pos, state)
+
+        heuristic = self.heuristic_function
+        step_cost = self._step_cost
+        diagonal_cost = step_cost * SQRT2
+
+        # g and parents only ever hold jump points
+        g = state.g
+        parents = state.parent
+        closed = state.closed
+        g[start_pos] = 0.0
+        parents[start_pos] = None
+        # jumps scan the grid directly, neighbor_calls stays 0 on this path
+        open_set = self._instrument(BinaryHeap(), state)
+        h = heuristic(start_pos, goal_pos)
+        open_set.push((h, h, 0, start_pos))
+        counter = 0
+        nodes_explored = 0
+
+        while not open_set.is_empty():
+            position = open_set.pop()[3]
+            if position in closed:
+                continue
+            if not state.spend():
+                return None, nodes_explored
+            closed.add(position)
+            nodes_explored += 1
+            state.visited.add(position)
+
+            if position == goal_pos:
+                return self._expand_path(parents, goal_pos), nodes_explored
+
+            for direction in self._directions(position, parents[position]):
+                jump_point = self._jump(position, direction, goal_pos)
+                if jump_point is None or jump_point in closed:
+                    continue
+                # jump points always lie on a straight or diagonal line from position
+                steps = max(abs(jump_point[0] - position[0]), abs(jump_point[1] - position[1]))
+                tentative_g = g[position] + steps * (diagonal_cost if direction[0] and direction[1] else step_cost)
+                if tentative_g < g.get(jump_point, float("inf")):
+                    g[jump_point] = tentative_g
+                    parents[jump_point] = position
+                    h = heuristic(jump_point, goal_pos)
+                    counter += 1
+                    open_set.push((tentative_g + h, h, counter, jump_point))
+
+        return None, nodes_explored
+
+    # pruned set of directions to search from pos, given the jump point we came from
+    def _directions(self, pos: Tuple[int, int], parent: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        walkable = self.grid.is_valid
+        r, c = pos
+        if parent is None:
+            dirs = [d for d in STRAIGHT if walkable((r + d[0], c + d[1]))]
+            if self.diagonal:
+                dirs += [d for d in DIAGONAL if self._can_step_diagonal(r, c, d[0], d[1])]
+            return dirs
+
+        dr = (r > parent[0]) - (r < parent[0])
+        dc = (c > parent[1]) - (c < parent[1])
+
+        if not self.diagonal:
+            # 4-connected: keep every direction except going back
+            if dc:
+                candidates = ((-1, 0), (1, 0), (0, dc))
+            else:
+                candidates = ((0, -1), (0, 1), (dr, 0))
+            return [d for d in candidates if walkable((r + d[0], c + d[1]))]
+
+        dirs = []
+        if dr and dc:
+            # diagonal arrival: natural neighbors are both straight parts and the diagonal
+            if walkable((r + dr, c)):
+                dirs.append((dr, 0))
+            if walkable((r, c + dc)):
+                dirs.append((0, dc))
+            if self._can_step_diagonal(r, c, dr, dc):
+                dirs.append((dr, dc))
+        elif dc:
+            ahead = walkable((r, c + dc))
+            up = walkable((r - 1, c))
+            down = walkable((r + 1, c))
+            if ahead:
+                dirs.append((0, dc))
+                if up:
+                    dirs.append((-1, dc))
+                if down:
+                    dirs.append((1, dc))
+            if up:
+                dirs.append((-1, 0))
+            if down:
+                dirs.append((1, 0))
+        else:
+            ahead = walkable((r + dr, c))
+            left = walkable((r, c - 1))
+            right = walkable((r, c + 1))
+            if ahead:
+                dirs.append((dr, 0))
+                if left:
+                    dirs.append((dr, -1))
+                if right:
+                    dirs.append((dr, 1))
+            if left:
+                dirs.append((0, -1))
+            if right:
+                dirs.append((0, 1))
+        return [d for d in dirs if not (d[0] and d[1]) or self._can_step_diagonal(r, c, d[0], d[1])]
+
+    def _can_step_diagonal(self, r: int, c: int, dr: int, dc: int) -> bool:
+        walkable = self.grid.is_valid
+        return walkable((r + dr, c + dc)) and walkable((r + dr, c)) and walkable((r, c + dc))
+
+    # walk from pos in direction until a jump point, the goal or a dead end (None)
+    def _jump(self, pos: Tuple[int, int], direction: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        walkable = self.grid.is_valid
+        dr, dc = direction
+        r, c = pos[0] + dr, pos[1] + dc
+        while True:
+            if not walkable((r, c)):
+                return None
+            if (r, c) == goal:
+                return r, c
+
+            if dr and dc:
+                # diagonal: stop if either straight component finds something
+                if self._jump((r, c), (dr, 0), goal) or self._jump((r, c), (0, dc), goal):
+                    return r, c
+                # no corner cutting into the next diagonal cell
+                if not (walkable((r + dr, c)) and walkable((r, c + dc))):
+                    return None
+            elif dc:
+                # forced neighbor: a cell above/below opens up right after a wall
+                if (walkable((r - 1, c)) and not walkable((r - 1, c - dc))) or \
+                        (walkable((r + 1, c)) and not walkable((r + 1, c - dc))):
+                    return r, c
+            else:
+                if (walkable((r, c - 1)) and not walkable((r - dr, c - 1))) or \
+                        (walkable((r, c + 1)) and not walkable((r - dr, c + 1))):
+                    return r, c
+                # 4-connected: a vertical run also stops where a horizontal run would find something
+                if not self.diagonal and (self._jump((r, c), (0, 1), goal) or self._jump((r, c), (0, -1), goal)):
+                    return r, c
+
+            r += dr
+            c += dc
+
+    # fill in the cells between consecutive jump points so callers get a cell-by-cell path
+    def _expand_path(self, parents: Dict[Tuple[int, int], Optional[Tuple[int, int]]], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        jump_points = []
+        pos: Optional[Tuple[int, int]] = goal
+        while pos is not None:
+            jump_points.append(pos)
+            pos = parents[pos]
+        jump_points.reverse()
+
+        path = [jump_points[0]]
+        for nxt in jump_points[1:]:
+            r, c = path[-1]
+            dr = (nxt[0] > r) - (nxt[0] < r)
+            dc = (nxt[1] > c) - (nxt[1] < c)
+            while (r, c) != nxt:
+                r += dr
+                c += dc
+                path.append((r, c))
+        return path
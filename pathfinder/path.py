@@ -0,0 +1,168 @@
+from array import array
+from itertools import repeat
+from typing import Optional, List, Tuple, Dict, Iterable, Iterator, Union
+from pathfinder.grid import STRAIGHT_STEPS, DIAGONAL_STEPS
+
+Pos = Tuple[int, int]
+
+# direction codes for runs(): index into this tuple, straight steps first like Grid.get_neighbors
+STEPS = STRAIGHT_STEPS + DIAGONAL_STEPS
+_STEP_CODES = {step: code for code, step in enumerate(STEPS)}
+
+
+# a path stored as a flat array('i') of cell indices (r * cols + c, like the grid's cost
+# layer) instead of a list of (r, c) tuples: 4 bytes a step, no tuple per cell. Reads like
+# a read-only sequence of positions, so code written for list paths keeps working, and
+# the indices can be handed out without a copy through buffer().
+class CompactPath:
+    __slots__ = ("cols", "cells")
+
+    def __init__(self, cols: int, cells: Optional[array] = None):
+        self.cols = cols
+        self.cells = array("i") if cells is None else cells
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Pos], cols: int) -> "CompactPath":
+        path = cls(cols)
+        path.extend_positions(positions)
+        return path
+
+    # ---- building ----
+
+    # append the parent chain ending in pos (as kept in SearchState.parent), start first.
+    # The chain is walked twice, once to size the array and once to fill it back to front,
+    # so no reversed list of tuples is built on the way. When the path already has cells
+    # the chain's first cell repeats the last one and is dropped.
+    def extend_chain(self, parent: Dict[Pos, Optional[Pos]], pos: Pos) -> None:
+        cells = self.cells
+        cols = self.cols
+        length = 0
+        current: Optional[Pos] = pos
+        while current is not None:
+            length += 1
+            current = parent[current]
+        if cells:
+            length -= 1
+        base = len(cells)
+        cells.extend(repeat(0, length))
+        i = base + length - 1
+        current = pos
+        while i >= base:
+            cells[i] = current[0] * cols + current[1]
+            current = parent[current]
+            i -= 1
+
+    # append positions, dropping the first one when it repeats the current last cell
+    def extend_positions(self, positions: Iterable[Pos]) -> None:
+        cols = self.cols
+        positions = iter(positions)
+        if self.cells:
+            first = next(positions, None)
+            if first is None:
+                return
+            if first[0] * cols + first[1] != self.cells[-1]:
+                self.cells.append(first[0] * cols + first[1])
+        self.cells.extend(r * cols + c for r, c in positions)
+
+    # append another compact path of the same grid straight from its buffer
+    def extend(self, other: "CompactPath") -> None:
+        if other.cols != self.cols:
+            raise ValueError("paths are on grids of different widths")
+        skip = 1 if self.cells and other.cells and other.cells[0] == self.cells[-1] else 0
+        source = other.cells
+        if other is self:
+            # an array can't grow while its own buffer is exported, read from a copy
+            source = array("i", source)
+        with memoryview(source) as view:
+            self.cells.frombytes(view[skip:].cast("B"))
+
+    # ---- reading ----
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __bool__(self) -> bool:
+        return len(self.cells) > 0
+
+    def __iter__(self) -> Iterator[Pos]:
+        cols = self.cols
+        for idx in self.cells:
+            yield divmod(idx, cols)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Pos, List[Pos]]:
+        if isinstance(i, slice):
+            return [divmod(idx, self.cols) for idx in self.cells[i]]
+        return divmod(self.cells[i], self.cols)
+
+    def __contains__(self, pos: object) -> bool:
+        if not isinstance(pos, tuple) or len(pos) != 2 or not 0 <= pos[1] < self.cols:
+            return False
+        return pos[0] * self.cols + pos[1] in self.cells
+
+    # equal to another compact path with the same cells, or to a list/tuple of the same positions
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, CompactPath):
+            return self.cols == other.cols and self.cells == other.cells
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self.cells) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"CompactPath(cols={self.cols}, cells={len(self.cells)})"
+
+    def positions(self) -> List[Pos]:
+        cols = self.cols
+        return [divmod(idx, cols) for idx in self.cells]
+
+    # ---- export ----
+
+    # read-only view of the cell indices (format "i"), shares memory with the path
+    def buffer(self) -> memoryview:
+        return memoryview(self.cells).toreadonly()
+
+    def tobytes(self) -> bytes:
+        return self.cells.tobytes()
+
+    # run-length direction codes: flat (code, count) pairs, code indexes STEPS. A 1000 step
+    # straight corridor is one pair. Only for paths of single grid steps, any-angle paths
+    # (Theta*, smoothed) jump between cells and raise ValueError.
+    def runs(self) -> array:
+        out = array("i")
+        cells = self.cells
+        cols = self.cols
+        last_code = -1
+        count = 0
+        for i in range(1, len(cells)):
+            (r0, c0), (r1, c1) = divmod(cells[i - 1], cols), divmod(cells[i], cols)
+            code = _STEP_CODES.get((r1 - r0, c1 - c0))
+            if code is None:
+                raise ValueError(f"step {(r0, c0)} -> {(r1, c1)} is not a single grid step")
+            if code == last_code:
+                count += 1
+            else:
+                if count:
+                    out.append(last_code)
+                    out.append(count)
+                last_code = code
+                count = 1
+        if count:
+            out.append(last_code)
+            out.append(count)
+        return out
+
+    @classmethod
+    def from_runs(cls, start: Pos, runs: Iterable[int], cols: int) -> "CompactPath":
+        path = cls(cols)
+        cells = path.cells
+        idx = start[0] * cols + start[1]
+        cells.append(idx)
+        runs = iter(runs)
+        for code, count in zip(runs, runs):
+            dr, dc = STEPS[code]
+            offset = dr * cols + dc
+            for _ in range(count):
+                idx += offset
+                cells.append(idx)
+        return path
@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from typing import Optional, List, Tuple, Union
+from pathfinder.grid import step_length
+from pathfinder.stats import SearchStats
+from pathfinder.path import CompactPath
+
+Pos = Tuple[int, int]
+INF = float("inf")
+
+# failure_reason values
+MISSING_ENDPOINTS = "missing_endpoints" # no start or goal given and none set on the grid
+NO_PATH = "no_path" # searched everything reachable, the goal (or a key) isn't
+BUDGET_EXHAUSTED = "budget_exhausted" # deadline or expansion limit hit before a path was found
+
+
+# everything one search() call found out. find_path returns just .path; the pathfinder's
+# nodes_explored / visited / stats attributes still hold the last call's values too.
+@dataclass
+class PathResult:
+    path: Union[List[Pos], CompactPath, None] # a CompactPath from pathfinders made with compact_path=True
+    cost: float = INF # in the pathfinder's cost model, inf without a path
+    nodes_explored: int = 0
+    failure_reason: Optional[str] = None # None when a path was found
+    stats: Optional[SearchStats] = None # with collect_stats=True
+    # cost <= bound * optimal cost: 1.0 for exact searches, inf without a path or a guarantee (BFS, DFS)
+    suboptimality_bound: float = INF
+    budget_exhausted: bool = False # also set when an anytime search returned its best so far
+
+    @property
+    def found(self) -> bool:
+        return self.path is not None
+
+
+# cost of walking path on the grid's cost layer, for searches that don't track costs (BFS, DFS)
+def path_cost(grid, path: List[Pos]) -> float:
+    get_cost = grid.get_cost
+    return sum(get_cost(b) * step_length(a, b) for a, b in zip(path, path[1:]))
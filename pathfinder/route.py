@@ -0,0 +1,225 @@
+import logging
+from time import perf_counter_ns
+from typing import Optional, List, Tuple, Callable, Dict, Set, FrozenSet
+from pathfinder.grid import Grid, Connectivity
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from pathfinder.stats import SearchStats
+from pathfinder.result import PathResult, MISSING_ENDPOINTS, NO_PATH
+from data_structures.min_heap import HeapqHeap
+
+Pos = Tuple[int, int]
+Segment = Tuple[float, List[Pos]] # (cost, cell path)
+INF = float("inf")
+logger = logging.getLogger(__name__)
+
+# Held-Karp is O(2^k * k^2), fine up to about this many keys
+EXACT_KEY_LIMIT = 10
+
+
+# Visits every key in the cheapest order instead of insertion order.
+# Key-to-key costs come from one multi-target Dijkstra per waypoint (start, keys, goal),
+# cached together with the segment paths until the grid changes (grid.version).
+# The order is solved exactly with Held-Karp dynamic programming for small key counts
+# and with nearest neighbour + 2-opt above EXACT_KEY_LIMIT.
+class KeyRoutePathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Grid,
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False
+    ):
+        super().__init__(grid, cost_function, connectivity=connectivity, collect_stats=collect_stats)
+        # source -> (targets searched for, target -> (cost, cell path)), valid for _cache_version
+        # unreachable targets are simply missing from the inner dict
+        self._segments: Dict[Pos, Tuple[FrozenSet[Pos], Dict[Pos, Segment]]] = {}
+        self._cache_version = -1
+        self.order: List[Pos] = [] # key order used by the last route
+        self.route_cost = INF
+
+    def search(
+            self,
+            start: Optional[Tuple[int, int]] = None,
+            goal: Optional[Tuple[int, int]] = None,
+            keys: Optional[List[Tuple[int, int]]] = None
+    ) -> PathResult:
+        start = self.grid.start if start is None else start
+        goal = self.grid.goal if goal is None else goal
+        keys = self.grid.keys if keys is None else keys
+        if start is None or goal is None:
+            logger.debug("Route: start or goal not set")
+            return PathResult(None, failure_reason=MISSING_ENDPOINTS)
+
+        state = SearchState(stats=SearchStats() if self.collect_stats else None)
+        stats = state.stats
+        nodes_explored = 0
+        self.suboptimality_bound = INF
+        keys = [k for k in dict.fromkeys(keys) if k not in (start, goal)]
+        waypoints = [start] + keys + [goal]
+
+        # drop everything once the map changed, otherwise only search from waypoints
+        # whose cached search did not cover all of the current targets
+        if self._cache_version != self.grid.version:
+            self._segments.clear()
+            self._cache_version = self.grid.version
+        for source in waypoints[:-1]:
+            targets = set(waypoints) - {source}
+            cached = self._segments.get(source)
+            if cached is None or not targets <= cached[0]:
+                # one timed segment per source searched, cached sources cost nothing
+                search_start = perf_counter_ns() if stats is not None else 0
+                found, explored = self._multi_target_dijkstra(source, targets, state)
+                if stats is not None:
+                    stats.segment_ns.append(perf_counter_ns() - search_start)
+                self._segments[source] = (frozenset(targets), found)
+                nodes_explored += explored
+
+        # segments are exact Dijkstra paths, the order is only proven optimal by Held-Karp
+        if len(keys) <= EXACT_KEY_LIMIT:
+            order, total = self._held_karp(start, keys, goal)
+            bound = 1.0
+        else:
+            order, total = self._two_opt(start, self._nearest_neighbour(start, keys), goal)
+            bound = INF
+
+        self._publish(state, nodes_explored)
+        if total == INF:
+            logger.debug("Route: no path found, nodes explored %d", nodes_explored)
+            return PathResult(None, INF, nodes_explored, NO_PATH, stats)
+
+        # stitch the cached segments, dropping each segment's repeated first cell
+        full_path = [start]
+        stops = [start] + order + [goal]
+        for a, b in zip(stops, stops[1:]):
+            if a != b:
+                full_path.extend(self._segments[a][1][b][1][1:])
+
+        self.order = order
+        self.route_cost = total
+        self.suboptimality_bound = bound
+        logger.debug("Route: found, length %d, cost %s, key order %s, nodes explored %d",
+                     len(full_path), total, order, nodes_explored)
+        return PathResult(full_path, total, nodes_explored, None, stats, bound)
+
+    def _segment_cost(self, a: Pos, b: Pos) -> float:
+        if a == b:
+            return 0.0
+        found = self._segments[a][1].get(b)
+        return INF if found is None else found[0]
+
+    # plain Dijkstra from source that stops once every target is settled
+    # settled cells go into state.visited for display, returns (segments found, cells settled)
+    def _multi_target_dijkstra(self, source: Pos, targets: Set[Pos], state: SearchState) -> Tuple[Dict[Pos, Segment], int]:
+        grid = self.grid
+        cost = self.cost_function
+        dist = {source: 0.0}
+        parents: Dict[Pos, Optional[Pos]] = {source: None}
+        settled = set()
+        remaining = set(targets)
+        heap = self._instrument(HeapqHeap(), state)
+        get_neighbors = self._neighbor_source(state)
+        heap.push((0.0, 0, source))
+        counter = 0
+        explored = 0
+
+        while not heap.is_empty() and remaining:
+            d, _, pos = heap.pop()
+            if pos in settled:
+                continue
+            settled.add(pos)
+            state.visited.add(pos)
+            explored += 1
+            remaining.discard(pos)
+            current = grid.get_node(pos)
+            for neighbor in get_neighbors(pos, self.connectivity):
+                n_pos = neighbor.position
+                if n_pos in settled:
+                    continue
+                nd = d + cost(current, neighbor)
+                if nd < dist.get(n_pos, INF):
+                    dist[n_pos] = nd
+                    parents[n_pos] = pos
+                    counter += 1
+                    heap.push((nd, counter, n_pos))
+
+        found: Dict[Pos, Segment] = {}
+        for target in targets:
+            if target in settled:
+                path = []
+                pos: Optional[Pos] = target
+                while pos is not None:
+                    path.append(pos)
+                    pos = parents[pos]
+                path.reverse()
+                found[target] = (dist[target], path)
+        return found, explored
+
+    # exact order: dp[mask][j] = cheapest start -> (keys in mask) ending at key j
+    def _held_karp(self, start: Pos, keys: List[Pos], goal: Pos) -> Tuple[List[Pos], float]:
+        cost = self._segment_cost
+        n = len(keys)
+        if n == 0:
+            return [], cost(start, goal)
+        full = (1 << n) - 1
+        dp = [[INF] * n for _ in range(1 << n)]
+        back = [[-1] * n for _ in range(1 << n)]
+        for j in range(n):
+            dp[1 << j][j] = cost(start, keys[j])
+        for mask in range(1, full + 1):
+            row = dp[mask]
+            for j in range(n):
+                here = row[j]
+                if here == INF or not mask & (1 << j):
+                    continue
+                for k in range(n):
+                    if mask & (1 << k):
+                        continue
+                    step = here + cost(keys[j], keys[k])
+                    nxt = mask | (1 << k)
+                    if step < dp[nxt][k]:
+                        dp[nxt][k] = step
+                        back[nxt][k] = j
+
+        total, last = min((dp[full][j] + cost(keys[j], goal), j) for j in range(n))
+        if total == INF:
+            return [], INF
+        order = []
+        mask = full
+        while last != -1:
+            order.append(keys[last])
+            mask, last = mask & ~(1 << last), back[mask][last]
+        order.reverse()
+        return order, total
+
+    def _route_cost(self, start: Pos, order: List[Pos], goal: Pos) -> float:
+        stops = [start] + order + [goal]
+        return sum(self._segment_cost(a, b) for a, b in zip(stops, stops[1:]))
+
+    def _nearest_neighbour(self, start: Pos, keys: List[Pos]) -> List[Pos]:
+        order = []
+        left = list(keys)
+        current = start
+        while left:
+            nxt = min(left, key=lambda k: self._segment_cost(current, k))
+            left.remove(nxt)
+            order.append(nxt)
+            current = nxt
+        return order
+
+    # improve an order by reversing sub-runs while that lowers the total cost
+    def _two_opt(self, start: Pos, order: List[Pos], goal: Pos) -> Tuple[List[Pos], float]:
+        best = self._route_cost(start, order, goal)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(order) - 1):
+                for j in range(i + 1, len(order)):
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    candidate_cost = self._route_cost(start, candidate, goal)
+                    if candidate_cost < best:
+                        order, best = candidate, candidate_cost
+                        improved = True
+        return order, best
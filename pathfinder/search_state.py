@@ -0,0 +1,61 @@
+from time import perf_counter
+from typing import Optional, List, Tuple, Dict, Set
+from pathfinder.stats import SearchStats
+
+Pos = Tuple[int, int]
+
+
+# everything one find_path call writes while searching. Pathfinders keep this per call
+# instead of writing g/parent/visited onto the grid's nodes, so a grid is never modified
+# by a search and several searches (threads, executor jobs) can run on it at once.
+class SearchState:
+    __slots__ = ("g", "parent", "closed", "visited", "deadline", "expansions_left",
+                 "out_of_budget", "bound", "segments_left", "stats", "path")
+
+    def __init__(
+            self,
+            deadline: Optional[float] = None,
+            max_expansions: Optional[int] = None,
+            stats: Optional[SearchStats] = None
+    ):
+        self.g: Dict[Pos, float] = {} # best known cost from the segment start
+        self.parent: Dict[Pos, Optional[Pos]] = {}
+        self.closed: Set[Pos] = set() # expanded in the current segment
+        self.visited: Set[Pos] = set() # expanded over the whole call, for display
+
+        # budget for the whole call: deadline is a perf_counter() time, both optional
+        self.deadline = deadline
+        self.expansions_left = max_expansions
+        self.out_of_budget = False
+        # worst suboptimality factor of any segment so far (1.0 = optimal)
+        self.bound = 1.0
+        self.segments_left = 1 # including the one being searched
+        self.stats = stats # None unless the pathfinder collects stats
+        self.path = None # the call's CompactPath when the pathfinder builds compact paths
+
+    # waypoint segments search independently, only the visited cells carry over
+    def new_segment(self) -> None:
+        self.g = {}
+        self.parent = {}
+        self.closed = set()
+
+    # pay for one expansion, False once the deadline or the expansion budget is used up
+    def spend(self) -> bool:
+        if self.expansions_left is not None:
+            if self.expansions_left <= 0:
+                self.out_of_budget = True
+                return False
+            self.expansions_left -= 1
+        if self.deadline is not None and perf_counter() > self.deadline:
+            self.out_of_budget = True
+            return False
+        return True
+
+    def reconstruct_path(self, pos: Pos) -> List[Pos]:
+        path: List[Pos] = []
+        current: Optional[Pos] = pos
+        while current is not None:
+            path.append(current)
+            current = self.parent[current]
+        path.reverse()
+        return path
@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, Callable, Dict, Sequence, Any
+
+Pos = Tuple[int, int]
+# identical queries on the same map version share one computation
+RequestKey = Tuple[Pos, Pos, Tuple[Pos, ...], int]
+
+
+# asyncio front end for the blocking pathfinders. Each query runs in a worker pool so the
+# event loop never blocks, and a query that is already being computed for the same map
+# version is not started again: later callers just wait on the same future.
+# Pathfinders keep their search state per call, so one instance is shared by all workers.
+# Workers must be threads: they share this service's pathfinder and grid, which a process
+# pool can't pickle. The searches are pure Python and hold the GIL, so threads buy
+# responsiveness, not CPU parallelism; for that run batches through BatchPathfinder.
+class PathService:
+
+    def __init__(
+            self,
+            grid,
+            # builds the pathfinder, e.g. AStarPathfinder or lambda g: AStarPathfinder(g, cost)
+            pathfinder_factory: Callable[[Any], Any],
+            executor: Optional[ThreadPoolExecutor] = None,
+            max_workers: int = 4,
+            timeout: Optional[float] = None # default per-request timeout in seconds
+    ):
+        if executor is not None and not isinstance(executor, ThreadPoolExecutor):
+            raise TypeError("PathService needs a ThreadPoolExecutor, use BatchPathfinder for process pools")
+        self.grid = grid
+        self.pathfinder = pathfinder_factory(grid)
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.timeout = timeout
+        # key -> (shared future, number of callers still waiting on it)
+        self._in_flight: Dict[RequestKey, List[Any]] = {}
+        self.computed = 0 # queries that actually ran
+        self.coalesced = 0 # queries answered by joining one already running
+
+    async def close(self) -> None:
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    # the worker searches the live grid: an edit that lands mid-search could leave a path
+    # from a mix of both maps, so search again until no edit happened while searching.
+    # Callers coalesced on an older version get the newer map's answer.
+    def _run(self, start: Pos, goal: Pos, keys: List[Pos]) -> Optional[List[Pos]]:
+        while True:
+            version = self.grid.version
+            path = self.pathfinder.find_path(start, goal, keys)
+            if self.grid.version == version:
+                return path
+
+    async def find_path(
+            self,
+            start: Pos,
+            goal: Pos,
+            keys: Sequence[Pos] = (),
+            timeout: Optional[float] = None
+    ) -> Optional[List[Pos]]:
+        key = (start, goal, tuple(keys), self.grid.version)
+        entry = self._in_flight.get(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._run, start, goal, list(keys))
+            entry = self._in_flight[key] = [future, 0]
+            # forget the entry as soon as the computation ends, later calls start a new one
+            future.add_done_callback(lambda _: self._forget(key, entry))
+            self.computed += 1
+        else:
+            self.coalesced += 1
+
+        entry[1] += 1
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            # shield: a caller timing out or being cancelled must not cancel the other waiters
+            return await asyncio.wait_for(asyncio.shield(entry[0]), timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                # nobody is waiting any more; this only stops work that has not started yet
+                entry[0].cancel()
+                self._forget(key, entry)
+
+    def _forget(self, key: RequestKey, entry: List[Any]) -> None:
+        if self._in_flight.get(key) is entry:
+            del self._in_flight[key]
@@ -0,0 +1,87 @@
+import sys
+from dataclasses import dataclass, field
+from typing import List, Tuple, Callable, Any
+
+Pos = Tuple[int, int]
+
+
+# counters for one find_path call, kept when a pathfinder is made with collect_stats=True.
+# Pathfinders without stats use their open set and grid.get_neighbors directly, the counting
+# happens in the wrappers below, so turning collection off leaves the search loops untouched.
+@dataclass
+class SearchStats:
+    expansions: int = 0 # cells expanded (nodes_explored)
+    pushes: int = 0 # open set / queue / stack insertions
+    pops: int = 0
+    stale_pops: int = 0 # pops that expanded nothing: duplicates of closed cells, budget stops
+    max_open_size: int = 0 # most entries the open set held at once
+    neighbor_calls: int = 0 # grid.get_neighbors calls
+    reset_ns: int = 0 # setting up and clearing search state, per call and per segment
+    segment_ns: List[int] = field(default_factory=list) # search time of each waypoint segment
+    peak_frontier_bytes: int = 0 # estimated memory of the open set at max_open_size
+
+    @property
+    def total_ns(self) -> int:
+        return self.reset_ns + sum(self.segment_ns)
+
+    # counters that only make sense once the call is over
+    def finish(self, expansions: int) -> None:
+        self.expansions = expansions
+        self.stale_pops = max(0, self.pops - expansions)
+
+
+# bytes one open set entry holds: the tuple, what it points to (shared cells counted too)
+# and the slot in the heap's list
+def _entry_bytes(entry: Any) -> int:
+    size = sys.getsizeof(entry) + 8
+    if isinstance(entry, tuple):
+        size += sum(sys.getsizeof(item) for item in entry)
+    return size
+
+
+# counts traffic through an open set, queue or stack and passes everything on to it.
+# push/enqueue and pop/dequeue are both understood, other calls (peek, drain, ...) go
+# straight to the wrapped container.
+class CountingFrontier:
+
+    def __init__(self, inner, stats: SearchStats):
+        self.inner = inner
+        self.stats = stats
+        self._push = getattr(inner, "push", None) or inner.enqueue
+        self._pop = getattr(inner, "pop", None) or inner.dequeue
+        self._entry_size = 0
+
+    def push(self, item: Any) -> None:
+        stats = self.stats
+        stats.pushes += 1 # counted before the push, a rejected entry is re-pushed uncounted
+        self._push(item)
+        size = len(self.inner)
+        if size > stats.max_open_size:
+            stats.max_open_size = size
+            if not self._entry_size:
+                self._entry_size = _entry_bytes(item)
+            stats.peak_frontier_bytes = max(stats.peak_frontier_bytes, size * self._entry_size)
+
+    def pop(self) -> Any:
+        self.stats.pops += 1
+        return self._pop()
+
+    enqueue = push
+    dequeue = pop
+
+    def is_empty(self) -> bool:
+        return self.inner.is_empty()
+
+    def __len__(self) -> int:
+        return len(self.inner)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+
+# grid.get_neighbors that counts its calls
+def counting_neighbors(get_neighbors: Callable, stats: SearchStats) -> Callable:
+    def neighbors(pos: Pos, *args):
+        stats.neighbor_calls += 1
+        return get_neighbors(pos, *args)
+    return neighbors
@@ -0,0 +1,223 @@
+import math
+from typing import Optional, List, Tuple, Callable, Iterable, Union
+from pathfinder.grid import Grid, Connectivity, step_length
+from pathfinder.compact_grid import CompactGrid
+from pathfinder.node import Node
+from pathfinder.Astar import AStarPathfinder
+from pathfinder.search_state import SearchState
+from data_structures.min_heap import BinaryHeap
+
+Pos = Tuple[int, int]
+CellCost = Callable[[Pos], float]
+INF = float("inf")
+
+
+# walk the straight line between the centres of cells a and b and return its cost, the
+# sum over every cell it passes through of cell cost * length of line inside the cell, or
+# None if any of those cells is a barrier. This is a supercover traversal: cells are
+# stepped through exactly where the line crosses their borders, and where it passes
+# exactly through a corner both cells beside that corner must be open too, so a line
+# never slips between two diagonal barriers. Border crossings are compared as integers
+# (the line starts and ends on cell centres), so corners are detected exactly.
+def line_cost(grid: Union[Grid, CompactGrid], a: Pos, b: Pos, cell_cost: Optional[CellCost] = None) -> Optional[float]:
+    walkable = grid.is_valid
+    cost = cell_cost or grid.get_cost
+    r, c = a
+    dr, dc = b[0] - r, b[1] - c
+    adr, adc = abs(dr), abs(dc)
+    step_r = (dr > 0) - (dr < 0)
+    step_c = (dc > 0) - (dc < 0)
+    length = math.hypot(dr, dc)
+    rows_crossed = cols_crossed = 0
+    t = 0.0 # how far along the line we are, 0 at a and 1 at b
+    total = 0.0
+
+    while True:
+        if not walkable((r, c)):
+            return None
+        if (r, c) == b:
+            return total + cost((r, c)) * (1.0 - t) * length
+        # the next row border is at t = (2i + 1) / (2 * adr), the next column border at
+        # t = (2j + 1) / (2 * adc); cross-multiplied they compare without rounding
+        row_key = (2 * rows_crossed + 1) * adc if adr else None
+        col_key = (2 * cols_crossed + 1) * adr if adc else None
+        if row_key is not None and (col_key is None or row_key <= col_key):
+            t_next = (2 * rows_crossed + 1) / (2 * adr)
+        else:
+            t_next = (2 * cols_crossed + 1) / (2 * adc)
+        total += cost((r, c)) * (t_next - t) * length
+        t = t_next
+
+        if row_key is not None and row_key == col_key:
+            # exactly through a corner: both cells beside it have to be open
+            if not walkable((r + step_r, c)) or not walkable((r, c + step_c)):
+                return None
+            r += step_r
+            c += step_c
+            rows_crossed += 1
+            cols_crossed += 1
+        elif col_key is None or (row_key is not None and row_key < col_key):
+            r += step_r
+            rows_crossed += 1
+        else:
+            c += step_c
+            cols_crossed += 1
+
+
+def line_of_sight(grid: Union[Grid, CompactGrid], a: Pos, b: Pos) -> bool:
+    return line_cost(grid, a, b, _unit_cost) is not None
+
+
+def _unit_cost(pos: Pos) -> float:
+    return 1.0
+
+
+# string pulling: drop every cell the path can see past, keeping only the turning points.
+# A shortcut is only taken if it is no more expensive than the stretch of path it replaces
+# (on uniform maps that always holds), cells in keep (e.g. the keys) always stay.
+# Works on the result of any find_path; the output is still barrier-free segment by segment.
+def smooth_path(
+        grid: Union[Grid, CompactGrid],
+        path: Optional[List[Pos]],
+        keep: Iterable[Pos] = (),
+        cell_cost: Optional[CellCost] = None
+) -> Optional[List[Pos]]:
+    if not path or len(path) <= 2:
+        return path
+    cost = cell_cost or grid.get_cost
+    keep = set(keep)
+
+    # cost of the original path up to each cell, in the same line model
+    prefix = [0.0]
+    for a, b in zip(path, path[1:]):
+        prefix.append(prefix[-1] + (cost(a) + cost(b)) / 2 * step_length(a, b))
+
+    smoothed = [path[0]]
+    anchor = 0
+    for i in range(2, len(path)):
+        if path[i - 1] in keep:
+            anchor = i - 1
+            smoothed.append(path[anchor])
+            continue
+        shortcut = line_cost(grid, path[anchor], path[i], cost)
+        if shortcut is None or shortcut > prefix[i] - prefix[anchor] + 1e-9:
+            anchor = i - 1
+            smoothed.append(path[anchor])
+    smoothed.append(path[-1])
+    return smoothed
+
+
+# Theta*: A* where a cell's parent may be any cell it can see, not just a neighbor. When a
+# neighbor is reached, the line from the current cell's parent straight to it is tried first,
+# so paths come out as any-angle waypoint lists instead of grid staircases.
+# lazy=True gives Lazy Theta*: the line is assumed clear when a cell is reached and only
+# checked once the cell is expanded, falling back to the best expanded neighbor when it isn't.
+# That is one line check per expansion instead of one per neighbor.
+# Costs follow the line model of line_cost (cell cost * distance travelled in the cell),
+# with the euclidean heuristic; results are not guaranteed optimal, so
+# suboptimality_bound is reported as inf.
+class ThetaStarPathfinder(AStarPathfinder):
+
+    def __init__(
+            self,
+            grid: Union[Grid, CompactGrid],
+            cost_function: Optional[Callable[[Node, Node], float]] = None,
+            lazy: bool = False,
+            connectivity: Optional[Connectivity] = None,
+            collect_stats: bool = False,
+            compact_path: bool = False
+    ):
+        super().__init__(grid, cost_function, "binary", heuristic="scaled_euclidean", connectivity=connectivity,
+                         collect_stats=collect_stats, compact_path=compact_path)
+        self.lazy = lazy
+        self._user_cost = cost_function
+
+    # cost of one unit of distance inside pos
+    def _cell_cost(self, pos: Pos) -> float:
+        if self._user_cost is None:
+            return self.grid.get_cost(pos)
+        node = self.grid.get_node(pos)
+        return self._user_cost(node, node)
+
+    def _step_cost(self, a: Pos, b: Pos) -> float:
+        return (self._cell_cost(a) + self._cell_cost(b)) / 2 * step_length(a, b)
+
+    def _find_segment(self, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], state: SearchState) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        grid = self.grid
+        g = state.g
+        parent = state.parent
+        closed = state.closed
+        heuristic = self.heuristic_function
+        cell_cost = self._cell_cost
+        get_neighbors = self._neighbor_source(state)
+        state.bound = INF
+
+        g[start_pos] = 0.0
+        parent[start_pos] = None
+        open_set = self._instrument(BinaryHeap(), state)
+        h = heuristic(start_pos, goal_pos)
+        open_set.push((h, h, 0, start_pos))
+        counter = 0
+        nodes_explored = 0
+
+        while not open_set.is_empty():
+            position = open_set.pop()[3]
+            if position in closed:
+                continue
+            if not state.spend():
+                return None, nodes_explored
+
+            if self.lazy:
+                self._settle(position, state)
+            closed.add(position)
+            state.visited.add(position)
+            nodes_explored += 1
+
+            if position == goal_pos:
+                return self._segment_path(state, position), nodes_explored
+
+            via = parent[position]
+            for neighbor in get_neighbors(position, self.connectivity):
+                n_pos = neighbor.position
+                if n_pos in closed:
+                    continue
+                # path 2: straight from our parent, path 1: through this cell
+                candidate, source = INF, position
+                if via is not None:
+                    if self.lazy:
+                        candidate = g[via] + (cell_cost(via) + cell_cost(n_pos)) / 2 * math.dist(via, n_pos)
+                        source = via
+                    else:
+                        line = line_cost(grid, via, n_pos, cell_cost)
+                        if line is not None:
+                            candidate, source = g[via] + line, via
+                if source is position:
+                    candidate = g[position] + self._step_cost(position, n_pos)
+                if candidate < g.get(n_pos, INF):
+                    g[n_pos] = candidate
+                    parent[n_pos] = source
+                    h = heuristic(n_pos, goal_pos)
+                    counter += 1
+                    open_set.push((candidate + h, h, counter, n_pos))
+
+        return None, nodes_explored
+
+    # Lazy Theta*: pos was queued assuming a clear, estimated line from its parent. Check it
+    # now, and if it is blocked or dearer than a step from an expanded neighbor, take that.
+    def _settle(self, pos: Pos, state: SearchState) -> None:
+        g = state.g
+        via = state.parent[pos]
+        if via is None:
+            return
+        line = line_cost(self.grid, via, pos, self._cell_cost)
+        if line is None and any(n.position == pos for n in self.grid.get_neighbors(via, self.connectivity)):
+            line = self._step_cost(via, pos) # a legal diagonal step past a blocked corner
+        best, best_via = (g[via] + line, via) if line is not None else (INF, None)
+        for neighbor in self.grid.get_neighbors(pos, self.connectivity):
+            n_pos = neighbor.position
+            if n_pos in state.closed:
+                through = g[n_pos] + self._step_cost(n_pos, pos)
+                if through < best:
+                    best, best_via = through, n_pos
+        g[pos] = best
+        state.parent[pos] = best_via
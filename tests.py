@@ -1,10 +1,31 @@
+import gc
 import time
+import asyncio
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import List, Tuple, Optional
-from pathfinder.grid import Grid
+from pathfinder.grid import Grid, Connectivity, step_length
 from pathfinder.Astar import AStarPathfinder
 from pathfinder.BFS import BFSPathfinder
 from pathfinder.DFS import DFSPathfinder
 from pathfinder.node import Node
+from pathfinder.compact_grid import CompactGrid
+from pathfinder.jps import JPSPathfinder
+from pathfinder.hpa import HPAStarPathfinder
+from pathfinder.dstar_lite import DStarLitePathfinder
+from pathfinder.route import KeyRoutePathfinder, EXACT_KEY_LIMIT
+from pathfinder.bitset_bfs import BitsetBFSPathfinder
+from pathfinder.field_cache import GoalFieldCache
+from pathfinder.batch import BatchPathfinder
+from pathfinder.service import PathService
+from pathfinder.anytime import AnytimeAStarPathfinder
+from pathfinder.heuristics import LandmarkHeuristic, make_heuristic
+from pathfinder.theta import ThetaStarPathfinder, smooth_path, line_of_sight
+from pathfinder.bidirectional import BidirectionalAStarPathfinder, BidirectionalBFSPathfinder
+from data_structures.min_heap import HEAP_BACKENDS, IndexedMinHeap
+from benchmark import SCENARIOS, build_map, measure, compare
+from pathfinder.result import NO_PATH, MISSING_ENDPOINTS, BUDGET_EXHAUSTED, path_cost
+from pathfinder.path import CompactPath
 
 class TestRunner:
     @staticmethod
@@ -40,6 +61,150 @@ class TestRunner:
             print("Test 5 (Optimality): PASS")
         else:
             print("Test 5 (Optimality): FAIL")
+
+        # Test 6: Compact Grid
+        if TestRunner._test_compact_grid():
+            print("Test 6 (Compact Grid): PASS")
+        else:
+            print("Test 6 (Compact Grid): FAIL")
+
+        # Test 7: Repeated Searches (stale state must not leak between runs)
+        if TestRunner._test_repeated_searches():
+            print("Test 7 (Repeated Searches): PASS")
+        else:
+            print("Test 7 (Repeated Searches): FAIL")
+
+        # Test 8: Heap Backends
+        if TestRunner._test_heap_backends():
+            print("Test 8 (Heap Backends): PASS")
+        else:
+            print("Test 8 (Heap Backends): FAIL")
+
+        # Test 9: Bidirectional Search
+        if TestRunner._test_bidirectional():
+            print("Test 9 (Bidirectional): PASS")
+        else:
+            print("Test 9 (Bidirectional): FAIL")
+
+        # Test 10: Jump Point Search
+        if TestRunner._test_jump_point_search():
+            print("Test 10 (Jump Point Search): PASS")
+        else:
+            print("Test 10 (Jump Point Search): FAIL")
+
+        # Test 11: Hierarchical A*
+        if TestRunner._test_hierarchical():
+            print("Test 11 (HPA*): PASS")
+        else:
+            print("Test 11 (HPA*): FAIL")
+
+        # Test 12: Incremental Replanning
+        if TestRunner._test_incremental_replanning():
+            print("Test 12 (D* Lite Replanning): PASS")
+        else:
+            print("Test 12 (D* Lite Replanning): FAIL")
+
+        # Test 13: Key Order Optimization
+        if TestRunner._test_key_route():
+            print("Test 13 (Key Route): PASS")
+        else:
+            print("Test 13 (Key Route): FAIL")
+
+        # Test 14: Frontier-at-a-time BFS
+        if TestRunner._test_bitset_bfs():
+            print("Test 14 (Bitset BFS): PASS")
+        else:
+            print("Test 14 (Bitset BFS): FAIL")
+
+        # Test 15: Many-to-one Queries
+        if TestRunner._test_goal_field_cache():
+            print("Test 15 (Goal Field Cache): PASS")
+        else:
+            print("Test 15 (Goal Field Cache): FAIL")
+
+        # Test 16: Batch Queries
+        if TestRunner._test_batch_queries():
+            print("Test 16 (Batch Queries): PASS")
+        else:
+            print("Test 16 (Batch Queries): FAIL")
+
+        # Test 17: Concurrent Searches
+        if TestRunner._test_concurrent_searches():
+            print("Test 17 (Concurrent Searches): PASS")
+        else:
+            print("Test 17 (Concurrent Searches): FAIL")
+
+        # Test 18: Async Service
+        if TestRunner._test_path_service():
+            print("Test 18 (Path Service): PASS")
+        else:
+            print("Test 18 (Path Service): FAIL")
+
+        # Test 19: Anytime Search
+        if TestRunner._test_anytime_search():
+            print("Test 19 (Anytime A*): PASS")
+        else:
+            print("Test 19 (Anytime A*): FAIL")
+
+        # Test 20: Heuristics
+        if TestRunner._test_heuristics():
+            print("Test 20 (Heuristics / ALT): PASS")
+        else:
+            print("Test 20 (Heuristics / ALT): FAIL")
+
+        # Test 21: Cost Layer
+        if TestRunner._test_cost_layer():
+            print("Test 21 (Cost Layer): PASS")
+        else:
+            print("Test 21 (Cost Layer): FAIL")
+
+        # Test 22: Connectivity
+        if TestRunner._test_connectivity():
+            print("Test 22 (Connectivity): PASS")
+        else:
+            print("Test 22 (Connectivity): FAIL")
+
+        # Test 23: Any-Angle Paths
+        if TestRunner._test_any_angle():
+            print("Test 23 (Theta* / Smoothing): PASS")
+        else:
+            print("Test 23 (Theta* / Smoothing): FAIL")
+
+        # Test 24: Benchmark Maps
+        if TestRunner._test_benchmark_maps():
+            print("Test 24 (Benchmark Maps): PASS")
+        else:
+            print("Test 24 (Benchmark Maps): FAIL")
+
+        # Test 25: Regression Gate
+        if TestRunner._test_regression_gate():
+            print("Test 25 (Regression Gate): PASS")
+        else:
+            print("Test 25 (Regression Gate): FAIL")
+
+        # Test 26: Search Stats
+        if TestRunner._test_search_stats():
+            print("Test 26 (Search Stats): PASS")
+        else:
+            print("Test 26 (Search Stats): FAIL")
+
+        # Test 27: Path Results
+        if TestRunner._test_path_results():
+            print("Test 27 (Path Results): PASS")
+        else:
+            print("Test 27 (Path Results): FAIL")
+
+        # Test 28: Compact Paths
+        if TestRunner._test_compact_paths():
+            print("Test 28 (Compact Paths): PASS")
+        else:
+            print("Test 28 (Compact Paths): FAIL")
+
+        # Test 29: JPS Step Costs
+        if TestRunner._test_jps_step_costs():
+            print("Test 29 (JPS Step Costs): PASS")
+        else:
+            print("Test 29 (JPS Step Costs): FAIL")
             
         print("Tests Completed.")
 
@@ -190,3 +355,937 @@ class TestRunner:
             return False
             
         return True
+
+    @staticmethod
+    def _test_compact_grid() -> bool:
+        # same snake maze as test 4, but on the array-backed grid
+        grid = CompactGrid(5, 5)
+        grid.set_start((0, 0))
+        grid.set_goal((4, 4))
+        for c in range(4):
+            grid.add_barrier((1, c))
+        for c in range(1, 5):
+            grid.add_barrier((3, c))
+
+        p1 = AStarPathfinder(grid).find_path()
+        p2 = BFSPathfinder(grid).find_path()
+        p3 = DFSPathfinder(grid).find_path()
+        for p in (p1, p2, p3):
+            if not p or not TestRunner._validate_path(p, grid):
+                return False
+
+        # only one route exists through the snake: 4 right, 2 down, 4 left, 2 down, 4 right
+        if len(p1) != 17 or len(p2) != 17:
+            print(f"    CompactGrid non-optimal: {len(p1)}, {len(p2)} vs 17")
+            return False
+
+        # neighbor tuples are shared between lookups and rebuilt after an edit
+        if grid.get_neighbors((2, 2)) is not grid.get_neighbors((2, 2)):
+            return False
+        grid.add_barrier((2, 3))
+        if [n.position for n in grid.get_neighbors((2, 2))] != [(2, 1)]:
+            return False
+
+        # costs are bounds checked like walkability
+        try:
+            grid.get_cost((0, 5))
+            return False
+        except IndexError:
+            return grid.get_cost((4, 4)) == 1.0
+
+    @staticmethod
+    def _test_repeated_searches() -> bool:
+        grid = Grid(6, 6)
+        grid.set_start((0, 0))
+        grid.set_goal((5, 5))
+
+        astar = AStarPathfinder(grid)
+        p1 = astar.find_path()
+
+        # wall off most of row 2, second run has to detour through the gap
+        for c in range(5):
+            grid.add_barrier((2, c))
+        p2 = astar.find_path()
+        p3 = BFSPathfinder(grid).find_path()
+        if not p2 or not TestRunner._validate_path(p2, grid) or len(p2) != len(p3):
+            return False
+        if len(p1) != 11 or len(p2) != 11:
+            return False
+
+        # search state lives with each call, the grid's nodes are never written to
+        return all(node.parent is None and not node.visited for node in grid.nodes.values())
+
+    @staticmethod
+    def _test_heap_backends() -> bool:
+        # every backend must pop in sorted order
+        items = [(5, "e"), (1, "a"), (4, "d"), (2, "b"), (3, "c"), (0, "z")]
+        for name, backend in HEAP_BACKENDS.items():
+            heap = backend()
+            for item in items:
+                heap.push(item)
+            popped = [heap.pop() for _ in range(len(items))]
+            if popped != sorted(items):
+                print(f"    {name} heap out of order: {popped}")
+                return False
+
+        # decrease-key replaces the queued entry instead of adding a duplicate
+        heap = IndexedMinHeap()
+        heap.push((5, "a"))
+        heap.push((7, "b"))
+        heap.push((1, "b"))
+        heap.push((9, "a")) # worse than the queued entry, ignored
+        if heap.remove("c") or len(heap) != 2 or heap.pop() != (1, "b") or heap.pop() != (5, "a"):
+            return False
+
+        # removing a queued key from the middle and from the last slot keeps the heap in order
+        heap = IndexedMinHeap()
+        for priority, key in [(1, "a"), (4, "b"), (2, "c"), (6, "d"), (5, "e"), (3, "f"), (7, "g")]:
+            heap.push((priority, key))
+        last_key = heap.heap[-1][-1]
+        if not heap.remove("b") or "b" in heap or len(heap) != 6:
+            return False
+        if not heap.remove(last_key) or last_key in heap or len(heap) != 5:
+            return False
+        drained = [heap.pop() for _ in range(5)]
+        expected = sorted(item for item in [(1, "a"), (2, "c"), (6, "d"), (5, "e"), (3, "f"), (7, "g")]
+                          if item[1] != last_key)
+        if drained != expected or len(heap) != 0 or heap.index:
+            return False
+
+        # a push the bucket queue can't hold leaves it untouched
+        buckets = HEAP_BACKENDS["bucket"]()
+        buckets.max_span = 32
+        buckets.push((10, "a"))
+        try:
+            buckets.push((100, "b"))
+            return False
+        except ValueError:
+            pass
+        buckets.push((12, "c"))
+        if (buckets.cursor, buckets.top) != (10, 12) or [buckets.pop(), buckets.pop()] != [(10, "a"), (12, "c")]:
+            return False
+
+        # A* has to give the same optimal length with every backend
+        grid = Grid(8, 8)
+        grid.set_start((0, 0))
+        grid.set_goal((7, 7))
+        for r in range(7):
+            grid.add_barrier((r, 3))
+        for r in range(1, 8):
+            grid.add_barrier((r, 5))
+        lengths = {len(AStarPathfinder(grid, heap=name).find_path()) for name in HEAP_BACKENDS}
+        return lengths == {29}
+
+    @staticmethod
+    def _test_bidirectional() -> bool:
+        # two walls with gaps at opposite ends, same maze as the heap backend test
+        grid = Grid(8, 8)
+        grid.set_start((0, 0))
+        grid.set_goal((7, 7))
+        for r in range(7):
+            grid.add_barrier((r, 3))
+        for r in range(1, 8):
+            grid.add_barrier((r, 5))
+
+        p1 = BidirectionalAStarPathfinder(grid).find_path()
+        p2 = BidirectionalBFSPathfinder(grid).find_path()
+        for p in (p1, p2):
+            if not p or not TestRunner._validate_path(p, grid) or len(p) != 29:
+                return False
+
+        # every heap backend runs both frontiers, "auto" leaves the bucket queue for
+        # fractional costs without losing the optimal path
+        for backend in list(HEAP_BACKENDS) + ["auto"]:
+            p = BidirectionalAStarPathfinder(grid, heap=backend).find_path()
+            if not p or len(p) != 29:
+                return False
+        grid.set_cost((7, 4), 1.5)
+        cost = AStarPathfinder(grid, heap="binary").search().cost
+        if BidirectionalAStarPathfinder(grid).search().cost != cost:
+            return False
+        grid.set_cost((7, 4), 1)
+
+        # the expansion budget covers both frontiers, weighted search is refused
+        limited = BidirectionalAStarPathfinder(grid, max_expansions=5)
+        if limited.search().failure_reason != BUDGET_EXHAUSTED or limited.nodes_explored != 5:
+            return False
+        try:
+            BidirectionalAStarPathfinder(grid, weight=2.0)
+            return False
+        except ValueError:
+            pass
+
+        # a fully blocked goal must still be reported as unreachable
+        for c in range(8):
+            grid.add_barrier((4, c))
+        return BidirectionalAStarPathfinder(grid).find_path() is None and BidirectionalBFSPathfinder(grid).find_path() is None
+
+    @staticmethod
+    def _test_jump_point_search() -> bool:
+        grid = Grid(8, 8)
+        grid.set_start((0, 0))
+        grid.set_goal((7, 7))
+        for r in range(7):
+            grid.add_barrier((r, 3))
+        for r in range(1, 8):
+            grid.add_barrier((r, 5))
+
+        jps = JPSPathfinder(grid)
+        p1 = jps.find_path()
+        if not p1 or not TestRunner._validate_path(p1, grid) or len(p1) != 29:
+            return False
+
+        # 8-connected: the open 5x5 diagonal is 4 steps
+        open_grid = Grid(5, 5)
+        open_grid.set_start((0, 0))
+        open_grid.set_goal((4, 4))
+        p2 = JPSPathfinder(open_grid, diagonal=True).find_path()
+        if p2 != [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]:
+            return False
+
+        # non-uniform terrain falls back to A*, so the cheap detour must be taken
+        for r in range(1, 8):
+            grid.get_node((r, 4)).data = 10.0
+        grid.remove_barrier((4, 3))
+        terrain = lambda n1, n2: n2.data or 1.0
+        p3 = JPSPathfinder(grid, cost_function=terrain).find_path()
+        p4 = AStarPathfinder(grid, cost_function=terrain).find_path()
+        cost = lambda p: sum(terrain(None, grid.get_node(q)) for q in p[1:])
+        return p3 is not None and cost(p3) == cost(p4)
+
+    @staticmethod
+    def _test_hierarchical() -> bool:
+        grid = Grid(12, 12)
+        grid.set_start((0, 0))
+        grid.set_goal((11, 11))
+        for r in range(10):
+            grid.add_barrier((r, 5))
+
+        hpa = HPAStarPathfinder(grid, cluster_size=4)
+        p1 = hpa.find_path()
+        if not p1 or not TestRunner._validate_path(p1, grid):
+            return False
+
+        # close the only gap: the cached clusters must notice the edit
+        grid.add_barrier((10, 5))
+        grid.add_barrier((11, 5))
+        if hpa.find_path() is not None:
+            return False
+
+        # and open a new one at the top
+        grid.remove_barrier((0, 5))
+        p2 = hpa.find_path()
+        hpa.close()
+        if p2 is None or not TestRunner._validate_path(p2, grid) or (0, 5) not in p2:
+            return False
+
+        # the budget covers the cluster searches and the abstract search
+        budgeted = HPAStarPathfinder(grid, cluster_size=4, max_expansions=5)
+        if budgeted.search().failure_reason != BUDGET_EXHAUSTED or not budgeted.budget_exhausted:
+            return False
+
+        # a dropped pathfinder stops listening without close()
+        del budgeted
+        gc.collect()
+        if grid._listeners:
+            return False
+
+        # entrances only cross straight borders, the only way through here is diagonal
+        diagonal = Grid(4, 4, connectivity=Connectivity.EIGHT)
+        for pos in [(0, 2), (1, 2), (2, 0), (2, 1), (3, 2), (2, 3)]:
+            diagonal.add_barrier(pos)
+        try:
+            HPAStarPathfinder(diagonal, cluster_size=2)
+        except ValueError:
+            return True
+        return False
+
+    @staticmethod
+    def _test_incremental_replanning() -> bool:
+        grid = Grid(10, 10)
+        grid.set_start((0, 0))
+        grid.set_goal((9, 9))
+        dstar = DStarLitePathfinder(grid)
+        p1 = dstar.find_path()
+        if not p1 or len(p1) != 19:
+            return False
+        first_explored = dstar.nodes_explored
+
+        # block a cell on the current path, the repair should touch far fewer nodes
+        grid.add_barrier(p1[9])
+        p2 = dstar.find_path()
+        if not p2 or not TestRunner._validate_path(p2, grid) or len(p2) != 19:
+            return False
+        if dstar.nodes_explored >= first_explored:
+            return False
+
+        # wall off the goal entirely, then reopen it
+        for c in range(10):
+            grid.add_barrier((5, c))
+        if dstar.find_path() is not None:
+            return False
+        grid.remove_barrier((5, 0))
+        p3 = dstar.find_path()
+        p4 = AStarPathfinder(grid).find_path()
+        dstar.close()
+        return p3 is not None and TestRunner._validate_path(p3, grid) and len(p3) == len(p4)
+
+    @staticmethod
+    def _test_key_route() -> bool:
+        grid = Grid(10, 10)
+        grid.set_start((0, 0))
+        grid.set_goal((0, 9))
+        # insertion order zig-zags across the grid, the best order walks the keys left to right
+        for key in [(9, 6), (9, 3), (9, 9), (9, 0)]:
+            grid.add_key(key)
+
+        route = KeyRoutePathfinder(grid)
+        path = route.find_path()
+        if not path or not TestRunner._validate_path(path, grid):
+            return False
+        if route.order != [(9, 0), (9, 3), (9, 6), (9, 9)] or len(path) != 28:
+            return False
+        in_order = AStarPathfinder(grid).find_path()
+        if len(path) >= len(in_order):
+            return False
+
+        # a second run reuses the cached segments, an edit invalidates them
+        route.find_path()
+        if route.nodes_explored != 0:
+            return False
+        grid.add_barrier((5, 0))
+        path = route.find_path()
+        return path is not None and TestRunner._validate_path(path, grid) and route.nodes_explored > 0
+
+    @staticmethod
+    def _test_bitset_bfs() -> bool:
+        grid = Grid(12, 12)
+        grid.set_start((0, 0))
+        grid.set_goal((11, 11))
+        # walls with gaps on alternating ends, the path has to snake through them
+        for r in (2, 5, 8):
+            gap = 11 if r != 5 else 0
+            for c in range(12):
+                if c != gap:
+                    grid.add_barrier((r, c))
+
+        bitset = BitsetBFSPathfinder(grid)
+        path = bitset.find_path()
+        expected = BFSPathfinder(grid).find_path()
+        if not path or not TestRunner._validate_path(path, grid) or len(path) != len(expected):
+            return False
+        if len(bitset.visited) != bitset.nodes_explored or not set(path) <= bitset.visited:
+            return False
+
+        # the full field agrees with the path and marks walls as unreachable, walking a path
+        # back reads a few bits per step and leaves the field undecoded
+        field = bitset.distance_field(grid.start)
+        if field.path_to(grid.goal) != path or field._distances is not None:
+            return False
+        if field.distance(grid.goal) != len(path) - 1 or field.distance((2, 0)) is not None:
+            return False
+
+        # closing the last gap must be picked up from grid.version
+        grid.add_barrier((8, 11))
+        return bitset.find_path() is None
+
+    @staticmethod
+    def _test_goal_field_cache() -> bool:
+        grid = Grid(10, 10)
+        for r in range(8):
+            grid.add_barrier((r, 4))
+        # terrain cost: entering the bottom row is expensive
+        cost = lambda n1, n2: 5.0 if n2.position[0] == 9 else 1.0
+        cache = GoalFieldCache(grid, cost, memory_budget=2 * 10 * 10 * 8) # room for two fields
+        astar = AStarPathfinder(grid, cost)
+        grid.set_goal((0, 9))
+
+        # every start shares the one field, and descends it to an optimal path
+        for start in [(0, 0), (5, 2), (9, 0), (3, 3)]:
+            grid.set_start(start)
+            path = cache.path(start, grid.goal)
+            expected = astar.find_path()
+            if not path or not TestRunner._validate_path(path, grid):
+                return False
+            if sum(cost(grid.get_node(a), grid.get_node(b)) for a, b in zip(path, path[1:])) != \
+                    sum(cost(grid.get_node(a), grid.get_node(b)) for a, b in zip(expected, expected[1:])):
+                return False
+        if cache.misses != 1 or cache.hits != 3:
+            return False
+
+        # a third goal evicts the least recently used field
+        cache.field((9, 9))
+        cache.field((0, 9))
+        cache.field((5, 5))
+        if len(cache) != 2 or cache.memory_used > cache.memory_budget:
+            return False
+
+        # an edit drops every field
+        grid.add_barrier((8, 4))
+        if len(cache) != 0:
+            return False
+        blocked = cache.path((0, 0), (0, 9))
+        cache.close()
+        return blocked is not None and (9, 4) in blocked
+
+    @staticmethod
+    def _test_batch_queries() -> bool:
+        grid = Grid(15, 15)
+        for r in range(12):
+            grid.add_barrier((r, 7))
+        queries = [((0, 0), (0, 14)), ((14, 14), (0, 0)), ((3, 3), (3, 10), [(14, 0)]), ((5, 5), (5, 5)), ((0, 0), (5, 7))]
+        expected = []
+        for query in queries:
+            grid.start, grid.goal = query[0], query[1]
+            grid.keys = list(query[2]) if len(query) > 2 else []
+            path = AStarPathfinder(grid).find_path()
+            expected.append(None if path is None else len(path))
+        grid.start, grid.goal, grid.keys = None, None, []
+
+        # in-process and on a two worker pool reading the shared map
+        for workers in (1, 2):
+            with BatchPathfinder(grid, workers=workers) as batch:
+                results = batch.find_paths(queries)
+                # an edit publishes a new map, the wall now has no gap
+                for c in (12, 13, 14):
+                    grid.add_barrier((c, 7))
+                blocked = batch.find_paths(queries[:2])
+                for c in (12, 13, 14):
+                    grid.remove_barrier((c, 7))
+            if [None if r is None else len(r) for r in results] != expected or blocked != [None, None]:
+                return False
+            if grid.start is not None or results[0][0] != (0, 0) or results[0][-1] != (0, 14):
+                return False
+
+        # cost functions take (n1, n2) like the other pathfinders
+        for r in range(12, 15):
+            grid.set_terrain((r, 7), 6)
+        cost = lambda n1, n2: 1.0 + (n2.data or 0)
+        def priced(path):
+            return sum(cost(None, grid.get_node(pos)) for pos in path[1:])
+        optimal = AStarPathfinder(grid, cost).search((0, 0), (0, 14)).cost
+        with BatchPathfinder(grid, cost, workers=1) as batch:
+            detour = batch.find_paths([((0, 0), (0, 14))])[0]
+        if priced(detour) != optimal:
+            return False
+        for r in range(12, 15):
+            grid.set_terrain((r, 7), None)
+
+        # a compact grid is copied too, edits made while a batch runs don't reach it
+        compact = CompactGrid.from_grid(grid)
+        with BatchPathfinder(compact, workers=1) as batch:
+            batch.find_paths(queries[:1])
+            compact.add_barrier((14, 7))
+            if not batch._compact.is_valid((14, 7)) or batch._compact.costs is compact.costs:
+                return False
+
+        # a batch that is never closed frees its shared map once it is collected
+        batch = BatchPathfinder(grid, workers=2)
+        batch.find_paths(queries)
+        name = batch._handle[0]
+        del batch
+        gc.collect()
+        try:
+            shared_memory.SharedMemory(name=name).close()
+            return False
+        except FileNotFoundError:
+            return True
+
+    @staticmethod
+    def _test_concurrent_searches() -> bool:
+        grid = Grid(20, 20)
+        for r in range(1, 20, 4):
+            for c in range(19):
+                grid.add_barrier((r, c if (r // 4) % 2 == 0 else c + 1))
+        queries = [((0, c), (19, 19 - c)) for c in range(20)]
+
+        # one pathfinder of each kind shared by every thread, start/goal passed per call
+        finders = [AStarPathfinder(grid), BFSPathfinder(grid), DFSPathfinder(grid)]
+        def run(query):
+            return [finder.find_path(query[0], query[1]) for finder in finders]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(run, queries * 3))
+        for query, paths in zip(queries * 3, results):
+            serial = run(query)
+            if [len(p) for p in paths] != [len(p) for p in serial]:
+                return False
+            for p in paths:
+                if p[0] != query[0] or p[-1] != query[1]:
+                    return False
+        return grid.start is None and grid.goal is None
+
+    @staticmethod
+    def _test_path_service() -> bool:
+        grid = Grid(30, 30)
+        for c in range(29):
+            grid.add_barrier((15, c))
+
+        async def scenario() -> bool:
+            service = PathService(grid, AStarPathfinder, max_workers=2)
+            # ten identical queries run once, the odd one out runs separately
+            paths = await asyncio.gather(*[service.find_path((0, 0), (29, 0)) for _ in range(10)],
+                                         service.find_path((0, 0), (0, 5)))
+            if service.computed != 2 or service.coalesced != 9:
+                return False
+            if any(p != paths[0] for p in paths[:10]) or len(paths[10]) != 6:
+                return False
+
+            # after an edit the same query is a new request (different grid version)
+            grid.remove_barrier((15, 0))
+            shorter = await service.find_path((0, 0), (29, 0))
+            if service.computed != 3 or len(shorter) >= len(paths[0]):
+                return False
+
+            # an edit that lands while a search runs makes the worker search again
+            grid.add_barrier((15, 0))
+            racing = AStarPathfinder(grid)
+            search = racing.find_path
+            edits = [(15, 0)]
+            def find_path(*args):
+                path = search(*args)
+                if edits:
+                    grid.remove_barrier(edits.pop())
+                return path
+            racing.find_path = find_path
+            rerun = PathService(grid, lambda g: racing, max_workers=1)
+            fresh = await rerun.find_path((0, 0), (29, 0))
+            await rerun.close()
+            if len(fresh) != len(shorter):
+                return False
+
+            # a timed out caller gets TimeoutError, nothing is left in flight
+            try:
+                await service.find_path((0, 0), (29, 29), timeout=0)
+                return False
+            except asyncio.TimeoutError:
+                pass
+            await service.close()
+            return not service._in_flight
+
+        # workers share the service's pathfinder, a process pool can't run them
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                PathService(grid, AStarPathfinder, executor=pool)
+                return False
+            except TypeError:
+                pass
+        return asyncio.run(scenario())
+
+    @staticmethod
+    def _test_anytime_search() -> bool:
+        grid = Grid(30, 30)
+        for r in range(2, 28):
+            grid.add_barrier((r, 15))
+        for r in range(0, 30, 3):
+            for c in range(0, 30, 4):
+                if (r + c) % 5 and (r, c) not in grid.barriers:
+                    grid.set_terrain((r, c), 4)
+        cost = lambda a, b: 1.0 + (b.data or 0)
+        start, goal = (15, 0), (15, 29)
+
+        def path_cost(path: List[Tuple[int, int]]) -> float:
+            return sum(1.0 + (grid.get_node(p).data or 0) for p in path[1:])
+
+        optimal = path_cost(AStarPathfinder(grid, cost).find_path(start, goal))
+
+        # weighted A*: within weight times the optimum, and says so
+        weighted = AStarPathfinder(grid, cost, weight=2.0)
+        if path_cost(weighted.find_path(start, goal)) > 2.0 * optimal or weighted.suboptimality_bound != 2.0:
+            return False
+
+        # ARA* without limits keeps improving down to a proven optimal path
+        anytime = AnytimeAStarPathfinder(grid, cost, initial_weight=3.0, weight_step=0.5)
+        if path_cost(anytime.find_path(start, goal)) != optimal or anytime.suboptimality_bound != 1.0:
+            return False
+
+        # an expansion budget is never overrun, any path returned respects its bound
+        capped = AnytimeAStarPathfinder(grid, cost, max_expansions=150)
+        path = capped.find_path(start, goal)
+        if capped.nodes_explored > 150:
+            return False
+        if path is not None and path_cost(path) > capped.suboptimality_bound * optimal:
+            return False
+
+        # a budget too small for any path reports that instead of "no path"
+        starved = AStarPathfinder(grid, cost, max_expansions=5)
+        return starved.find_path(start, goal) is None and starved.budget_exhausted
+
+    @staticmethod
+    def _test_heuristics() -> bool:
+        grid = Grid(25, 25)
+        for r in range(0, 22):
+            grid.add_barrier((r, 8))
+        for r in range(3, 25):
+            grid.add_barrier((r, 16))
+        for r in range(25):
+            for c in range(25):
+                if (r * 7 + c) % 3 == 0 and (r, c) not in grid.barriers:
+                    grid.set_terrain((r, c), 5)
+        cost = lambda a, b: float(b.data or 2) # nothing is cheaper than 2
+        start, goal = (24, 0), (0, 24)
+
+        try:
+            make_heuristic("nope", grid, cost)
+            return False
+        except ValueError:
+            pass
+
+        def path_cost(path: List[Tuple[int, int]]) -> float:
+            return sum(cost(None, grid.get_node(p)) for p in path[1:])
+
+        alt = LandmarkHeuristic(grid, cost, landmarks=4)
+        reference = AStarPathfinder(grid, cost, heuristic="zero")
+        expected = path_cost(reference.find_path(start, goal))
+        explored = {}
+        for name in ("manhattan", "scaled_manhattan", "euclidean", alt):
+            finder = AStarPathfinder(grid, cost, heuristic=name)
+            path = finder.find_path(start, goal)
+            if path is None or path_cost(path) != expected:
+                return False
+            explored[name if isinstance(name, str) else "alt"] = finder.nodes_explored
+        if len(alt.landmarks) != 4 or alt.memory_used == 0:
+            return False
+        # tighter estimates expand fewer cells
+        if not explored["alt"] < explored["scaled_manhattan"] < explored["manhattan"]:
+            return False
+
+        # never above the true remaining cost
+        for pos in [(0, 0), (12, 12), (20, 20), (24, 24)]:
+            if alt(pos, goal) > path_cost(reference.find_path(pos, goal)):
+                return False
+
+        # a map edit rebuilds the tables, results stay optimal
+        grid.add_barrier((22, 8))
+        path = AStarPathfinder(grid, cost, heuristic=alt).find_path(start, goal)
+        if path is None or path_cost(path) != path_cost(reference.find_path(start, goal)):
+            return False
+
+        # on the cost layer the scale is the grid's cheapest cell, following edits without a scan
+        layered = Grid(10, 10)
+        for r in range(10):
+            for c in range(10):
+                layered.set_cost((r, c), 3)
+        scaled = AStarPathfinder(layered, heuristic="scaled_manhattan").heuristic_function
+        if scaled.scale != 3.0 or scaled((0, 0), (2, 2)) != 12.0:
+            return False
+        layered.set_cost((5, 5), 2)
+        return scaled.scale == 2.0 and scaled._scale[0] == -1
+
+    @staticmethod
+    def _test_cost_layer() -> bool:
+        grid = Grid(12, 12)
+        # building the grid is not an edit, the first real one is
+        edits = []
+        grid.add_listener(edits.append)
+        if grid.version != 0:
+            return False
+        grid.set_cost((0, 0), 1)
+        grid.add_barrier((11, 11))
+        if grid.version != 1 or edits != [(11, 11)]:
+            return False
+        grid.remove_barrier((11, 11))
+        # a band of expensive cells across the middle with one cheap gap
+        for c in range(12):
+            if c != 9:
+                grid.set_terrain((6, c), "mud", 50)
+        if grid.uniform_costs or not grid.integral_costs or grid.get_cost((6, 0)) != 50.0:
+            return False
+
+        # the layer and an equivalent callable agree, and the layer route uses the gap
+        layered = AStarPathfinder(grid).find_path((0, 0), (11, 0))
+        callback = AStarPathfinder(grid, lambda a, b: 50.0 if b.data == "mud" else 1.0).find_path((0, 0), (11, 0))
+        if (6, 9) not in layered or sum(grid.get_cost(p) for p in layered[1:]) != sum(grid.get_cost(p) for p in callback[1:]):
+            return False
+
+        # counters follow edits, a copy carries the layer over
+        grid.set_cost((6, 9), 2.5)
+        if grid.integral_costs or CompactGrid.from_grid(grid).get_cost((6, 9)) != 2.5:
+            return False
+        for c in range(12):
+            grid.set_terrain((6, c), None, 1)
+        if not grid.uniform_costs or not grid.integral_costs or grid.set_cost((20, 20), 3) is not False:
+            return False
+
+        # nodes added outside the layer cost 1.0, they never index into it
+        small = Grid(3, 3)
+        small.set_cost((1, 0), 50)
+        for pos in [(0, 3), (2, 3), (3, 3)]:
+            small.add_node(pos)
+        return (AStarPathfinder(small).search((0, 0), (0, 3)).cost == 3.0
+                and AStarPathfinder(small).search((0, 0), (3, 3)).cost == 6.0)
+
+    @staticmethod
+    def _test_connectivity() -> bool:
+        grid = Grid(20, 20, connectivity=Connectivity.EIGHT)
+        # a wall whose only gap (9, 10) is boxed in, reachable only by cutting a corner
+        for r in range(20):
+            if r not in (9, 10):
+                grid.add_barrier((r, 10))
+        grid.add_barrier((9, 9))
+        grid.add_barrier((10, 10))
+        start, goal = (0, 0), (19, 19)
+
+        def length(path: List[Tuple[int, int]]) -> float:
+            return sum(step_length(a, b) for a, b in zip(path, path[1:]))
+
+        # corner cutting squeezes through the slit, strict mode and 4-connected can't
+        if AStarPathfinder(grid).find_path(start, goal) is None:
+            return False
+        if AStarPathfinder(grid, connectivity=Connectivity.EIGHT_NO_CORNER_CUTTING).find_path(start, goal) is not None:
+            return False
+        if BFSPathfinder(grid, Connectivity.FOUR).find_path(start, goal) is not None:
+            return False
+
+        # on open ground: diagonal A* matches Dijkstra, BFS and DFS walk valid 8-way steps
+        grid.remove_barrier((0, 10))
+        for mode in (Connectivity.EIGHT, Connectivity.EIGHT_NO_CORNER_CUTTING):
+            expected = length(AStarPathfinder(grid, heuristic="zero", connectivity=mode).find_path(start, goal))
+            astar = AStarPathfinder(grid, connectivity=mode).find_path(start, goal)
+            jps = JPSPathfinder(grid, connectivity=mode).find_path(start, goal)
+            if abs(length(astar) - expected) > 1e-9 or abs(length(jps) - expected) > 1e-9:
+                return False
+            for path in (BFSPathfinder(grid, mode).find_path(start, goal), DFSPathfinder(grid, mode).find_path(start, goal)):
+                for a, b in zip(path, path[1:]):
+                    if b not in [n.position for n in grid.get_neighbors(a, mode)]:
+                        return False
+
+        # fewer expansions than the 4-connected search for the same trip
+        open_grid = Grid(30, 30)
+        four = BFSPathfinder(open_grid)
+        eight = BFSPathfinder(open_grid, Connectivity.EIGHT)
+        if len(eight.find_path(start, (29, 29))) >= len(four.find_path(start, (29, 29))):
+            return False
+
+        # positions that aren't nodes get the same answer with or without the neighbor index
+        for pos in [(9, 9), (-1, 0), (3, 1)]:
+            for mode in Connectivity:
+                indexed = [n.position for n in Grid(3, 3).get_neighbors(pos, mode)]
+                computed = [n.position for n in Grid(3, 3, precompute_neighbors=False).get_neighbors(pos, mode)]
+                if indexed != computed:
+                    return False
+        return True
+
+    @staticmethod
+    def _test_any_angle() -> bool:
+        grid = Grid(20, 20)
+        for r in range(15):
+            grid.add_barrier((r, 10))
+        start, goal = (0, 0), (0, 19)
+
+        # line of sight: blocked by a barrier, and by two barriers meeting at a corner
+        if line_of_sight(grid, (0, 9), (0, 11)) or not line_of_sight(grid, (19, 0), (15, 19)):
+            return False
+        corner = Grid(3, 3)
+        corner.add_barrier((0, 1))
+        corner.add_barrier((1, 0))
+        if line_of_sight(corner, (0, 0), (1, 1)):
+            return False
+
+        def clear(path: List[Tuple[int, int]]) -> bool:
+            return all(line_of_sight(grid, a, b) for a, b in zip(path, path[1:]))
+
+        # Theta* and Lazy Theta*: a few waypoints around the wall, every leg unobstructed
+        for lazy in (False, True):
+            path = ThetaStarPathfinder(grid, lazy=lazy).find_path(start, goal)
+            if path is None or path[0] != start or path[-1] != goal or len(path) > 5 or not clear(path):
+                return False
+
+        # smoothing any grid path: same ends, fewer cells, keys kept
+        grid_path = AStarPathfinder(grid).find_path(start, goal, [(17, 3)])
+        smoothed = smooth_path(grid, grid_path, keep=[(17, 3)])
+        if smoothed[0] != start or smoothed[-1] != goal or (17, 3) not in smoothed:
+            return False
+        if len(smoothed) >= len(grid_path) / 4 or not clear(smoothed):
+            return False
+
+        # costly terrain is not cut through just because it is in sight
+        swamp = Grid(10, 10)
+        for r in range(1, 10):
+            for c in range(1, 9):
+                swamp.set_cost((r, c), 20)
+        detour = AStarPathfinder(swamp).find_path((9, 0), (9, 9))
+        return all(swamp.get_cost(p) == 1 for p in smooth_path(swamp, detour))
+
+    @staticmethod
+    def _test_benchmark_maps() -> bool:
+        # every generated map is solvable and the same seed gives the same map
+        for scenario in SCENARIOS:
+            grid = build_map(scenario, 24, 24, seed=3)
+            again = build_map(scenario, 24, 24, seed=3)
+            if [grid.is_barrier((r, c)) for r in range(24) for c in range(24)] != \
+                    [again.is_barrier((r, c)) for r in range(24) for c in range(24)]:
+                return False
+            if grid.keys != again.keys or grid.goal != again.goal:
+                return False
+            if AStarPathfinder(grid).find_path() is None:
+                return False
+
+        # measurements time the search only and report what the JSON output needs
+        grid = build_map("keys-2", 24, 24)
+        result = measure(AStarPathfinder(grid), warmup=1, repeats=4)
+        if not result["found"] or result["runs"] != 4 or len(grid.keys) != 2:
+            return False
+        if not result["min_ms"] <= result["median_ms"] <= result["p95_ms"]:
+            return False
+        return result["nodes_explored"] > 0 and result["nodes_per_sec"] > 0 and result["peak_kib"] > 0
+
+    @staticmethod
+    def _test_regression_gate() -> bool:
+        def report(calibration_ns: int, cases: list) -> dict:
+            return {"meta": {"calibration_ns": calibration_ns},
+                    "results": [{"scenario": "maze", "algorithm": algo, "rows": 32, "cols": 32, "found": True,
+                                 "nodes_explored": nodes, "median_ms": median, "min_ms": median * 0.9}
+                                for algo, nodes, median in cases]}
+
+        baseline = report(1000, [("astar", 100, 4.0), ("bfs", 200, 2.0), ("dfs", 50, 0.05)])
+        # a machine twice as slow: double the raw times, still no regression once normalized
+        if compare(baseline, report(2000, [("astar", 100, 8.0), ("bfs", 200, 4.0), ("dfs", 50, 0.1)])):
+            return False
+        # more nodes, a slower search on the same machine, a missing case; tiny cases aren't timed
+        found = compare(baseline, report(1000, [("astar", 101, 4.0), ("bfs", 200, 3.0)]))
+        if len(found) != 3 or not any("astar" in line and "nodes" in line for line in found):
+            return False
+        if not any("bfs" in line and "median" in line for line in found):
+            return False
+        if not any("dfs" in line and "missing" in line for line in found):
+            return False
+        return not compare(baseline, report(1000, [("astar", 100, 4.0), ("bfs", 200, 2.4), ("dfs", 50, 0.5)]))
+
+    @staticmethod
+    def _test_search_stats() -> bool:
+        grid = build_map("random-25", 30, 30)
+        keys = [pos for pos in ((10, 10), (20, 5)) if grid.is_valid(pos)]
+
+        # off by default, and collecting never changes the result
+        plain = AStarPathfinder(grid)
+        counted = AStarPathfinder(grid, collect_stats=True)
+        path = plain.find_path(keys=keys)
+        if plain.stats is not None or counted.find_path(keys=keys) != path:
+            return False
+        stats = counted.stats
+        if stats.expansions != counted.nodes_explored or len(stats.segment_ns) != len(keys) + 1:
+            return False
+        # every pop either expands a cell or is stale, nothing is popped that wasn't pushed
+        if stats.pops != stats.expansions + stats.stale_pops or stats.pushes < stats.pops:
+            return False
+        if not 0 < stats.max_open_size <= stats.pushes or stats.peak_frontier_bytes <= 0:
+            return False
+        if stats.neighbor_calls < stats.expansions - len(keys) - 1:
+            return False
+
+        # the uninformed searches fill the same counters
+        for finder in (BFSPathfinder(grid, collect_stats=True), DFSPathfinder(grid, collect_stats=True)):
+            finder.find_path()
+            if finder.stats.expansions != finder.nodes_explored or finder.stats.pushes < finder.stats.pops:
+                return False
+        return True
+
+    @staticmethod
+    def _test_path_results() -> bool:
+        grid = build_map("terrain", 30, 30)
+        keys = [pos for pos in ((8, 8), (20, 4)) if grid.is_valid(pos)]
+
+        # the result carries the same path as find_path, priced in the search's cost model
+        for finder in (AStarPathfinder(grid), JPSPathfinder(grid), BidirectionalAStarPathfinder(grid),
+                       KeyRoutePathfinder(grid), BFSPathfinder(grid)):
+            result = finder.search(keys=keys)
+            if not result.found or result.failure_reason is not None or result.nodes_explored != finder.nodes_explored:
+                return False
+            if abs(result.cost - path_cost(grid, result.path)) > 1e-9 or result.path != finder.find_path(keys=keys):
+                return False
+        if AStarPathfinder(grid).search(keys=keys).suboptimality_bound != 1.0:
+            return False
+
+        # key orders past the Held-Karp limit come from a heuristic and carry no bound
+        route = KeyRoutePathfinder(grid)
+        if route.search(keys=keys).suboptimality_bound != 1.0 or route.suboptimality_bound != 1.0:
+            return False
+        many_keys = [(r, c) for r in range(2, 30, 8) for c in range(3, 30, 9) if grid.is_valid((r, c))]
+        if len(many_keys) <= EXACT_KEY_LIMIT:
+            return False
+        result = route.search(keys=many_keys)
+        if not result.found or result.suboptimality_bound != float("inf") or route.suboptimality_bound != float("inf"):
+            return False
+
+        # every way of coming back empty-handed has its reason
+        walled = Grid(5, 5)
+        for r in range(5):
+            walled.add_barrier((r, 2))
+        if AStarPathfinder(walled).search((0, 0), (0, 4)).failure_reason != NO_PATH:
+            return False
+        if DFSPathfinder(walled).search((0, 0), (0, 4)).failure_reason != NO_PATH:
+            return False
+        if BFSPathfinder(walled).search().failure_reason != MISSING_ENDPOINTS:
+            return False
+        starved = AStarPathfinder(grid, max_expansions=3).search()
+        return starved.failure_reason == BUDGET_EXHAUSTED and starved.budget_exhausted and starved.cost == float("inf")
+
+    @staticmethod
+    def _test_compact_paths() -> bool:
+        grid = build_map("terrain", 40, 40)
+        keys = [pos for pos in ((10, 30), (30, 5)) if grid.is_valid(pos)]
+
+        # same cells and cost as the list path, segments joined without repeating waypoints
+        for finder_class in (AStarPathfinder, JPSPathfinder, BidirectionalAStarPathfinder, ThetaStarPathfinder):
+            expected = finder_class(grid).search(keys=keys)
+            result = finder_class(grid, compact_path=True).search(keys=keys)
+            if not isinstance(result.path, CompactPath) or result.path != expected.path:
+                return False
+            if result.path.positions() != expected.path or result.cost != expected.cost:
+                return False
+
+        path = AStarPathfinder(grid, compact_path=True).find_path(keys=keys)
+        view = path.buffer()
+        if view.format != "i" or not view.readonly or view.tolist() != [r * 40 + c for r, c in path]:
+            return False
+        if CompactPath.from_runs(path[0], path.runs(), 40) != path:
+            return False
+        joined = CompactPath.from_positions(path[:10], 40)
+        joined.extend(CompactPath.from_positions(path[9:], 40))
+        if joined != path or path[-1] != grid.goal or (100, 100) in path:
+            return False
+
+        # a path can be appended to itself
+        loop = CompactPath.from_positions([(0, 0), (0, 1), (0, 0)], 40)
+        loop.extend(loop)
+        if loop != [(0, 0), (0, 1), (0, 0), (0, 1), (0, 0)]:
+            return False
+
+        # a straight line is a single run
+        line = CompactPath.from_positions([(2, c) for c in range(3, 9)], 40)
+        if list(line.runs()) != [3, 5]:
+            return False
+        try:
+            CompactPath.from_positions([(0, 0), (2, 3)], 40).runs()
+            return False
+        except ValueError:
+            return True
+
+    @staticmethod
+    def _test_jps_step_costs() -> bool:
+        # every cell costs 3: jumps must pay 3 a step like A* does, not 1
+        for connectivity in (Connectivity.FOUR, Connectivity.EIGHT_NO_CORNER_CUTTING):
+            grid = build_map("random-25", 30, 30, connectivity=connectivity)
+            for r in range(30):
+                for c in range(30):
+                    grid.set_cost((r, c), 3)
+            expected = AStarPathfinder(grid).search()
+            result = JPSPathfinder(grid).search()
+            if not expected.found or abs(result.cost - expected.cost) > 1e-9:
+                return False
+            if abs(result.cost - path_cost(grid, result.path)) > 1e-9:
+                return False
+
+        # a cost function always runs as A*, even a constant one
+        grid = build_map("random-25", 30, 30)
+        five = lambda n1, n2: 5.0
+        expected = AStarPathfinder(grid, five).search()
+        if abs(JPSPathfinder(grid, five).search().cost - expected.cost) > 1e-9:
+            return False
+
+        # jump point expansions are paid from the budget like A* expansions
+        budgeted = JPSPathfinder(grid, max_expansions=2)
+        result = budgeted.search()
+        return (result.failure_reason == BUDGET_EXHAUSTED and budgeted.budget_exhausted
+                and budgeted.nodes_explored == 2)